@@ -1,5 +1,16 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 
+query_logger = logging.getLogger('core.query_budget')
+
 class RequestLoggingMiddleware:
 
     def __init__(self, get_response):
@@ -17,4 +28,121 @@ class PermissionPolicyMiddleware(MiddlewareMixin):
 
   def process_response(self, request, response):
     response['Permission-Policy'] = 'encrypted-media=\'self\' open.spotify.com'
-    return response
\ No newline at end of file
+    return response
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in QUERY_BUDGET_STRICT mode (tests) when a view goes over its budget"""
+
+
+def query_budget(limit):
+    """Give a view its own query budget: @query_budget(5) on a function or class-based view"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+def sql_shape(sql):
+    """Normalise a statement so queries differing only in their values compare equal"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _PLACEHOLDER_LIST.sub('(...)', shape)
+    return ' '.join(shape.split())
+
+
+class QueryTracker:
+    """connection.execute_wrapper() hook counting queries, DB time and repeated SQL shapes"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts queries and DB time per request and flags repeated SQL shapes (likely
+    N+1). Requests over budget or with N+1 shapes are logged as a JSON warning.
+
+    Settings:
+        QUERY_BUDGET_DEFAULT              queries allowed per request (None disables the check)
+        QUERY_BUDGET_N_PLUS_ONE_THRESHOLD repeats of one SQL shape that count as N+1
+        QUERY_BUDGET_STRICT               raise QueryBudgetExceeded instead of logging
+        QUERY_BUDGET_REPORT               also send a Server-Timing header and log every
+                                          request at INFO (development only)
+    Views can override the default with a `query_budget` attribute (see query_budget()).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Read per request so override_settings() works in tests
+        n_plus_one_threshold = getattr(settings, 'QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 10)
+        strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        report = getattr(settings, 'QUERY_BUDGET_REPORT', False)
+
+        tracker = QueryTracker()
+        request._query_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', 50)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tracker))
+            response = self.get_response(request)
+
+        budget = request._query_budget
+        over_budget = budget is not None and tracker.count > budget
+        repeated = tracker.repeated(n_plus_one_threshold)
+
+        if report:
+            timing = f'db;dur={tracker.duration * 1000:.1f};desc="{tracker.count} queries"'
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response['Server-Timing'] = timing
+
+        if not (over_budget or repeated or report):
+            return response
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': tracker.count,
+            'db_ms': round(tracker.duration * 1000, 1),
+            'budget': budget,
+            'n_plus_one': [{'sql': shape[:300], 'count': count} for shape, count in repeated],
+        }
+        if over_budget or repeated:
+            if strict:
+                raise QueryBudgetExceeded(json.dumps(record))
+            query_logger.warning(json.dumps(record))
+        else:
+            query_logger.info(json.dumps(record))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # as_view() functions carry the class in view_class (Django) / cls (DRF)
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        for view in (view_func, view_class):
+            if view is not None and hasattr(view, 'query_budget'):
+                request._query_budget = view.query_budget
+                return None
+        return None
@@ -123,6 +123,8 @@ TINYMCE_DEFAULT_CONFIG = {
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # First, so session/auth queries are counted too
+    "core.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -135,6 +137,30 @@ MIDDLEWARE = [
 
 ]
 
+# Query budget / N+1 detection (core.middleware.QueryBudgetMiddleware)
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '50'))
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', '10'))
+# Raise instead of logging; switch on in test settings to fail views that go over budget
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+# Server-Timing header with DB time and an INFO log line for every request; keep
+# off in production (clients would see the query counts)
+QUERY_BUDGET_REPORT = os.getenv('QUERY_BUDGET_REPORT', str(DEBUG)).lower() == 'true'
+
+# Share of full (200) responses counted in the ETag stats (songs/views/conditional.py)
+CONDITIONAL_GET_MISS_SAMPLE_RATE = float(os.getenv('CONDITIONAL_GET_MISS_SAMPLE_RATE', '0.05'))
+
+# Queue ratings in songs.RatingEvent and apply them in batches with
+# `manage.py process_rating_queue` instead of inside the request
+RATING_WRITE_BEHIND = os.getenv('RATING_WRITE_BEHIND', 'False').lower() == 'true'
+
+# Optional Redis server (redis-py must be installed); unset = in-process fallbacks
+REDIS_URL = os.getenv('REDIS_URL')
+
+# Historian leaderboard (users/leaderboard.py)
+LEADERBOARD_EXCLUDED_USERNAMES = ['Asle', 'admin']
+# Rebuild interval for the per-worker board used when REDIS_URL is not set
+LEADERBOARD_MAX_AGE = int(os.getenv('LEADERBOARD_MAX_AGE', '3600'))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://localhost:3001",
@@ -250,6 +276,34 @@ else:  # Development
         }
     }
 
+
+# Cache
+# Production shares one cache between workers: Redis when REDIS_URL is set,
+# otherwise files under CACHE_DIR. Local runs use per-process memory.
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DJANGO_ENV == 'production':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+            'TIMEOUT': 60 * 60 * 24,
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+else:  # Development
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,7 +1,12 @@
 import os
 import django
 import sys
+import argparse
+import gzip
+import hashlib
+import json
 from datetime import datetime
+from xml.sax.saxutils import escape
 import logging
 
 # Setup logging
@@ -9,106 +14,223 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(BASE_DIR)
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
-django.setup()
+SITE_URL = 'https://pophits.org'
+# Where the shards are served from (the index lives at /static/sitemap.xml, as referenced in robots.txt)
+SHARD_URL = f'{SITE_URL}/static/sitemaps'
+# The protocol allows 50,000 URLs per file; stay well below so a shard is quick to rewrite
+SHARD_SIZE = 10000
+CHUNK_SIZE = 2000
+MANIFEST_NAME = 'manifest.json'
 
-# Added Tag to imports
-from songs.models import Song, Artist, SongTag
-from blog.models import BlogPost
 
-def generate_sitemap():
+def _day(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def static_urls(latest_chart):
+    """(loc, lastmod, changefreq, priority) for static and year pages."""
+    lastmod = _day(latest_chart)
+    for path, priority, changefreq in (
+        ('/', '1.0', 'daily'),
+        ('/songs', '0.9', 'daily'),
+        ('/blog', '0.9', 'daily'),
+        ('/tags', '0.9', 'weekly'),
+    ):
+        yield f'{SITE_URL}{path}', lastmod, changefreq, priority
+
+    current_year = datetime.now().year
+    for year in range(1958, current_year + 1):
+        # Only the current year's page still changes with the charts
+        yield f'{SITE_URL}/year/{year}', lastmod if year == current_year else None, 'monthly', '0.8'
+
+
+def tag_urls():
+    from songs.models import SongTag
+
+    rows = SongTag.objects.order_by('id').values_list('slug', 'updated_at')
+    for slug, updated_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f'{SITE_URL}/tags/{slug}', _day(updated_at), 'weekly', '0.8'
+
+
+def song_urls():
+    from django.db.models import Max
+    from songs.models import Song
+
+    # A song page changes when the song gets a new chart week
+    rows = Song.objects.order_by('id').annotate(
+        last_charted=Max('chart_entries__chart_date')
+    ).values_list('slug', 'last_charted')
+    for slug, last_charted in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f'{SITE_URL}/songs/{slug}', _day(last_charted), 'monthly', '0.7'
+
+
+def artist_urls():
+    from songs.models import Artist
+
+    rows = Artist.objects.order_by('id').values_list('slug', 'updated_at')
+    for slug, updated_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f'{SITE_URL}/artist/{slug}', _day(updated_at), 'monthly', '0.7'
+
+
+def blog_urls():
+    from blog.models import BlogPost
+
+    rows = BlogPost.objects.filter(is_published=True).order_by('id').values_list(
+        'slug', 'updated_date', 'published_date'
+    )
+    for slug, updated_date, published_date in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield f'{SITE_URL}/blog/{slug}', _day(updated_date or published_date), 'weekly', '0.8'
+
+
+def sections():
+    from songs.models import SongTimeline
+
+    latest_chart = SongTimeline.objects.order_by('-chart_date').values_list('chart_date', flat=True).first()
+    return [
+        ('pages', static_urls(latest_chart)),
+        ('tags', tag_urls()),
+        ('songs', song_urls()),
+        ('artists', artist_urls()),
+        ('blog', blog_urls()),
+    ]
+
+
+class ShardWriter:
+    """
+    Streams one shard to a temporary gzip file while hashing its XML, then keeps
+    it only if the hash differs from the last run's (or the file is missing).
+    """
+
+    def __init__(self, output_dir, name):
+        self.name = name
+        self.path = os.path.join(output_dir, name)
+        self.tmp_path = self.path + '.tmp'
+        self.hash = hashlib.sha256()
+        self.count = 0
+        self.lastmod = None
+        # mtime=0 keeps the gzip bytes identical for identical content
+        self._file = gzip.GzipFile(self.tmp_path, 'wb', mtime=0)
+        self._write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        self.hash.update(data)
+        self._file.write(data)
+
+    def add(self, loc, lastmod, changefreq, priority):
+        entry = f'  <url>\n    <loc>{escape(loc)}</loc>\n'
+        if lastmod:
+            entry += f'    <lastmod>{lastmod}</lastmod>\n'
+            self.lastmod = max(self.lastmod or lastmod, lastmod)
+        entry += f'    <changefreq>{changefreq}</changefreq>\n    <priority>{priority}</priority>\n  </url>\n'
+        self._write(entry)
+        self.count += 1
+
+    def close(self, previous):
+        """Finish the shard; returns True if it was (re)written."""
+        self._write('</urlset>\n')
+        self._file.close()
+        digest = self.hash.hexdigest()
+        if previous and previous.get('sha256') == digest and os.path.exists(self.path):
+            os.remove(self.tmp_path)
+            return False
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def manifest_entry(self):
+        return {'sha256': self.hash.hexdigest(), 'urls': self.count, 'lastmod': self.lastmod}
+
+
+def write_index(path, shards):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for name, entry in shards.items():
+            f.write('  <sitemap>\n')
+            f.write(f'    <loc>{SHARD_URL}/{name}</loc>\n')
+            if entry['lastmod']:
+                f.write(f'    <lastmod>{entry["lastmod"]}</lastmod>\n')
+            f.write('  </sitemap>\n')
+        f.write('</sitemapindex>\n')
+    os.replace(tmp_path, path)
+
+
+def generate_sitemap(output_dir=None, shard_size=SHARD_SIZE, force=False):
+    """
+    Write gzipped sitemap shards to <static>/sitemaps/ and the sitemap index to
+    <static>/sitemap.xml. Shards whose content hasn't changed since the last run
+    (per the hash manifest) are left untouched. Returns (written, unchanged) shard counts.
+    """
+    static_dir = output_dir or os.path.join(BASE_DIR, 'static')
+    shard_dir = os.path.join(static_dir, 'sitemaps')
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(shard_dir, MANIFEST_NAME)
+
+    previous = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+
+    logger.info("Starting sitemap generation...")
+    shards = {}
+    written = unchanged = 0
+    for section, urls in sections():
+        number = 0
+        shard = None
+        for url in urls:
+            if shard is None or shard.count >= shard_size:
+                if shard is not None:
+                    written, unchanged = _finish(shard, previous, shards, written, unchanged)
+                number += 1
+                shard = ShardWriter(shard_dir, f'{section}-{number}.xml.gz')
+            shard.add(*url)
+        if shard is not None:
+            written, unchanged = _finish(shard, previous, shards, written, unchanged)
+        logger.info(f"{section}: {sum(e['urls'] for n, e in shards.items() if n.startswith(section + '-'))} URLs")
+
+    # Shards left over from a bigger previous run
+    for name in set(previous) - set(shards):
+        path = os.path.join(shard_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    write_index(os.path.join(static_dir, 'sitemap.xml'), shards)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(shards, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    logger.info(
+        f"✓ Success! Total URLs: {sum(e['urls'] for e in shards.values())} "
+        f"in {len(shards)} shards ({written} written, {unchanged} unchanged)"
+    )
+    return written, unchanged
+
+
+def _finish(shard, previous, shards, written, unchanged):
+    if shard.close(previous.get(shard.name)):
+        written += 1
+    else:
+        unchanged += 1
+    shards[shard.name] = shard.manifest_entry()
+    return written, unchanged
+
+
+if __name__ == "__main__":
+    sys.path.append(BASE_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+
+    parser = argparse.ArgumentParser(description='Generate the sharded pophits.org sitemap')
+    parser.add_argument('--output-dir', help='Static directory to write to (default: backend/static)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='URLs per sitemap file')
+    parser.add_argument('--force', action='store_true', help='Rewrite every shard even if unchanged')
+    args = parser.parse_args()
+
     try:
-        output_path = os.path.join(BASE_DIR, 'static', 'sitemap.xml')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        today = datetime.now().strftime('%Y-%m-%d')
-        sitemap_urls = []
-        
-        logger.info("Starting sitemap generation...")
-        
-        # 1. STATIC PAGES (Removed current-hot100)
-        static_pages = [
-            {'url': 'https://pophits.org/', 'priority': '1.0', 'changefreq': 'daily'},
-            {'url': 'https://pophits.org/songs', 'priority': '0.9', 'changefreq': 'daily'},
-            {'url': 'https://pophits.org/blog', 'priority': '0.9', 'changefreq': 'daily'},
-            {'url': 'https://pophits.org/tags', 'priority': '0.9', 'changefreq': 'weekly'},
-        ]
-        sitemap_urls.extend(static_pages)
-        
-        # 2. YEAR PAGES
-        current_year = datetime.now().year
-        year_range = list(range(1958, current_year + 1))
-        for year in year_range:
-            sitemap_urls.append({
-                'url': f'https://pophits.org/year/{year}',
-                'priority': '0.8',
-                'changefreq': 'monthly'
-            })
-
-        # 3. TAG THEMES (NEW REPLACEMENT FOR CHARTS)
-        logger.info("Adding Tag Themes to sitemap...")
-        tag_count = 0
-        for tag in SongTag.objects.all():
-            sitemap_urls.append({
-                'url': f'https://pophits.org/tags/{tag.slug}',
-                'priority': '0.8',
-                'changefreq': 'weekly'
-            })
-            tag_count += 1
-        logger.info(f"Total tags added: {tag_count}")
-        
-        # 4. SONG PAGES
-        song_count = 0
-        for song in Song.objects.all():
-            sitemap_urls.append({
-                'url': f'https://pophits.org/songs/{song.slug}',
-                'priority': '0.7',
-                'changefreq': 'monthly'
-            })
-            song_count += 1
-        
-        # 5. ARTIST PAGES
-        artist_count = 0
-        for artist in Artist.objects.all():
-            sitemap_urls.append({
-                'url': f'https://pophits.org/artist/{artist.slug}',
-                'priority': '0.7',
-                'changefreq': 'monthly'
-            })
-            artist_count += 1
-        
-        # 6. BLOG POSTS
-        blog_count = 0
-        for post in BlogPost.objects.filter(is_published=True):
-            last_mod = post.updated_date.strftime('%Y-%m-%d') if post.updated_date else post.published_date.strftime('%Y-%m-%d')
-            sitemap_urls.append({
-                'url': f'https://pophits.org/blog/{post.slug}',
-                'priority': '0.8',
-                'changefreq': 'weekly',
-                'lastmod': last_mod
-            })
-            blog_count += 1
-
-        # WRITE TO FILE
-        with open(output_path, 'w') as f:
-            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
-            for item in sitemap_urls:
-                f.write('  <url>\n')
-                f.write(f'    <loc>{item["url"]}</loc>\n')
-                f.write(f'    <lastmod>{item.get("lastmod", today)}</lastmod>\n')
-                f.write(f'    <changefreq>{item["changefreq"]}</changefreq>\n')
-                f.write(f'    <priority>{item["priority"]}</priority>\n')
-                f.write('  </url>\n')
-            f.write('</urlset>')
-        
-        logger.info(f"✓ Success! Total URLs: {len(sitemap_urls)}")
-        
+        generate_sitemap(args.output_dir, args.shard_size, args.force)
     except Exception as e:
         logger.error(f"✗ Error: {str(e)}", exc_info=True)
         sys.exit(1)
-
-if __name__ == "__main__":
-    generate_sitemap()
\ No newline at end of file
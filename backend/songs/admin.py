@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib import admin
 from django.db import models
+from django.utils import timezone
 from django.utils.html import format_html
 from ckeditor.widgets import CKEditorWidget
 from django.contrib import messages
@@ -22,7 +23,7 @@ def copy_image_to_artist_songs(modeladmin, request, queryset):
                 image_upload__exact=''
             ).exclude(id=song.id)
 
-            updated_count = songs_to_update.update(image_upload=song.image_upload)
+            updated_count = songs_to_update.update(image_upload=song.image_upload, updated_at=timezone.now())
 
             if updated_count > 0:
                 messages.success(
@@ -283,9 +284,9 @@ class ArtistAdmin(admin.ModelAdmin):
     is_enriched.short_description = 'Enriched'
 
     def total_songs(self, obj):
-        count = Song.objects.filter(artist_fk=obj).count()
-        return count
+        return obj.total_hits
     total_songs.short_description = 'Songs'
+    total_songs.admin_order_field = 'total_hits'
 
     def image_preview(self, obj):
         if obj.image:
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import ArtistDetailView, ArtistListView 
+from .views import ArtistDetailView, ArtistListView, ArtistStatsView
 
 urlpatterns = [
     path('', ArtistListView.as_view(), name='artist-list'),  
     path('<slug:slug>/', ArtistDetailView.as_view(), name='artist-detail'),
+    path('<slug:slug>/stats/', ArtistStatsView.as_view(), name='artist-stats'),
 ]
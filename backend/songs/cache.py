@@ -0,0 +1,116 @@
+"""
+Versioned response cache for the songs API.
+
+A cached response is stored under a key made of the view name, its normalised
+query parameters and the current version of every dependency it was built
+from. A dependency is a short name for a slice of the data:
+
+    song:<id>      one song (and what its detail payload embeds)
+    artist:<slug>  one artist, including their songs
+    tag:<slug>     one tag
+    chart:<date>   one chart week
+    songs, charts, tags, site, number-ones   whole collections
+
+Model signals (songs/signals.py) call invalidate() with the dependencies a
+write touches. That swaps in a new random version, so every key built on the
+old one is simply never read again and ages out of the cache. Inside a
+transaction the version is swapped again on commit: until then other
+connections still read the old rows, and whatever they cached from them
+under the first new version must not outlive the commit. A version that
+has been evicted is re-created with a fresh token too, so an eviction can
+never resurrect stale entries.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = 'songs-api'
+VERSION_TIMEOUT = None  # versions live until replaced (or evicted)
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def song(song_id):
+    return f'song:{song_id}'
+
+
+def artist(slug):
+    return f'artist:{slug}'
+
+
+def tag(slug):
+    return f'tag:{slug}'
+
+
+def chart(chart_date):
+    return f'chart:{chart_date}'
+
+
+def _version_key(dependency):
+    return f'{KEY_PREFIX}:v:{dependency}'
+
+
+def versions(dependencies):
+    """Current version token of each dependency, creating missing ones."""
+    keys = {dependency: _version_key(dependency) for dependency in dependencies}
+    found = cache.get_many(keys.values())
+    result = {}
+    for dependency, key in keys.items():
+        token = found.get(key)
+        if token is None:
+            token = uuid.uuid4().hex[:12]
+            # Another worker may have created it in the meantime; theirs wins
+            if not cache.add(key, token, VERSION_TIMEOUT):
+                token = cache.get(key, token)
+        result[dependency] = token
+    return result
+
+
+def invalidate(*dependencies):
+    """Give the dependencies new versions, orphaning every response built on them."""
+    dependencies = [d for d in dependencies if d]
+    if not dependencies:
+        return
+
+    def bump():
+        cache.set_many(
+            {_version_key(dependency): uuid.uuid4().hex[:12] for dependency in dependencies},
+            VERSION_TIMEOUT,
+        )
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def normalise_params(params):
+    """Sorted (name, value) pairs from a QueryDict, without empty values."""
+    return sorted(
+        (name, value)
+        for name in params
+        for value in params.getlist(name)
+        if value != ''
+    )
+
+
+def response_key(view_name, params, dependencies):
+    current = versions(dependencies)
+    parts = [view_name, repr(normalise_params(params) if params is not None else [])]
+    parts += [f'{dependency}={current[dependency]}' for dependency in sorted(current)]
+    digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:r:{view_name}:{digest}'
+
+
+def cached(view_name, params, dependencies, build, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached data for this view/params/dependency versions, or
+    build() it and store it. The data must be picklable (serializer .data,
+    plain dicts and lists).
+    """
+    key = response_key(view_name, params, dependencies)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout)
+    return data
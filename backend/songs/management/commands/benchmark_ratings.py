@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from songs.models import RatingEvent, Song, UserSongRating
+
+
+class Command(BaseCommand):
+    help = 'Compare sustained ratings/s of the synchronous rating path and the write-behind queue (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ratings', type=int, default=2000, help='Ratings to write per mode')
+        parser.add_argument('--users', type=int, default=50, help='Synthetic raters')
+        parser.add_argument('--songs', type=int, default=200, help='Songs to rate, sampled from the database')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Queue flush batch size')
+
+    def handle(self, *args, **options):
+        song_ids = list(Song.objects.values_list('id', flat=True).order_by('?')[:options['songs']])
+        if not song_ids:
+            self.stdout.write(self.style.ERROR('No songs in the database to rate.'))
+            return
+
+        for mode in ('sync', 'write-behind'):
+            # Everything is written inside a transaction that is rolled back afterwards
+            with transaction.atomic():
+                users = [
+                    User.objects.create(username=f'benchmark-rater-{i}-{random.getrandbits(32)}')
+                    for i in range(options['users'])
+                ]
+                workload = [
+                    (random.choice(users), random.choice(song_ids), random.randint(1, 10))
+                    for _ in range(options['ratings'])
+                ]
+                if mode == 'sync':
+                    self.run_sync(workload)
+                else:
+                    self.run_write_behind(workload, options['batch_size'])
+                transaction.set_rollback(True)
+
+    def run_sync(self, workload):
+        start = time.perf_counter()
+        for user, song_id, score in workload:
+            # Same statements as UserSongRatingCreateView
+            rating = UserSongRating.objects.filter(user=user, song_id=song_id).first()
+            if rating:
+                rating.score = score
+                rating.save()
+            else:
+                UserSongRating.objects.create(user=user, song_id=song_id, score=score)
+        self.report('sync', len(workload), time.perf_counter() - start)
+
+    def run_write_behind(self, workload, batch_size):
+        start = time.perf_counter()
+        for user, song_id, score in workload:
+            RatingEvent.objects.create(user=user, song_id=song_id, score=score)
+        enqueued = time.perf_counter() - start
+        while RatingEvent.flush(batch_size)[0]:
+            pass
+        total = time.perf_counter() - start
+        self.report('write-behind (request path)', len(workload), enqueued)
+        self.report('write-behind (incl. flush)', len(workload), total)
+
+    def report(self, name, count, seconds):
+        self.stdout.write(self.style.SUCCESS(
+            f'{name:<28} {count} ratings in {seconds:.2f}s = {count / seconds:,.0f} ratings/s'
+        ))
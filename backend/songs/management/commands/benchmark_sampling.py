@@ -0,0 +1,91 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Q
+
+from songs.models import Artist, Song
+from songs.sampling import SamplePools
+
+
+class Command(BaseCommand):
+    help = 'Compare random song/artist sampling and playlist generation from the in-memory id pools against the old queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help='Times each operation is executed per strategy')
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        artist_slugs = list(Artist.objects.filter(songs__isnull=False).values_list('slug', flat=True).distinct()[:500])
+        if not artist_slugs:
+            self.stdout.write(self.style.ERROR('No songs with artists in the database to sample from.'))
+            return
+
+        started = time.perf_counter()
+        pools = SamplePools.build()
+        self.stdout.write(f"Pools built in {(time.perf_counter() - started) * 1000:.0f} ms "
+                          f"({pools.size('songs')} songs, {pools.size('artist-images')} artists with images)")
+
+        decades = range(1950, datetime.datetime.now().year, 10)
+        operations = {
+            'random song': (self.old_random_song, lambda: Song.objects.filter(pk=pools.choice('songs')).first()),
+            'songs by decade': (
+                lambda: [
+                    Song.objects.filter(
+                        year__gte=decade, year__lte=decade + 9, spotify_url__isnull=False
+                    ).exclude(spotify_url='').order_by('?').first()
+                    for decade in decades
+                ],
+                lambda: Song.objects.in_bulk([pools.choice(f'spotify:{decade}') for decade in decades]),
+            ),
+            'featured artists': (
+                lambda: list(Artist.objects.exclude(image='').only('id', 'name', 'slug', 'image').order_by('?')[:25]),
+                lambda: list(Artist.objects.filter(id__in=pools.sample('artist-images', 25)).only('id', 'name', 'slug', 'image')),
+            ),
+            # The widest generator request: hit_size=10 across every decade
+            'generate 10 songs': (
+                lambda: random.sample(list(self.generator_candidates(decades)), 10),
+                lambda: Song.objects.in_bulk(pools.sample_charted(10, decades, 100, rng=random.Random(1))[0]),
+            ),
+            'song by artist': (
+                lambda: Song.objects.filter(artist_fk__slug=random.choice(artist_slugs)).order_by('?').first(),
+                lambda: Song.objects.filter(pk=pools.choice(f'artist:{random.choice(artist_slugs)}')).first(),
+            ),
+        }
+
+        for name, (old, new) in operations.items():
+            self.report(f'{name} (old)', self.time(old, runs))
+            self.report(f'{name} (pools)', self.time(new, runs))
+
+    def old_random_song(self):
+        # What RandomSongView did: probe random ids up to max(id)
+        max_id = Song.objects.aggregate(max_id=Max('id'))['max_id']
+        for _ in range(5):
+            song = Song.objects.filter(pk=random.randint(1, max_id)).first()
+            if song:
+                return song
+
+    def generator_candidates(self, decades):
+        # What PlaylistGeneratorView/QuizGeneratorView did before sampling ids
+        ranges = Q()
+        for decade in decades:
+            ranges |= Q(year__gte=decade, year__lte=decade + 9)
+        return Song.objects.filter(ranges, peak_rank__lte=100, spotify_url__isnull=False).exclude(spotify_url='')
+
+    def time(self, operation, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, name, timings):
+        if len(timings) > 1:
+            cuts = statistics.quantiles(timings, n=100)
+            p50, p99 = cuts[49], cuts[98]
+        else:
+            p50 = p99 = timings[0]
+        self.stdout.write(f'  {name:<26} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms')
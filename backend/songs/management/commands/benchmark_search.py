@@ -0,0 +1,64 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from songs.models import Song
+from songs.search import search_songs
+
+
+class Command(BaseCommand):
+    help = 'Compare p50/p99 latency of the full-text song search against the old icontains scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help='Search terms (default: sampled from song titles/artists)')
+        parser.add_argument('--samples', type=int, default=50, help='Number of queries to sample when none are given')
+        parser.add_argument('--runs', type=int, default=5, help='Times each query is executed per strategy')
+        parser.add_argument('--page-size', type=int, default=100, help='Rows fetched per query, like one API page')
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or self.sample_queries(options['samples'])
+        if not queries:
+            self.stdout.write(self.style.ERROR('No songs in the database to sample queries from.'))
+            return
+
+        self.stdout.write(f"Benchmarking {len(queries)} queries x {options['runs']} runs...")
+
+        strategies = {
+            'icontains': lambda q: Song.objects.filter(Q(title__icontains=q) | Q(artist__icontains=q)).order_by('id'),
+            'fulltext': lambda q: search_songs(Song.objects.all(), q).order_by('-search_score', 'id'),
+        }
+
+        for name, build in strategies.items():
+            timings = []
+            for _ in range(options['runs']):
+                for query in queries:
+                    start = time.perf_counter()
+                    qs = build(query)
+                    qs.count()  # the paginator always counts
+                    list(qs[:options['page_size']])
+                    timings.append((time.perf_counter() - start) * 1000)
+            self.report(name, timings)
+
+    def sample_queries(self, samples):
+        rows = list(Song.objects.values_list('title', 'artist').order_by('?')[:samples])
+        queries = []
+        for title, artist in rows:
+            words = (title if random.random() < 0.5 else artist).split()
+            if words:
+                # Prefix of the first word or two, like someone halfway through typing
+                phrase = ' '.join(words[:2])
+                queries.append(phrase[:max(3, len(phrase) - random.randint(0, 3))])
+        return queries
+
+    def report(self, name, timings):
+        if len(timings) > 1:
+            cuts = statistics.quantiles(timings, n=100)
+            p50, p99 = cuts[49], cuts[98]
+        else:
+            p50 = p99 = timings[0]
+        self.stdout.write(
+            f'  {name:<10} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms   ({len(timings)} queries)'
+        )
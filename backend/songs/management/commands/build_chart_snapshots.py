@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from songs import cache as songs_cache
+from songs.models import ChartSnapshot, SongTimeline
+
+
+class Command(BaseCommand):
+    help = 'Materialise one ChartSnapshot per chart week from SongTimeline (movement and is_new precomputed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute weeks that already have a snapshot')
+        parser.add_argument('--since', type=str, help='Only build weeks on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Snapshots written per bulk insert')
+
+    def handle(self, *args, **options):
+        rebuild = options['rebuild']
+        batch_size = options['batch_size']
+
+        weeks = SongTimeline.objects.values_list('chart_date', flat=True).distinct().order_by('chart_date')
+        if options['since']:
+            since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            weeks = weeks.filter(chart_date__gte=since)
+
+        existing = set(ChartSnapshot.objects.values_list('chart_date', flat=True))
+
+        pending = []
+        created = 0
+        rebuilt = 0
+        skipped = 0
+        for chart_date in weeks:
+            if chart_date in existing and not rebuild:
+                skipped += 1
+                continue
+
+            # The same builder the weekly ingest uses (update_current_hot100)
+            snapshot = ChartSnapshot.build_from_timeline(chart_date, save=False)
+            if chart_date in existing:
+                ChartSnapshot.objects.filter(chart_date=chart_date).update(
+                    previous_chart_date=snapshot.previous_chart_date, entries=snapshot.entries
+                )
+                rebuilt += 1
+            else:
+                pending.append(snapshot)
+
+            if len(pending) >= batch_size:
+                ChartSnapshot.objects.bulk_create(pending)
+                created += len(pending)
+                pending = []
+                self.stdout.write(f'Built {created} snapshots (up to {chart_date})...')
+
+        if pending:
+            ChartSnapshot.objects.bulk_create(pending)
+            created += len(pending)
+
+        # bulk_create and update() don't send post_save for the weeks they write
+        songs_cache.invalidate('charts', 'site')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} chart snapshots, rebuilt {rebuilt}, skipped {skipped} weeks that already had one.'
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from songs.models import QuizDistractorPool
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the quiz distractor pools (artists per decade and peak band) from Song and ArtistTagRelation'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created, updated, deleted = QuizDistractorPool.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"Quiz pools rebuilt in {time.perf_counter() - started:.1f}s: "
+            f"{created} created, {updated} updated, {deleted} removed"
+        ))
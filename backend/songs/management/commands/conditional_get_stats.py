@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from songs.views import conditional
+
+
+class Command(BaseCommand):
+    help = 'Show ETag hit/miss counters and the bytes saved by 304 responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = conditional.get_stats()
+        total_hits = total_misses = total_saved = 0
+        for view_name, counts in stats.items():
+            requests = counts['hits'] + counts['misses']
+            rate = counts['hits'] / requests * 100 if requests else 0
+            self.stdout.write(
+                f"{view_name:<24} {counts['hits']:>8} hits {counts['misses']:>8} misses "
+                f"({rate:5.1f}% 304s) {counts['bytes_saved'] / 1024:>10.1f} KiB saved"
+            )
+            total_hits += counts['hits']
+            total_misses += counts['misses']
+            total_saved += counts['bytes_saved']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {total_hits} not-modified responses, {total_misses} full responses, "
+            f"{total_saved / 1024:.1f} KiB not sent"
+        ))
+        if options['reset']:
+            conditional.reset_stats()
+            self.stdout.write('Counters reset.')
@@ -2,8 +2,10 @@ import csv
 import re
 from collections import defaultdict
 from datetime import datetime
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from songs.models import Song, SongTimeline
+from songs.utils import bulk_upsert_timeline
 import os
 
 
@@ -22,6 +24,12 @@ class Command(BaseCommand):
             default=None,
             help='Process only this number of songs (default None to process all)',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Timeline rows per bulk upsert (default 5000)',
+        )
 
     def normalize(self, text):
         if not text:
@@ -36,6 +44,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         limit = options['limit']
+        batch_size = options['batch_size']
 
         if dry_run:
             self.stdout.write('Running in dry-run mode, no changes will be saved.')
@@ -73,32 +82,43 @@ class Command(BaseCommand):
         processed_count = 0
         missing_count = 0
 
-        for idx, song in enumerate(songs, start=1):
-            key = (self.normalize(song.title), self.normalize(song.artist))
-            if key not in chart_data:
-                missing_count += 1
-                if missing_count <= 20:
-                    self.stdout.write(f'No chart data found for: {song.artist} - {song.title}')
-                elif missing_count == 21:
-                    self.stdout.write("... (more songs with no data omitted) ...")
-                continue
+        def timeline_rows():
+            nonlocal processed_count, missing_count
+            for idx, song in enumerate(songs.iterator(chunk_size=2000), start=1):
+                key = (self.normalize(song.title), self.normalize(song.artist))
+                if key not in chart_data:
+                    missing_count += 1
+                    if missing_count <= 20:
+                        self.stdout.write(f'No chart data found for: {song.artist} - {song.title}')
+                    elif missing_count == 21:
+                        self.stdout.write("... (more songs with no data omitted) ...")
+                    continue
 
-            entries = sorted(chart_data[key], key=lambda e: e['date'])
+                entries = sorted(chart_data[key], key=lambda e: e['date'])
 
-            if idx % 100 == 0 or idx == total_songs:
-                self.stdout.write(f'Processing song {idx}/{total_songs}: {song.artist} - {song.title} ({len(entries)} timeline entries)')
+                if idx % 100 == 0 or idx == total_songs:
+                    self.stdout.write(f'Processing song {idx}/{total_songs}: {song.artist} - {song.title} ({len(entries)} timeline entries)')
 
-            if not dry_run:
                 for entry in entries:
-                    SongTimeline.objects.update_or_create(
-                        song=song,
+                    yield SongTimeline(
+                        song_id=song.id,
                         chart_date=entry['date'],
-                        defaults={
-                            'rank': entry['rank'],
-                            'peak_rank': entry['peak_rank'],
-                            'weeks_on_chart': entry['weeks_on_board'],
-                        }
+                        rank=entry['rank'],
+                        peak_rank=entry['peak_rank'],
+                        weeks_on_chart=entry['weeks_on_board'],
                     )
-            processed_count += 1
+                processed_count += 1
+
+        if dry_run:
+            # Walk the songs for the report without writing anything
+            for _ in timeline_rows():
+                pass
+        else:
+            bulk_upsert_timeline(timeline_rows(), batch_size, self.stdout)
 
         self.stdout.write(self.style.SUCCESS(f'Finished processing {processed_count} songs (skipped {missing_count} without chart data).'))
+
+        if not dry_run and processed_count:
+            # Timeline rows changed across the whole history, so rebuild every week
+            self.stdout.write('Rebuilding chart snapshots...')
+            call_command('build_chart_snapshots', '--rebuild', stdout=self.stdout)
@@ -1,15 +1,25 @@
+import csv
 import json
 import requests
 import os
 import openai
+import tempfile
 from datetime import datetime
-from django.core.management.base import BaseCommand
+from itertools import islice
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils.text import slugify
 from songs.models import Song, SongTimeline
+from songs.utils import bulk_upsert_timeline, iter_json_array
 from fuzzywuzzy import fuzz
 from dotenv import load_dotenv
 
 
+# Read size for the archive (download or --file)
+CHUNK_SIZE = 1024 * 1024
+
+
 class Command(BaseCommand):
     help = 'Import Billboard Hot 100 data from 2009 onwards'
     
@@ -21,6 +31,9 @@ class Command(BaseCommand):
         parser.add_argument('--spotify', action='store_true', help='Add Spotify URLs for imported songs')
         parser.add_argument('--openai', action='store_true', help='Generate song and artist descriptions using OpenAI')
         parser.add_argument('--force-update', action='store_true', help='Force update of descriptions for songs that already have them')
+        parser.add_argument('--stream', action='store_true', help='Parse the archive incrementally and write timeline rows in batches (bounded memory)')
+        parser.add_argument('--file', type=str, help='Read the archive from a local all.json instead of downloading it')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Timeline rows per bulk upsert (default: 5000)')
     
     def handle(self, *args, **options):
         dry_run = options['dry_run']
@@ -50,6 +63,16 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR("OpenAI API key not found in environment variables. Disabling OpenAI integration."))
                 add_openai = False
         
+        stream = options['stream']
+        batch_size = options['batch_size']
+        
+        if options['file']:
+            self.stdout.write(f"Reading data from {options['file']}...")
+            with open(options['file'], 'rb') as archive:
+                chunks = iter(lambda: archive.read(CHUNK_SIZE), b'')
+                self.process_data(chunks, dry_run, do_import, limit, start_year, add_spotify, add_openai, force_update, stream, batch_size)
+            return
+        
         # URL for the Billboard Hot 100 data
         url = "https://raw.githubusercontent.com/mhollingshead/billboard-hot-100/main/all.json"
         
@@ -59,63 +82,85 @@ class Command(BaseCommand):
             response.raise_for_status()  # Raise an exception for HTTP errors
             
             # Process the data
-            self.process_data(response, dry_run, do_import, limit, start_year, add_spotify, add_openai, force_update)
+            chunks = (chunk for chunk in response.iter_content(chunk_size=CHUNK_SIZE) if chunk)
+            self.process_data(chunks, dry_run, do_import, limit, start_year, add_spotify, add_openai, force_update, stream, batch_size)
             
         except requests.exceptions.RequestException as e:
             self.stdout.write(self.style.ERROR(f"Error fetching data: {e}"))
     
-    def process_data(self, response, dry_run, do_import, limit, start_year, add_spotify, add_openai, force_update):
-        """Process the Billboard Hot 100 data."""
+    def filter_weeks(self, all_weeks, start_year):
+        """Yield weeks from start_year onwards with their parsed chart date."""
+        for week_data in all_weeks:
+            date_str = week_data.get('date')
+            if not date_str:
+                continue
+            
+            try:
+                date = datetime.strptime(date_str, '%Y-%m-%d')
+            except ValueError:
+                self.stdout.write(self.style.WARNING(f"Invalid date format: {date_str}"))
+                continue
+            if date.year >= start_year:
+                yield date, week_data
+    
+    def entry_int(self, entry, field, date):
+        """An integer field of a chart entry (None when missing), or a CommandError naming it."""
+        value = entry.get(field)
+        if value is None or value == '':
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise CommandError(
+                f"Invalid {field} {value!r} for '{entry.get('song')}' by {entry.get('artist')} "
+                f"in the {date:%Y-%m-%d} chart"
+            ) from None
+
+    def process_data(self, chunks, dry_run, do_import, limit, start_year, add_spotify, add_openai, force_update, stream=False, batch_size=5000):
+        """
+        Process the Billboard Hot 100 data from an iterable of byte chunks.
+        
+        With stream=True weeks are parsed one at a time and folded into per-song
+        aggregates; timeline entries go to a temporary spool file instead of memory
+        and are written in batches once the songs exist.
+        """
         self.stdout.write("Processing data...")
         
         # Dictionary to track unique songs
         unique_songs = {}
         
-        # Dictionary to store timeline data for each song
+        # Dictionary to store timeline data for each song (spool file in stream mode)
         song_timeline_data = {}
+        timeline_spool = tempfile.TemporaryFile(mode='w+', newline='') if stream else None
+        spool_writer = csv.writer(timeline_spool) if stream else None
+        first_chart_date = None
         
         # Load and parse the JSON data
         try:
-            # Read the response content in chunks to avoid memory issues
-            chunks = []
-            for chunk in response.iter_content(chunk_size=1024*1024):  # 1MB chunks
-                if chunk:
-                    chunks.append(chunk)
-            
-            data_str = b''.join(chunks).decode('utf-8')
-            all_weeks = json.loads(data_str)
-            
-            self.stdout.write(f"Successfully loaded JSON data. Processing {len(all_weeks)} weeks...")
+            if stream:
+                all_weeks = iter_json_array(chunks)
+                self.stdout.write("Streaming JSON data week by week...")
+            else:
+                data_str = b''.join(chunks).decode('utf-8')
+                all_weeks = json.loads(data_str)
+                self.stdout.write(f"Successfully loaded JSON data. Processing {len(all_weeks)} weeks...")
             
             # Filter weeks by year before applying limit
-            filtered_weeks = []
-            for week_data in all_weeks:
-                date_str = week_data.get('date')
-                if not date_str:
-                    continue
-                
-                try:
-                    date = datetime.strptime(date_str, '%Y-%m-%d')
-                    if date.year >= start_year:
-                        filtered_weeks.append(week_data)
-                except ValueError:
-                    self.stdout.write(self.style.WARNING(f"Invalid date format: {date_str}"))
-            
-            self.stdout.write(f"Filtered to {len(filtered_weeks)} weeks from {start_year} onwards")
+            filtered_weeks = self.filter_weeks(all_weeks, start_year)
+            self.stdout.write(f"Using weeks from {start_year} onwards")
             
             # Apply limit if specified
             if limit:
-                filtered_weeks = filtered_weeks[:limit]
+                filtered_weeks = islice(filtered_weeks, limit)
                 self.stdout.write(f"Limited to {limit} weeks for testing")
             
             # Process each week
             weeks_processed = 0
             songs_found = 0
             
-            for week_data in filtered_weeks:
-                # Parse the date and process this week's chart
-                date_str = week_data.get('date')
-                date = datetime.strptime(date_str, '%Y-%m-%d')
+            for date, week_data in filtered_weeks:
+                if first_chart_date is None:
+                    first_chart_date = date.date()
                 
                 # Process this week's chart
                 chart_data = week_data.get('data', [])
@@ -125,9 +170,9 @@ class Command(BaseCommand):
                     # Extract song data
                     title = entry.get('song', '')
                     artist = entry.get('artist', '')
-                    this_week = entry.get('this_week')
-                    peak_position = entry.get('peak_position')
-                    weeks_on_chart = entry.get('weeks_on_chart')
+                    this_week = self.entry_int(entry, 'this_week', date)
+                    peak_position = self.entry_int(entry, 'peak_position', date)
+                    weeks_on_chart = self.entry_int(entry, 'weeks_on_chart', date)
                     
                     # Skip if missing essential data
                     if not title or not artist or peak_position is None:
@@ -156,6 +201,13 @@ class Command(BaseCommand):
                         }
                     
                     # Store timeline entry for this song
+                    if stream:
+                        spool_writer.writerow([
+                            song_key, date.date().isoformat(), this_week if this_week else peak_position,
+                            peak_position, weeks_on_chart if weeks_on_chart is not None else '',
+                        ])
+                        continue
+                    
                     if song_key not in song_timeline_data:
                         song_timeline_data[song_key] = []
                     
@@ -179,12 +231,62 @@ class Command(BaseCommand):
             if dry_run:
                 self.preview_data(unique_songs)
             elif do_import:
-                self.import_data(unique_songs, song_timeline_data, add_spotify, add_openai, force_update)
-        
-        except json.JSONDecodeError as e:
-            self.stdout.write(self.style.ERROR(f"Error parsing JSON: {e}"))
+                self.import_data(unique_songs, song_timeline_data, add_spotify, add_openai, force_update, batch_size)
+                if stream:
+                    timeline_spool.seek(0)
+                    self.import_timeline_spool(timeline_spool, unique_songs, batch_size)
+                
+                # Refresh the chart snapshots (and with them the chart_dates index) for the imported weeks
+                if first_chart_date:
+                    self.stdout.write("Rebuilding chart snapshots...")
+                    call_command('build_chart_snapshots', '--rebuild', '--since', str(first_chart_date), stdout=self.stdout)
+        
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # A truncated or malformed archive must fail the run, not just log
+            raise CommandError(f"Error parsing JSON: {e}") from e
+        except CommandError:
+            raise
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Unexpected error: {e}"))
+            raise CommandError(f"Unexpected error: {e}") from e
+        finally:
+            if timeline_spool:
+                timeline_spool.close()
+    
+    def import_timeline_spool(self, spool, unique_songs, batch_size):
+        """Write spooled timeline entries (see process_data) in bulk upsert batches."""
+        self.stdout.write("\n=== IMPORTING TIMELINE ===\n")
+        
+        # song_key -> Song id, resolved by slug like import_data does
+        slugs = {song_key: slugify(f"{data['artist']} {data['title']}") for song_key, data in unique_songs.items()}
+        slug_ids = {}
+        slug_list = list(set(slugs.values()))
+        for start in range(0, len(slug_list), 1000):
+            slug_ids.update(Song.objects.filter(slug__in=slug_list[start:start + 1000]).values_list('slug', 'id'))
+        song_ids = {song_key: slug_ids.get(slug) for song_key, slug in slugs.items()}
+        del slugs, slug_ids, slug_list
+        
+        skipped = 0
+        
+        def timeline_rows():
+            nonlocal skipped
+            for song_key, chart_date, rank, peak_rank, weeks_on_chart in csv.reader(spool):
+                song_id = song_ids.get(song_key)
+                if song_id is None:
+                    skipped += 1
+                    continue
+                yield SongTimeline(
+                    song_id=song_id,
+                    chart_date=chart_date,
+                    rank=int(rank),
+                    peak_rank=int(peak_rank),
+                    weeks_on_chart=int(weeks_on_chart) if weeks_on_chart else None,
+                )
+        
+        written = bulk_upsert_timeline(timeline_rows(), batch_size, self.stdout)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} timeline entries. Skipped {skipped} entries for songs that weren't imported."
+        ))
     
     def preview_data(self, unique_songs):
         """Display a preview of the data that would be imported."""
@@ -378,7 +480,7 @@ class Command(BaseCommand):
                 return f"""<strong>Artist Bio:</strong><br>
 <p>Information about {artist} is currently unavailable.</p>"""
     
-    def import_data(self, unique_songs, song_timeline_data, add_spotify=False, add_openai=False, force_update=False):
+    def import_data(self, unique_songs, song_timeline_data, add_spotify=False, add_openai=False, force_update=False, batch_size=5000):
         """Import the processed data into the database."""
         self.stdout.write("\n=== IMPORTING DATA ===\n")
         
@@ -403,12 +505,10 @@ class Command(BaseCommand):
         songs_updated = 0
         spotify_urls_added = 0
         descriptions_added = 0
-        timeline_entries_created = 0
-        timeline_entries_updated = 0
+        song_ids = {}  # song_key -> Song id, for the timeline upsert
         
         for song_key, song_data in unique_songs.items():
             # Generate the slug manually
-            from django.utils.text import slugify
             slug = slugify(f"{song_data['artist']} {song_data['title']}")
             artist_slug = slugify(song_data['artist'])
             
@@ -471,32 +571,8 @@ class Command(BaseCommand):
                         songs_updated += 1
                         self.stdout.write(f"Updated existing song: '{song_data['title']}' by {song_data['artist']}")
                 
-                # Update or create timeline entries for existing song
-                if song_key in song_timeline_data:
-                    for timeline_entry in song_timeline_data[song_key]:
-                        timeline_obj, created = SongTimeline.objects.get_or_create(
-                            song=existing_song,
-                            chart_date=timeline_entry['chart_date'],
-                            defaults={
-                                'rank': timeline_entry['rank'],
-                                'peak_rank': timeline_entry['peak_rank'],
-                                'weeks_on_chart': timeline_entry['weeks_on_chart']
-                            }
-                        )
-                        if created:
-                            timeline_entries_created += 1
-                        else:
-                            # Update if rank changed
-                            entry_updated = False
-                            if timeline_obj.rank != timeline_entry['rank']:
-                                timeline_obj.rank = timeline_entry['rank']
-                                entry_updated = True
-                            if timeline_obj.weeks_on_chart != timeline_entry['weeks_on_chart']:
-                                timeline_obj.weeks_on_chart = timeline_entry['weeks_on_chart']
-                                entry_updated = True
-                            if entry_updated:
-                                timeline_obj.save()
-                                timeline_entries_updated += 1
+                # Timeline entries for existing songs are upserted in bulk below
+                song_ids[song_key] = existing_song.id
                 
                 songs_skipped += 1
                 if songs_skipped % 100 == 0:
@@ -541,27 +617,29 @@ class Command(BaseCommand):
                         review=description
                     )
                     songs_created += 1
-                    
-                    # Create timeline entries for new song
-                    if song_key in song_timeline_data:
-                        for timeline_entry in song_timeline_data[song_key]:
-                            SongTimeline.objects.create(
-                                song=new_song,
-                                chart_date=timeline_entry['chart_date'],
-                                rank=timeline_entry['rank'],
-                                peak_rank=timeline_entry['peak_rank'],
-                                weeks_on_chart=timeline_entry['weeks_on_chart']
-                            )
-                            timeline_entries_created += 1
+                    song_ids[song_key] = new_song.id
                 
                 if songs_created % 100 == 0:
                     self.stdout.write(f"Created {songs_created} new songs...")
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"Error creating song: {e}"))
         
+        # Write all timeline entries for the imported songs in bulk batches
+        timeline_rows = (
+            SongTimeline(
+                song_id=song_ids[song_key],
+                chart_date=timeline_entry['chart_date'],
+                rank=timeline_entry['rank'],
+                peak_rank=timeline_entry['peak_rank'],
+                weeks_on_chart=timeline_entry['weeks_on_chart']
+            )
+            for song_key, entries in song_timeline_data.items() if song_key in song_ids
+            for timeline_entry in entries
+        )
+        timeline_entries_written = bulk_upsert_timeline(timeline_rows, batch_size, self.stdout)
+        
         # Report final counts
         new_count = Song.objects.count()
-        imported_count = new_count - existing_count
         
         self.stdout.write(self.style.SUCCESS(
             f"Successfully imported {songs_created} new songs. "
@@ -571,8 +649,7 @@ class Command(BaseCommand):
         ))
         
         self.stdout.write(self.style.SUCCESS(
-            f"Created {timeline_entries_created} timeline entries. "
-            f"Updated {timeline_entries_updated} existing timeline entries."
+            f"Created or updated {timeline_entries_written} timeline entries."
         ))
         
         if add_spotify:
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Count
+from django.utils import timezone
 from songs.models import Song, Artist
 
 
@@ -42,6 +43,7 @@ class Command(BaseCommand):
         
         linked_count = 0
         created_count = 0
+        linked_artist_ids = set()
         no_match_artists = set()  # Track unique unmatched artists
         
         # Get all unlinked songs grouped by artist for efficiency
@@ -72,15 +74,20 @@ class Command(BaseCommand):
                 updated = Song.objects.filter(
                     artist=artist_name,
                     artist_fk__isnull=True
-                ).update(artist_fk=artist_obj)
+                ).update(artist_fk=artist_obj, updated_at=timezone.now())
                 
                 linked_count += updated
+                if updated:
+                    linked_artist_ids.add(artist_obj.id)
                 
                 if linked_count % 1000 == 0:
                     self.stdout.write(f'  Linked {linked_count} songs...')
             else:
                 no_match_artists.add(artist_name)
         
+        # The queryset update skips the Song signals that maintain the artist chart totals
+        Artist.refresh_stats(linked_artist_ids)
+        
         # Summary
         self.stdout.write('\n' + '='*50)
         self.stdout.write(
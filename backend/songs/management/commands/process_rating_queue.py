@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from songs.models import RatingEvent
+
+
+class Command(BaseCommand):
+    help = 'Apply queued ratings (RATING_WRITE_BEHIND) to UserSongRating, song aggregates and user points'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events applied per transaction')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit (e.g. from cron)')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        batch_size = options['batch_size']
+
+        self.stdout.write(f"Processing rating queue every {interval}s (batches of {batch_size})...")
+        try:
+            while True:
+                processed = self.drain(batch_size)
+                if options['once']:
+                    self.stdout.write(self.style.SUCCESS(f'Applied {processed} queued ratings'))
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def drain(self, batch_size):
+        total = 0
+        while True:
+            events, songs, users = RatingEvent.flush(batch_size)
+            if not events:
+                return total
+            total += events
+            self.stdout.write(f'Applied {events} ratings ({songs} songs, {users} users)')
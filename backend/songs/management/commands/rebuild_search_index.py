@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from songs import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text song search index (FULLTEXT on MySQL, FTS5 on SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='MySQL only: run OPTIMIZE TABLE on songs (locks the table; maintenance windows only)',
+        )
+
+    def handle(self, *args, **options):
+        if not search.backend_supports_search():
+            self.stdout.write(self.style.WARNING(
+                f'No full-text index for the {connection.vendor} backend; search uses icontains.'
+            ))
+            return
+
+        self.stdout.write(f'Rebuilding search index on {connection.vendor}...')
+        count = search.rebuild_index(optimize=options['optimize'])
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt for {count} songs'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from songs import cache as songs_cache
+from songs.models import SiteCounters
+
+
+class Command(BaseCommand):
+    help = 'Recount the website stats counters (SiteCounters) from the tables and correct any drift'
+
+    def handle(self, *args, **options):
+        counters, drift = SiteCounters.reconcile()
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('✅ Site counters match the tables'))
+            return
+
+        for field, (stored, actual) in drift.items():
+            self.stdout.write(f"Drift on {field}: {stored} -> {actual}")
+        songs_cache.invalidate('site')
+        self.stdout.write(self.style.WARNING(f'Corrected {len(drift)} drifted counters'))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from songs.models import Song, UserSongRating
+
+
+class Command(BaseCommand):
+    help = 'Recompute song rating aggregates from UserSongRating and report (or fix) drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write the recomputed aggregates back to drifted songs')
+
+    def handle(self, *args, **options):
+        fix = options['fix']
+
+        actual = {
+            row['song_id']: (row['count'], row['total'] or 0)
+            for row in UserSongRating.objects.values('song_id').annotate(
+                count=Count('id', filter=Q(score__gt=0)), total=Sum('score')
+            )
+        }
+
+        # Songs with stored aggregates or with ratings; everything else is already 0/0
+        stored = Song.objects.filter(
+            Q(total_ratings__gt=0) | Q(rating_sum__gt=0) | Q(average_user_score__gt=0) | Q(id__in=list(actual))
+        ).only('id', 'title', 'artist', 'total_ratings', 'rating_sum', 'average_user_score')
+
+        drifted = []
+        for song in stored.iterator(chunk_size=2000):
+            count, total = actual.get(song.id, (0, 0))
+            average = round(total / count, 1) if count else 0.0
+            if (song.total_ratings, song.rating_sum, song.average_user_score) != (count, total, average):
+                if len(drifted) < 20:
+                    self.stdout.write(
+                        f"Drift on '{song.title}' by {song.artist}: "
+                        f"ratings {song.total_ratings} -> {count}, sum {song.rating_sum} -> {total}, "
+                        f"average {song.average_user_score} -> {average}"
+                    )
+                song.total_ratings, song.rating_sum, song.average_user_score = count, total, average
+                song.updated_at = timezone.now()
+                drifted.append(song)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('✅ All song rating aggregates match UserSongRating'))
+            return
+
+        if fix:
+            Song.objects.bulk_update(
+                drifted, ['total_ratings', 'rating_sum', 'average_user_score', 'updated_at'], batch_size=1000
+            )
+            self.stdout.write(self.style.SUCCESS(f'Fixed rating aggregates on {len(drifted)} songs'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} songs have drifted. Run with --fix to correct them.'))
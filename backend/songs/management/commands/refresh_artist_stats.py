@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from songs.models import Artist
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored chart totals (total_hits, best_peak, ...) of every artist from their songs'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changed = Artist.refresh_stats()
+        if changed:
+            self.stdout.write(self.style.WARNING(
+                f'Corrected chart totals on {changed} artists in {time.perf_counter() - started:.1f}s'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ All artist chart totals match their songs'))
@@ -2,13 +2,20 @@ import requests
 import os
 import re
 import subprocess
+import time
 from bs4 import BeautifulSoup
 from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.management import call_command
-from songs.models import Song, NumberOneSong, CurrentHot100
+from songs import cache as songs_cache, sampling, search, suggest
+from songs.models import (
+    Song, Artist, NumberOneSong, CurrentHot100, ChartSnapshot, SiteCounters, QuizDistractorPool, SongTimeline,
+)
+from songs.utils import bulk_upsert_timeline
 from fuzzywuzzy import fuzz
 
 class Command(BaseCommand):
@@ -619,9 +626,41 @@ class Command(BaseCommand):
         
         self.stdout.write("\n=== ENHANCEMENT TEST COMPLETED ===\n")
     
+    def resolve_chart_songs(self, songs):
+        """
+        Match scraped chart entries to existing Song rows in two queries:
+        by slug, then by title/artist for whatever the slug lookup missed.
+        Returns {slug: Song}.
+        """
+        keyed = {slugify(f"{song_data['artist']} {song_data['title']}"): song_data for song_data in songs}
+
+        found = {song.slug: song for song in Song.objects.filter(slug__in=list(keyed))}
+
+        missing = {slug: song_data for slug, song_data in keyed.items() if slug not in found}
+        if missing:
+            lookup = Q()
+            for song_data in missing.values():
+                lookup |= Q(title__iexact=song_data['title'], artist__iexact=song_data['artist'])
+            exact_names = {(song_data['title'], song_data['artist']) for song_data in missing.values()}
+            by_name = {}
+            for song in Song.objects.filter(lookup).order_by('id'):
+                key = (song.title.lower(), song.artist.lower())
+                current = by_name.get(key)
+                # Prefer an exact-case match over a case-insensitive one
+                if current is None or (
+                    (song.title, song.artist) in exact_names and (current.title, current.artist) not in exact_names
+                ):
+                    by_name[key] = song
+            for slug, song_data in missing.items():
+                song = by_name.get((song_data['title'].lower(), song_data['artist'].lower()))
+                if song:
+                    found[slug] = song
+        return found
+
     def update_database(self, chart_data):
         """Update the database with the chart data."""
         self.stdout.write("\n=== UPDATING DATABASE ===\n")
+        started = time.perf_counter()
         
         songs = chart_data['songs']
         chart_date = chart_data['chart_date']
@@ -629,22 +668,17 @@ class Command(BaseCommand):
         
         self.stdout.write(f"Processing {len(songs)} songs from chart dated {chart_date}")
         
-        songs_created = 0
-        songs_updated = 0
+        existing = self.resolve_chart_songs(songs)
+        
         songs_skipped = 0
-        updated_song_ids = []  # Track IDs of created/updated songs
+        to_update = {}
+        to_create = {}
         
         for song_data in songs:
             # Generate the slug
             slug = slugify(f"{song_data['artist']} {song_data['title']}")
             artist_slug = slugify(song_data['artist'])
-            
-            # Check if a song with this slug already exists
-            existing_song = Song.objects.filter(slug=slug).first()
-            
-            # Also try checking by title and artist directly
-            if not existing_song:
-                existing_song = Song.objects.filter(title=song_data['title'], artist=song_data['artist']).first()
+            existing_song = existing.get(slug)
             
             if existing_song:
                 # If the song exists, check if we need to update its peak position or weeks on chart
@@ -661,56 +695,65 @@ class Command(BaseCommand):
                     updated = True
                 
                 if updated:
-                    with transaction.atomic():
-                        existing_song.save()
-                        songs_updated += 1
-                        updated_song_ids.append(existing_song.id)  # Add to list of updated songs
-                        self.stdout.write(f"Updated existing song: '{song_data['title']}' by {song_data['artist']}")
+                    to_update[existing_song.id] = existing_song
+                    self.stdout.write(f"Updated existing song: '{song_data['title']}' by {song_data['artist']}")
                 else:
                     songs_skipped += 1
                     # Add debug info for skipped songs
                     if songs_skipped <= 5:  # Only show first 5 to avoid flooding the output
                         self.stdout.write(f"Skipped existing song: '{song_data['title']}' by {song_data['artist']} (slug: {slug})")
-            else:
-                # Create the song
-                try:
-                    # Double-check that the song doesn't exist
-                    count = Song.objects.filter(
-                        title__iexact=song_data['title'],
-                        artist__iexact=song_data['artist']
-                    ).count()
-                    
-                    if count > 0:
-                        self.stdout.write(self.style.WARNING(
-                            f"Found {count} songs with title='{song_data['title']}', artist='{song_data['artist']}' "
-                            f"but slug '{slug}' not found. Skipping to avoid duplicates."
-                        ))
-                        songs_skipped += 1
-                    else:
-                        with transaction.atomic():
-                            new_song = Song.objects.create(
-                                title=song_data['title'],
-                                artist=song_data['artist'],
-                                year=chart_year,
-                                peak_rank=song_data['peak_rank'],
-                                weeks_on_chart=song_data['weeks_on_chart'],
-                                slug=slug,
-                                artist_slug=artist_slug
-                            )
-                            songs_created += 1
-                            updated_song_ids.append(new_song.id)  # Add to list of created songs
-                            self.stdout.write(f"Created new song: '{song_data['title']}' by {song_data['artist']}")
-                except Exception as e:
-                    self.stdout.write(self.style.WARNING(f"Error creating song: {e}"))
+            elif slug not in to_create:
+                # bulk_create skips Song.save(), so the slugs are set here
+                to_create[slug] = Song(
+                    title=song_data['title'],
+                    artist=song_data['artist'],
+                    year=chart_year,
+                    peak_rank=song_data['peak_rank'],
+                    weeks_on_chart=song_data['weeks_on_chart'],
+                    slug=slug,
+                    artist_slug=artist_slug
+                )
+                self.stdout.write(f"Created new song: '{song_data['title']}' by {song_data['artist']}")
+        
+        # Artist credits that don't exist yet, for the site counters
+        new_artists = {song.artist for song in to_create.values()}
+        new_artists -= set(Song.objects.filter(artist__in=new_artists).values_list('artist', flat=True))
+        
+        with transaction.atomic():
+            if to_update:
+                # bulk_update doesn't apply auto_now, so stamp updated_at ourselves
+                now = timezone.now()
+                for song in to_update.values():
+                    song.updated_at = now
+                Song.objects.bulk_update(to_update.values(), ['peak_rank', 'weeks_on_chart', 'updated_at'])
+            if to_create:
+                # A song created by someone else since resolve_chart_songs() is left alone
+                Song.objects.bulk_create(to_create.values(), ignore_conflicts=True)
+        
+        # MySQL doesn't return ids from bulk_create
+        created_ids = list(Song.objects.filter(slug__in=list(to_create)).values_list('id', flat=True))
+        search.index_songs(created_ids)
+        if to_create or to_update:
+            # The bulk writes skip the Song signals that invalidate cached responses
+            # and maintain the site counters
+            songs_cache.invalidate('songs', 'site', sampling.CACHE_DEPENDENCY, suggest.CACHE_DEPENDENCY)
+            SiteCounters.adjust(song_count=len(created_ids), artist_count=len(new_artists))
+            # ...and the artist chart totals (new songs get theirs when they're linked)
+            Artist.refresh_stats({song.artist_fk_id for song in to_update.values()})
+        
+        songs_created = len(created_ids)
+        songs_updated = len(to_update)
+        updated_song_ids = list(to_update) + created_ids  # Track IDs of created/updated songs
         
         self.stdout.write(self.style.SUCCESS(
-            f"Successfully processed {len(songs)} songs. "
+            f"Successfully processed {len(songs)} songs in {time.perf_counter() - started:.2f}s. "
             f"Created {songs_created} new songs. "
             f"Updated {songs_updated} existing songs. "
             f"Skipped {songs_skipped} unchanged songs."
         ))
         
         # If we created or updated any songs, run the additional scripts
+        # (Spotify/OpenAI calls, deliberately outside any transaction)
         if songs_created > 0 or songs_updated > 0:
             self.run_additional_scripts(chart_date, updated_song_ids)
         
@@ -718,6 +761,10 @@ class Command(BaseCommand):
         if any(song['peak_rank'] == 1 for song in songs):
             self.stdout.write("Updating NumberOneSong model...")
             self.update_number_one_songs()
+        
+        # New songs and peaks move artists between quiz distractor pools
+        created, updated, deleted = QuizDistractorPool.refresh()
+        self.stdout.write(f"Quiz pools: {created} created, {updated} updated, {deleted} removed")
             
         # Update CurrentHot100 model with the latest chart data
         self.stdout.write("Updating CurrentHot100 model...")
@@ -946,41 +993,10 @@ class Command(BaseCommand):
     
     def update_number_one_songs(self):
         """Update the NumberOneSong model with any new #1 hits."""
-        # Clear existing entries
-        self.stdout.write('Clearing existing NumberOneSong entries...')
-        NumberOneSong.objects.all().delete()
-        
-        # Fetch all songs that reached #1
-        number_one_songs = Song.objects.filter(peak_rank=1).order_by('-year')
-        total_songs = number_one_songs.count()
-        
-        self.stdout.write(f'Found {total_songs} number one songs to process...')
-        
-        # Create new NumberOneSong entries
-        created_count = 0
-        for song in number_one_songs:
-            try:
-                with transaction.atomic():
-                    NumberOneSong.objects.create(
-                        title=song.title,
-                        artist=song.artist,
-                        year=song.year,
-                        peak_rank=song.peak_rank,
-                        weeks_on_chart=song.weeks_on_chart,
-                        average_user_score=song.average_user_score,
-                        total_ratings=song.total_ratings,
-                        spotify_url=song.spotify_url,
-                        youtube_url=song.youtube_url,
-                        slug=song.slug,
-                        artist_slug=song.artist_slug
-                    )
-                    created_count += 1
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f"Error creating NumberOneSong for '{song.title}' by {song.artist}: {e}"))
-        
+        created, updated, deleted = NumberOneSong.sync_from_songs()
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully populated NumberOneSong table with {created_count} songs'
+                f'NumberOneSong table in sync: {created} added, {updated} updated, {deleted} removed'
             )
         )
         
@@ -988,110 +1004,94 @@ class Command(BaseCommand):
         """Update the CurrentHot100 model with the latest chart data."""
         self.stdout.write("\n=== UPDATING CURRENT HOT 100 TABLE ===\n")
         
-        # Clear existing entries
-        self.stdout.write('Clearing existing CurrentHot100 entries...')
-        CurrentHot100.objects.all().delete()
-        
         songs = chart_data['songs']
         chart_date = chart_data['chart_date']
         chart_year = int(chart_date.split('-')[0])
+        chart_date_obj = datetime.strptime(chart_date, '%Y-%m-%d').date()
         
         self.stdout.write(f"Processing {len(songs)} songs from chart dated {chart_date}")
         
-        created_count = 0
+        # Find the corresponding Song objects to get ratings, URLs, and accurate historical data
+        existing = self.resolve_chart_songs(songs)
+        
+        rows = []
         
         for song_data in songs:
-            try:
-                # Generate the slug
-                slug = slugify(f"{song_data['artist']} {song_data['title']}")
-                artist_slug = slugify(song_data['artist'])
-                
-                # Find the corresponding Song object to get ratings, URLs, and accurate historical data
-                song = Song.objects.filter(slug=slug).first()
-                if not song:
-                    song = Song.objects.filter(title=song_data['title'], artist=song_data['artist']).first()
-                
-                # Debug output for specific songs
-                if song_data['title'] == 'Nokia' and song_data['artist'] == 'Drake':
-                    self.stdout.write(f"DEBUG: Processing Drake - Nokia")
-                    self.stdout.write(f"DEBUG: Slug: {slug}")
-                    self.stdout.write(f"DEBUG: Found in database: {song is not None}")
-                    if song:
-                        self.stdout.write(f"DEBUG: Database weeks_on_chart: {song.weeks_on_chart}")
-                        self.stdout.write(f"DEBUG: Database peak_rank: {song.peak_rank}")
-                    self.stdout.write(f"DEBUG: Scraped weeks_on_chart: {song_data['weeks_on_chart']}")
-                    self.stdout.write(f"DEBUG: Scraped peak_rank: {song_data['peak_rank']}")
-                    self.stdout.write(f"DEBUG: Last week rank: {song_data['last_week_rank']}")
-                    self.stdout.write(f"DEBUG: Current rank: {song_data['rank']}")
-                elif song_data['title'] == 'Caramel' and song_data['artist'] == 'Sleep Token':
-                    self.stdout.write(f"DEBUG: Processing Sleep Token - Caramel")
-                    self.stdout.write(f"DEBUG: Slug: {slug}")
-                    self.stdout.write(f"DEBUG: Found in database: {song is not None}")
-                    if song:
-                        self.stdout.write(f"DEBUG: Database weeks_on_chart: {song.weeks_on_chart}")
-                        self.stdout.write(f"DEBUG: Database peak_rank: {song.peak_rank}")
-                    self.stdout.write(f"DEBUG: Scraped weeks_on_chart: {song_data['weeks_on_chart']}")
-                    self.stdout.write(f"DEBUG: Scraped peak_rank: {song_data['peak_rank']}")
-                    self.stdout.write(f"DEBUG: Last week rank: {song_data['last_week_rank']}")
-                    self.stdout.write(f"DEBUG: Current rank: {song_data['rank']}")
-                elif song_data['title'] == 'Dangerous' and song_data['artist'] == 'Sleep Token':
-                    self.stdout.write(f"DEBUG: Processing Sleep Token - Dangerous")
-                    self.stdout.write(f"DEBUG: Slug: {slug}")
-                    self.stdout.write(f"DEBUG: Found in database: {song is not None}")
-                    if song:
-                        self.stdout.write(f"DEBUG: Database weeks_on_chart: {song.weeks_on_chart}")
-                        self.stdout.write(f"DEBUG: Database peak_rank: {song.peak_rank}")
-                    self.stdout.write(f"DEBUG: Scraped weeks_on_chart: {song_data['weeks_on_chart']}")
-                    self.stdout.write(f"DEBUG: Scraped peak_rank: {song_data['peak_rank']}")
-                    self.stdout.write(f"DEBUG: Last week rank: {song_data['last_week_rank']}")
-                    self.stdout.write(f"DEBUG: Current rank: {song_data['rank']}")
-                
-                # Calculate position change
-                position_change = None
-                if song_data['last_week_rank'] is not None:
-                    position_change = song_data['last_week_rank'] - song_data['rank']
-                
-                # Always use the scraped data from Billboard for peak rank and weeks on chart
-                peak_rank = song_data['peak_rank']
-                weeks_on_chart = song_data['weeks_on_chart']
-                
-                if song:
-                    # Always use the scraped data from Billboard for peak rank and weeks on chart
-                    # Only use the database for supplementary information like ratings and URLs
-                    
-                    # Debug output for all songs
-                    if song_data['rank'] <= 10:  # Only debug the top 10 songs to avoid too much output
-                        self.stdout.write(f"DEBUG: Song #{song_data['rank']}: {song_data['title']} by {song_data['artist']}")
-                        self.stdout.write(f"DEBUG: Billboard peak_rank: {peak_rank}")
-                        self.stdout.write(f"DEBUG: Billboard weeks_on_chart: {weeks_on_chart}")
-                
-                # Create CurrentHot100 entry
-                with transaction.atomic():
-                    CurrentHot100.objects.create(
-                        title=song_data['title'],
-                        artist=song_data['artist'],
-                        year=chart_year,
-                        peak_rank=peak_rank,
-                        weeks_on_chart=weeks_on_chart,
-                        current_position=song_data['rank'],
-                        last_week_position=song_data['last_week_rank'],
-                        position_change=position_change,
-                        average_user_score=song.average_user_score if song else 0.0,
-                        total_ratings=song.total_ratings if song else 0,
-                        spotify_url=song.spotify_url if song else None,
-                        youtube_url=song.youtube_url if song else None,
-                        slug=slug,
-                        artist_slug=artist_slug,
-                        chart_date=datetime.strptime(chart_date, '%Y-%m-%d').date()
-                    )
-                    created_count += 1
-                    if created_count <= 5:  # Only show first 5 to avoid flooding the output
-                        self.stdout.write(f"Added to CurrentHot100: #{song_data['rank']} '{song_data['title']}' by {song_data['artist']}")
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f"Error creating CurrentHot100 entry for '{song_data['title']}' by {song_data['artist']}: {e}"))
+            # Generate the slug
+            slug = slugify(f"{song_data['artist']} {song_data['title']}")
+            artist_slug = slugify(song_data['artist'])
+            song = existing.get(slug)
+            
+            # Calculate position change
+            position_change = None
+            if song_data['last_week_rank'] is not None:
+                position_change = song_data['last_week_rank'] - song_data['rank']
+            
+            # Always use the scraped data from Billboard for peak rank and weeks on chart
+            # Only use the database for supplementary information like ratings and URLs
+            peak_rank = song_data['peak_rank']
+            weeks_on_chart = song_data['weeks_on_chart']
+            
+            rows.append(CurrentHot100(
+                title=song_data['title'],
+                artist=song_data['artist'],
+                year=chart_year,
+                peak_rank=peak_rank,
+                weeks_on_chart=weeks_on_chart,
+                current_position=song_data['rank'],
+                last_week_position=song_data['last_week_rank'],
+                position_change=position_change,
+                average_user_score=song.average_user_score if song else 0.0,
+                total_ratings=song.total_ratings if song else 0,
+                spotify_url=song.spotify_url if song else None,
+                youtube_url=song.youtube_url if song else None,
+                slug=slug,
+                artist_slug=artist_slug,
+                chart_date=chart_date_obj
+            ))
+            if len(rows) <= 5:  # Only show first 5 to avoid flooding the output
+                self.stdout.write(f"Added to CurrentHot100: #{song_data['rank']} '{song_data['title']}' by {song_data['artist']}")
+        
+        # Swap the whole chart in one transaction so readers never see a half-filled table
+        with transaction.atomic():
+            CurrentHot100.objects.all().delete()
+            CurrentHot100.objects.bulk_create(rows)
         
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully populated CurrentHot100 table with {created_count} songs'
+                f'Successfully populated CurrentHot100 table with {len(rows)} songs'
             )
         )
+
+        self.record_chart_week(chart_date_obj, songs, existing)
+
+    def record_chart_week(self, chart_date, songs, existing):
+        """
+        Add this week to SongTimeline and build its ChartSnapshot from there, the
+        same way build_chart_snapshots does, so historic_chart can serve it directly.
+        """
+        timeline_rows = []
+        for song_data in songs:
+            song = existing.get(slugify(f"{song_data['artist']} {song_data['title']}"))
+            if song:
+                timeline_rows.append(SongTimeline(
+                    song=song, chart_date=chart_date, rank=song_data['rank'],
+                    peak_rank=song_data['peak_rank'], weeks_on_chart=song_data['weeks_on_chart'],
+                ))
+        if not timeline_rows:
+            return
+        bulk_upsert_timeline(timeline_rows)
+
+        previous_chart_date = ChartSnapshot.objects.filter(
+            chart_date__lt=chart_date
+        ).values_list('chart_date', flat=True).order_by('-chart_date').first()
+
+        if previous_chart_date is None:
+            # Don't start the index with a single week; chart_dates would treat it as complete
+            self.stdout.write(self.style.WARNING(
+                "No earlier chart snapshots found - run 'python manage.py build_chart_snapshots' first"
+            ))
+            return
+
+        snapshot = ChartSnapshot.build_from_timeline(chart_date)
+        self.stdout.write(self.style.SUCCESS(f'Saved chart snapshot for {chart_date} ({len(snapshot.entries)} entries)'))
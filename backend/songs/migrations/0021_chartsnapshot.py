@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0020_song_fulltext_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChartSnapshot",
+            fields=[
+                ("chart_date", models.DateField(primary_key=True, serialize=False)),
+                ("previous_chart_date", models.DateField(blank=True, null=True)),
+                ("entries", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["chart_date"],
+            },
+        ),
+    ]
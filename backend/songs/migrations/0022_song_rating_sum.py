@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Song = apps.get_model("songs", "Song")
+    UserSongRating = apps.get_model("songs", "UserSongRating")
+    sums = (
+        UserSongRating.objects.filter(song=OuterRef("pk"))
+        .values("song")
+        .annotate(total=Sum("score"))
+        .values("total")
+    )
+    Song.objects.update(rating_sum=Coalesce(Subquery(sums), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0021_chartsnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
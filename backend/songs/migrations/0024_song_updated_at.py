@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0023_ratingevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="song",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-17 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0024_song_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteCounters",
+            fields=[
+                (
+                    "id",
+                    models.PositiveSmallIntegerField(
+                        default=1, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("song_count", models.PositiveIntegerField(default=0)),
+                ("artist_count", models.PositiveIntegerField(default=0)),
+                ("chart_count", models.PositiveIntegerField(default=0)),
+                ("user_rating_count", models.PositiveIntegerField(default=0)),
+                ("user_comment_count", models.PositiveIntegerField(default=0)),
+                ("bookmark_count", models.PositiveIntegerField(default=0)),
+                (
+                    "newest_username",
+                    models.CharField(blank=True, max_length=150, null=True),
+                ),
+                ("reconciled_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "site counters",
+            },
+        ),
+    ]
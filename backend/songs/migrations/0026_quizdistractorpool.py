@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-17 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0025_sitecounters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuizDistractorPool",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("decade", models.PositiveSmallIntegerField()),
+                ("peak_band", models.PositiveSmallIntegerField()),
+                ("artists", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["decade", "peak_band"],
+                "unique_together": {("decade", "peak_band")},
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.0.1 on 2026-10-17 23:12
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def backfill_chart_totals(apps, schema_editor):
+    Artist = apps.get_model("songs", "Artist")
+    Song = apps.get_model("songs", "Song")
+    rows = (
+        Song.objects.filter(artist_fk__isnull=False)
+        .order_by()
+        .values("artist_fk")
+        .annotate(
+            total_hits=Count("id"),
+            number_one_hits=Count("id", filter=Q(peak_rank=1)),
+            best_peak=Min("peak_rank"),
+            total_weeks=Sum("weeks_on_chart"),
+            first_hit_year=Min("year"),
+            last_hit_year=Max("year"),
+        )
+    )
+    artists = []
+    for row in rows:
+        artist = Artist(id=row.pop("artist_fk"), **row)
+        artist.total_weeks = artist.total_weeks or 0
+        artists.append(artist)
+    Artist.objects.bulk_update(
+        artists,
+        [
+            "total_hits",
+            "number_one_hits",
+            "best_peak",
+            "total_weeks",
+            "first_hit_year",
+            "last_hit_year",
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0026_quizdistractorpool"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="artist",
+            name="best_peak",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="artist",
+            name="first_hit_year",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="artist",
+            name="last_hit_year",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="artist",
+            name="number_one_hits",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="artist",
+            name="total_hits",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="artist",
+            name="total_weeks",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="artist",
+            index=models.Index(
+                fields=["total_hits", "name"], name="songs_artis_total_h_29a75b_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_chart_totals, migrations.RunPython.noop),
+    ]
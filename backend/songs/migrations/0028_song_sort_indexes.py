@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-17 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0027_artist_chart_totals"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["weeks_on_chart"], name="songs_song_weeks_o_129be6_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["average_user_score"], name="songs_song_average_19847d_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="song",
+            index=models.Index(
+                fields=["total_ratings"], name="songs_song_total_r_b5f176_idx"
+            ),
+        ),
+    ]
@@ -1,13 +1,16 @@
-from .song import Song, SongTimeline, CurrentHot100, NumberOneSong
+from .song import Song, SongTimeline, CurrentHot100, NumberOneSong, ChartSnapshot
 from .artist import Artist, ArtistTag, ArtistTagRelation, ArtistRelationship
 from .composition import Composition
-from .user import UserSongRating, UserSongComment, Bookmark
+from .user import UserSongRating, UserSongComment, Bookmark, RatingEvent
 from .tag import SongTag, SongTagRelation
+from .site import SiteCounters
+from .quiz import QuizDistractorPool
 
 __all__ = [
-    'Song', 'SongTimeline', 'CurrentHot100', 'NumberOneSong',
+    'Song', 'SongTimeline', 'CurrentHot100', 'NumberOneSong', 'ChartSnapshot',
     'Artist', 'ArtistTag', 'ArtistTagRelation', 'ArtistRelationship',
     'Composition',
-    'UserSongRating', 'UserSongComment', 'Bookmark',
+    'UserSongRating', 'UserSongComment', 'Bookmark', 'RatingEvent',
     'SongTag', 'SongTagRelation',
+    'SiteCounters', 'QuizDistractorPool',
 ]
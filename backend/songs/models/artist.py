@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
 from django.utils.text import slugify
+from .. import cache as songs_cache, suggest
 
 
 class Artist(models.Model):
@@ -45,14 +48,104 @@ class Artist(models.Model):
         help_text='Image source/credit (e.g., "Wikimedia Commons")'
     )
     
+    # Chart totals over the artist's songs, kept current by refresh_stats()
+    total_hits = models.PositiveIntegerField(default=0)
+    number_one_hits = models.PositiveIntegerField(default=0)
+    best_peak = models.PositiveSmallIntegerField(blank=True, null=True)
+    total_weeks = models.PositiveIntegerField(default=0)
+    first_hit_year = models.PositiveSmallIntegerField(blank=True, null=True)
+    last_hit_year = models.PositiveSmallIntegerField(blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    STATS_FIELDS = ['total_hits', 'number_one_hits', 'best_peak', 'total_weeks', 'first_hit_year', 'last_hit_year']
+
+    class Meta:
+        indexes = [
+            # The artist list: artists with hits, by name
+            models.Index(fields=['total_hits', 'name']),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
     
+    @staticmethod
+    def touch(artist_ids):
+        """Bump updated_at when related rows (tags, relationships) change"""
+        Artist.objects.filter(pk__in=artist_ids).update(updated_at=timezone.now())
+
+    @classmethod
+    def refresh_stats(cls, artist_ids=None):
+        """
+        Recompute the chart totals of the given artists (every artist when None)
+        with one grouped query, and save the ones that changed. Song signals,
+        update_current_hot100 and link_songs_to_artists call this for the artists
+        they touch. Returns the number of artists updated.
+        """
+        from .song import Song
+
+        songs = Song.objects.filter(artist_fk__isnull=False)
+        artists = cls.objects.all()
+        if artist_ids is not None:
+            artist_ids = {artist_id for artist_id in artist_ids if artist_id}
+            if not artist_ids:
+                return 0
+            songs = songs.filter(artist_fk__in=artist_ids)
+            artists = artists.filter(pk__in=artist_ids)
+
+        totals = {
+            row.pop('artist_fk'): row
+            for row in songs.order_by().values('artist_fk').annotate(
+                total_hits=Count('id'),
+                number_one_hits=Count('id', filter=Q(peak_rank=1)),
+                best_peak=Min('peak_rank'),
+                total_weeks=Sum('weeks_on_chart'),
+                first_hit_year=Min('year'),
+                last_hit_year=Max('year'),
+            )
+        }
+
+        now = timezone.now()
+        changed = []
+        for artist in artists.only('id', 'slug', *cls.STATS_FIELDS).iterator(chunk_size=2000):
+            values = totals.get(artist.id, {})
+            values = {
+                'total_hits': values.get('total_hits', 0),
+                'number_one_hits': values.get('number_one_hits', 0),
+                'best_peak': values.get('best_peak'),
+                'total_weeks': values.get('total_weeks') or 0,
+                'first_hit_year': values.get('first_hit_year'),
+                'last_hit_year': values.get('last_hit_year'),
+            }
+            if any(getattr(artist, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(artist, field, value)
+                # The stats are part of the artist payload (and its ETag)
+                artist.updated_at = now
+                changed.append(artist)
+
+        if changed:
+            cls.objects.bulk_update(changed, cls.STATS_FIELDS + ['updated_at'], batch_size=1000)
+            # Suggestions rank artists by these totals
+            songs_cache.invalidate(suggest.CACHE_DEPENDENCY, *(songs_cache.artist(artist.slug) for artist in changed))
+        return len(changed)
+
+    def billboard_stats(self):
+        """The chart totals in the shape the artist endpoints return, or None without hits"""
+        if not self.total_hits:
+            return None
+        return {
+            'total_hits': self.total_hits,
+            'highest_peak': self.best_peak,
+            'number_one_hits': self.number_one_hits,
+            'total_weeks': self.total_weeks,
+            'first_hit_year': self.first_hit_year,
+            'last_hit_year': self.last_hit_year,
+        }
+
     def __str__(self):
         return self.name
 
@@ -0,0 +1,89 @@
+from django.db import models, transaction
+from .song import Song
+from .artist import ArtistTagRelation
+from .. import cache as songs_cache
+
+
+class QuizDistractorPool(models.Model):
+    """
+    The artists credited on songs from one decade and peak band, with their
+    ArtistTag ids, so the quiz generator can offer wrong answers that are
+    plausible (same era, similar chart success, shared genres) without
+    querying per question. Rebuilt by `manage.py build_quiz_pools`.
+    """
+    # (band, best peak, worst peak)
+    PEAK_BANDS = [(1, 1, 1), (2, 2, 10), (3, 11, 40), (4, 41, 100)]
+    # Bumped by refresh() so every worker reloads its in-memory copy (songs/quiz.py)
+    CACHE_DEPENDENCY = 'quiz-pools'
+
+    decade = models.PositiveSmallIntegerField()
+    peak_band = models.PositiveSmallIntegerField()
+    # [[artist credit, [tag ids]], ...] ordered by credit
+    artists = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('decade', 'peak_band')
+        ordering = ['decade', 'peak_band']
+
+    def __str__(self):
+        return f"Quiz pool {self.decade}s, band {self.peak_band} ({len(self.artists)} artists)"
+
+    @classmethod
+    def band_of(cls, peak_rank):
+        for band, best, worst in cls.PEAK_BANDS:
+            if best <= peak_rank <= worst:
+                return band
+        return cls.PEAK_BANDS[-1][0]
+
+    @classmethod
+    def compute(cls):
+        """{(decade, band): [[credit, [tag ids]], ...]} from Song and ArtistTagRelation"""
+        tags = {}
+        for artist_id, tag_id in ArtistTagRelation.objects.values_list('artist_id', 'tag_id').order_by('tag_id'):
+            tags.setdefault(artist_id, []).append(tag_id)
+
+        pools = {}
+        rows = Song.objects.values_list('artist', 'year', 'peak_rank', 'artist_fk_id')
+        for artist, year, peak_rank, artist_id in rows.iterator(chunk_size=5000):
+            credits = pools.setdefault((year // 10 * 10, cls.band_of(peak_rank)), {})
+            # A credit can be linked to different Artist rows; keep every tag
+            credit_tags = credits.setdefault(artist, set())
+            credit_tags.update(tags.get(artist_id, ()))
+        return {
+            key: [[artist, sorted(credit_tags)] for artist, credit_tags in sorted(credits.items())]
+            for key, credits in pools.items()
+        }
+
+    @classmethod
+    def refresh(cls):
+        """
+        Rebuild the pools, writing only those that changed.
+        Returns (created, updated, deleted).
+        """
+        wanted = cls.compute()
+        current = {(pool.decade, pool.peak_band): pool for pool in cls.objects.all()}
+
+        to_create = [
+            cls(decade=decade, peak_band=band, artists=artists)
+            for (decade, band), artists in wanted.items() if (decade, band) not in current
+        ]
+        to_update = []
+        for key, artists in wanted.items():
+            pool = current.get(key)
+            if pool and pool.artists != artists:
+                pool.artists = artists
+                to_update.append(pool)
+        stale_ids = [pool.id for key, pool in current.items() if key not in wanted]
+
+        with transaction.atomic():
+            if to_create:
+                cls.objects.bulk_create(to_create)
+            for pool in to_update:
+                pool.save(update_fields=['artists', 'updated_at'])
+            if stale_ids:
+                cls.objects.filter(id__in=stale_ids).delete()
+
+        if to_create or to_update or stale_ids:
+            songs_cache.invalidate(cls.CACHE_DEPENDENCY)
+        return len(to_create), len(to_update), len(stale_ids)
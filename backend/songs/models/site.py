@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .song import Song, SongTimeline
+from .user import UserSongRating, UserSongComment, Bookmark
+
+
+class SiteCounters(models.Model):
+    """
+    The site-wide totals behind /website-stats/, kept in a single row so the
+    endpoint is one primary-key read.
+
+    Signals (songs/signals.py) and the bulk import commands adjust the counters
+    as rows come and go; `manage.py reconcile_site_counters` recounts everything
+    periodically and corrects whatever drift slipped past them.
+    """
+    COUNTERS = [
+        'song_count', 'artist_count', 'chart_count',
+        'user_rating_count', 'user_comment_count', 'bookmark_count',
+    ]
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1, editable=False)
+    song_count = models.PositiveIntegerField(default=0)
+    # Distinct Song.artist credits and distinct SongTimeline chart weeks
+    artist_count = models.PositiveIntegerField(default=0)
+    chart_count = models.PositiveIntegerField(default=0)
+    user_rating_count = models.PositiveIntegerField(default=0)
+    user_comment_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+    newest_username = models.CharField(max_length=150, blank=True, null=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'site counters'
+
+    def __str__(self):
+        return f"Site counters ({self.song_count} songs, {self.chart_count} charts)"
+
+    def as_dict(self):
+        data = {field: getattr(self, field) for field in self.COUNTERS}
+        data['newest_username'] = self.newest_username
+        return data
+
+    @classmethod
+    def get(cls):
+        """The counters row, counted from scratch the first time it is needed"""
+        counters = cls.objects.filter(pk=1).first()
+        if counters is None:
+            counters = cls.reconcile()[0]
+        return counters
+
+    @classmethod
+    def adjust(cls, **deltas):
+        """
+        Apply counter deltas with one atomic UPDATE. Does nothing until the row
+        exists; the first get() counts everything anyway.
+        """
+        changes = {}
+        for field, delta in deltas.items():
+            if delta > 0:
+                changes[field] = F(field) + delta
+            elif delta < 0:
+                # Unsigned columns on MySQL, so never go below zero
+                changes[field] = Case(When(**{f'{field}__gte': -delta}, then=F(field) + delta), default=Value(0))
+        if changes:
+            cls.objects.filter(pk=1).update(updated_at=timezone.now(), **changes)
+
+    @classmethod
+    def refresh_newest_user(cls):
+        cls.objects.filter(pk=1).update(newest_username=cls.count_newest_username(), updated_at=timezone.now())
+
+    @staticmethod
+    def count_newest_username():
+        # Staff and superusers aren't shown as the newest member
+        return User.objects.filter(is_staff=False, is_superuser=False).order_by(
+            '-date_joined'
+        ).values_list('username', flat=True).first()
+
+    @classmethod
+    def counts(cls, fields=None):
+        """Recount counters from the tables (the expensive way); all of them by default"""
+        sources = {
+            'song_count': Song.objects.count,
+            'artist_count': lambda: Song.objects.values('artist').distinct().count(),
+            'chart_count': lambda: SongTimeline.objects.values('chart_date').distinct().count(),
+            'user_rating_count': UserSongRating.objects.count,
+            'user_comment_count': UserSongComment.objects.count,
+            'bookmark_count': Bookmark.objects.count,
+            'newest_username': cls.count_newest_username,
+        }
+        return {field: sources[field]() for field in (fields or sources)}
+
+    @classmethod
+    def reconcile(cls, fields=None):
+        """
+        Recount the counters (all, or just `fields`) and store them. Returns the
+        counters row and {field: (stored, actual)} for every field that had drifted.
+        """
+        actual = cls.counts(fields)
+        counters, _ = cls.objects.get_or_create(pk=1)
+        drift = {
+            field: (getattr(counters, field), value)
+            for field, value in actual.items() if getattr(counters, field) != value
+        }
+        now = timezone.now()
+        if fields is None:
+            actual['reconciled_at'] = now
+        cls.objects.filter(pk=1).update(updated_at=now, **actual)
+        counters.refresh_from_db()
+        return counters, drift
@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
 from django.utils.text import slugify
 from ckeditor.fields import RichTextField
 from .composition import Composition
 from .artist import Artist
+from .. import cache as songs_cache
 
 
 class Song(models.Model):
@@ -15,6 +18,8 @@ class Song(models.Model):
     # New fields for the rating system
     average_user_score = models.FloatField(default=0.0)
     total_ratings = models.IntegerField(default=0)
+    # Running sum of rating scores, so average_user_score can be kept up to date with deltas
+    rating_sum = models.IntegerField(default=0)
 
     review = RichTextField(blank=False, null=False, default='')
     image_upload = models.ImageField(upload_to='song_images/', blank=True, null=True)
@@ -30,6 +35,9 @@ class Song(models.Model):
 
     artist_fk = models.ForeignKey(Artist, on_delete=models.CASCADE, 
                                   null=True, blank=True, related_name='songs')
+
+    # Bumped on every change to what the song detail endpoints return (see Song.touch)
+    updated_at = models.DateTimeField(auto_now=True)
     
     tags = models.ManyToManyField(
         'SongTag',
@@ -45,6 +53,10 @@ class Song(models.Model):
             models.Index(fields=['artist_slug']),
             models.Index(fields=['year']),
             models.Index(fields=['peak_rank']),
+            # The other sort_by columns of the song list
+            models.Index(fields=['weeks_on_chart']),
+            models.Index(fields=['average_user_score']),
+            models.Index(fields=['total_ratings']),
         ]
 
     def save(self, *args, **kwargs):
@@ -52,6 +64,34 @@ class Song(models.Model):
         self.slug = slugify(f"{self.artist} {self.title}")
         self.artist_slug = slugify(self.artist)
         super().save(*args, **kwargs)
+        self._loaded_artist = self.artist
+        self._loaded_artist_fk_id = self.artist_fk_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored artist credit and link so the site counters and
+        # artist stats can see them change
+        instance._loaded_artist = instance.__dict__.get('artist')
+        instance._loaded_artist_fk_id = instance.__dict__.get('artist_fk_id')
+        return instance
+
+    @staticmethod
+    def touch(song_ids):
+        """Bump updated_at for changes that bypass save() (queryset updates, related rows)"""
+        Song.objects.filter(pk__in=song_ids).update(updated_at=timezone.now())
+
+    @staticmethod
+    def average_score_expression():
+        """rating_sum / total_ratings rounded to one decimal, 0.0 for unrated songs"""
+        return models.Case(
+            models.When(
+                total_ratings__gt=0,
+                then=Round(Cast('rating_sum', models.FloatField()) / models.F('total_ratings'), 1),
+            ),
+            default=models.Value(0.0),
+            output_field=models.FloatField(),
+        )
 
     def get_artist_image(self):
         """Get the first available image from any other song by this artist (using artist_slug)"""
@@ -128,6 +168,14 @@ class NumberOneSong(models.Model):
     slug = models.SlugField(max_length=255, unique=True)
     artist_slug = models.SlugField(max_length=255, blank=True, null=True)
 
+    # Fields copied from Song; slug is the sync key
+    SYNC_FIELDS = [
+        'title', 'artist', 'year', 'peak_rank', 'weeks_on_chart', 'average_user_score',
+        'total_ratings', 'spotify_url', 'youtube_url', 'artist_slug',
+    ]
+    # Response cache dependency of /number-one-songs/, bumped by sync_from_songs() when rows change
+    CACHE_DEPENDENCY = 'number-ones'
+
     class Meta:
         ordering = ['-year']
         indexes = [
@@ -135,6 +183,40 @@ class NumberOneSong(models.Model):
             models.Index(fields=['artist']),
         ]
 
+    @classmethod
+    def sync_from_songs(cls):
+        """
+        Bring the table in line with Song.objects.filter(peak_rank=1), diffing by slug.
+        Only new, changed and removed rows are written. Returns (created, updated, deleted).
+        """
+        wanted = {
+            row['slug']: row
+            for row in Song.objects.filter(peak_rank=1).values('slug', *cls.SYNC_FIELDS)
+        }
+        current = {row.slug: row for row in cls.objects.all()}
+
+        to_create = [cls(**row) for slug, row in wanted.items() if slug not in current]
+        to_update = []
+        for slug, row in wanted.items():
+            existing = current.get(slug)
+            if existing and any(getattr(existing, field) != row[field] for field in cls.SYNC_FIELDS):
+                for field in cls.SYNC_FIELDS:
+                    setattr(existing, field, row[field])
+                to_update.append(existing)
+        stale_ids = [row.id for slug, row in current.items() if slug not in wanted]
+
+        with transaction.atomic():
+            if to_create:
+                cls.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                cls.objects.bulk_update(to_update, cls.SYNC_FIELDS, batch_size=500)
+            if stale_ids:
+                cls.objects.filter(id__in=stale_ids).delete()
+
+        if to_create or to_update or stale_ids:
+            songs_cache.invalidate(cls.CACHE_DEPENDENCY)
+        return len(to_create), len(to_update), len(stale_ids)
+
 
 class CurrentHot100(models.Model):
     title = models.CharField(max_length=100)
@@ -162,3 +244,82 @@ class CurrentHot100(models.Model):
         
     def __str__(self):
         return f"#{self.current_position}: {self.title} by {self.artist}"
+
+
+class ChartSnapshot(models.Model):
+    """
+    A published Hot 100 week with previous rank and movement already worked out,
+    so historic_chart can answer with a single primary-key lookup plus one query
+    for the songs on it.
+
+    Entries hold only what is fixed for the week (song, position, previous rank);
+    titles, slugs and chart totals are read from the live Song rows (see
+    chart_entries) so renames and new peaks show up on old charts too.
+    """
+    chart_date = models.DateField(primary_key=True)
+    previous_chart_date = models.DateField(null=True, blank=True)
+    entries = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SONG_FIELDS = ['title', 'artist', 'artist_slug', 'slug', 'peak_rank', 'weeks_on_chart', 'year']
+
+    class Meta:
+        ordering = ['chart_date']
+
+    def __str__(self):
+        return f"Hot 100 snapshot for {self.chart_date} ({len(self.entries)} entries)"
+
+    @staticmethod
+    def make_entry(position, previous_rank, song_id):
+        """The week-fixed part of one chart row"""
+        return {
+            'song_id': song_id,
+            'position': position,
+            'previous_rank': previous_rank,
+            # Positive = moved up; re-entries count as new like they do on Billboard
+            'movement': previous_rank - position if previous_rank is not None else None,
+            'is_new': previous_rank is None,
+        }
+
+    @classmethod
+    def build_from_timeline(cls, chart_date, save=True):
+        """Materialise (or refresh) the snapshot for one chart week from SongTimeline"""
+        previous_chart_date = SongTimeline.objects.filter(
+            chart_date__lt=chart_date
+        ).values_list('chart_date', flat=True).order_by('-chart_date').first()
+
+        previous_ranks = {}
+        if previous_chart_date:
+            previous_ranks = dict(
+                SongTimeline.objects.filter(chart_date=previous_chart_date).values_list('song_id', 'rank')
+            )
+
+        rows = SongTimeline.objects.filter(chart_date=chart_date).order_by('rank').values_list('rank', 'song_id')[:100]
+        entries = [cls.make_entry(rank, previous_ranks.get(song_id), song_id) for rank, song_id in rows]
+        if not entries:
+            return None
+        if not save:
+            return cls(chart_date=chart_date, previous_chart_date=previous_chart_date, entries=entries)
+
+        snapshot, _ = cls.objects.update_or_create(
+            chart_date=chart_date,
+            defaults={'previous_chart_date': previous_chart_date, 'entries': entries},
+        )
+        return snapshot
+
+    def chart_entries(self):
+        """The entries in the shape historic_chart returns, with the songs' current details"""
+        songs = Song.objects.only(*self.SONG_FIELDS).in_bulk([entry['song_id'] for entry in self.entries])
+        chart = []
+        for entry in self.entries:
+            song = songs.get(entry['song_id'])
+            if song is None:
+                continue  # deleted since the week was built
+            chart.append({
+                'position': entry['position'],
+                **{field: getattr(song, field) for field in self.SONG_FIELDS},
+                'previous_rank': entry['previous_rank'],
+                'movement': entry['movement'],
+                'is_new': entry['is_new'],
+            })
+        return chart
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .. import cache as songs_cache
 from .song import Song
 
 
@@ -16,28 +18,78 @@ class UserSongRating(models.Model):
         song = self.song
         return song.slug
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored score so save()/delete() can apply the difference
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def _stored_score(self):
+        if hasattr(self, '_loaded_score'):
+            return self._loaded_score
+        return UserSongRating.objects.filter(pk=self.pk).values_list('score', flat=True).first()
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.update_song_average_score()
+        # An instance built with an existing pk updates that row, so it has a stored score too
+        old_score = None if self._state.adding and self.pk is None else self._stored_score()
+        self.score = int(self.score)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.apply_score_delta(self.song_id, old_score, self.score)
+        self._loaded_score = self.score
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        self.update_song_average_score()
+        old_score = self._stored_score()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.apply_score_delta(self.song_id, old_score, None)
+        return result
 
-    def update_song_average_score(self):
-        song = self.song
-        total_ratings = UserSongRating.objects.filter(song=song, score__gt=0).count()
-        sum_ratings = UserSongRating.objects.filter(song=song).aggregate(models.Sum('score'))['score__sum']
+    @staticmethod
+    def score_delta(old_score, new_score):
+        """(sum delta, count delta) for a rating going from old_score to new_score (None = no rating).
+        Scores of 0 add to the sum but don't count as ratings, as before."""
+        return (new_score or 0) - (old_score or 0), int(bool(new_score)) - int(bool(old_score))
+
+    @staticmethod
+    def apply_score_delta(song_id, old_score, new_score):
+        """
+        Move a song's rating aggregates from old_score to new_score with atomic
+        UPDATEs, so concurrent raters can't overwrite each other.
+        """
+        UserSongRating.apply_song_deltas({song_id: UserSongRating.score_delta(old_score, new_score)})
 
-        if total_ratings > 0:
-            song.total_ratings = total_ratings
-            average_score = sum_ratings / total_ratings
-            song.average_user_score = round(average_score, 1)
-        else:
-            song.total_ratings = 0
-            song.average_user_score = 0.0
+    @staticmethod
+    def apply_song_deltas(deltas):
+        """Apply {song_id: (sum delta, count delta)} to Song.rating_sum/total_ratings and refresh the averages"""
+        changed = []
+        for song_id, (sum_delta, count_delta) in deltas.items():
+            if not sum_delta and not count_delta:
+                continue
+            Song.objects.filter(pk=song_id).update(
+                rating_sum=models.F('rating_sum') + sum_delta,
+                total_ratings=models.F('total_ratings') + count_delta,
+            )
+            changed.append(song_id)
+        if changed:
+            # Separate statement: MySQL and SQLite disagree on whether later SET
+            # clauses see the values assigned earlier in the same UPDATE
+            Song.objects.filter(pk__in=changed).update(
+                average_user_score=Song.average_score_expression(), updated_at=timezone.now()
+            )
+            # .update() sends no signals, so the cached song lists are invalidated here
+            songs_cache.invalidate('songs')
 
-        song.save()
+    def update_song_average_score(self):
+        """Recompute this song's aggregates from all of its ratings (see reconcile_song_ratings)"""
+        totals = UserSongRating.objects.filter(song_id=self.song_id).aggregate(
+            total_ratings=models.Count('id', filter=models.Q(score__gt=0)),
+            rating_sum=models.Sum('score'),
+        )
+        songs = Song.objects.filter(pk=self.song_id)
+        songs.update(total_ratings=totals['total_ratings'], rating_sum=totals['rating_sum'] or 0)
+        songs.update(average_user_score=Song.average_score_expression(), updated_at=timezone.now())
 
 
 class UserSongComment(models.Model):
@@ -57,3 +109,97 @@ class Bookmark(models.Model):
 
     def __str__(self):
         return f"Bookmarks for {self.user.username}"
+
+
+class RatingEvent(models.Model):
+    """
+    Write-behind queue for ratings (settings.RATING_WRITE_BEHIND). The rating view
+    only appends here; process_rating_queue folds events into UserSongRating,
+    the song aggregates and user points in batches, then deletes them.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    song = models.ForeignKey(Song, on_delete=models.CASCADE)
+    score = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.user_id} rated song {self.song_id}: {self.score}"
+
+    @classmethod
+    def flush(cls, batch_size=1000):
+        """
+        Apply the oldest queued events in one transaction.
+        Returns (events processed, songs touched, users touched).
+        """
+        from users import points
+        from users.models import UserStatsSnapshot
+        from .site import SiteCounters
+
+        with transaction.atomic():
+            events = list(cls.objects.select_for_update().order_by('id')[:batch_size])
+            if not events:
+                return 0, 0, 0
+
+            # Last event per user/song wins
+            latest = {}
+            for event in events:
+                latest[(event.user_id, event.song_id)] = event.score
+
+            user_ids = {user_id for user_id, _ in latest}
+            song_ids = {song_id for _, song_id in latest}
+            # Locked, so a direct rating can't change a score between here and the deltas below
+            existing = {
+                (rating.user_id, rating.song_id): rating
+                for rating in UserSongRating.objects.select_for_update().filter(
+                    user_id__in=user_ids, song_id__in=song_ids
+                )
+                if (rating.user_id, rating.song_id) in latest
+            }
+
+            to_create = []
+            to_update = []
+            deltas = {}
+            for (user_id, song_id), score in latest.items():
+                rating = existing.get((user_id, song_id))
+                old_score = rating.score if rating else None
+                if rating is None:
+                    to_create.append(UserSongRating(user_id=user_id, song_id=song_id, score=score))
+                elif rating.score != score:
+                    rating.score = score
+                    to_update.append(rating)
+                else:
+                    continue
+                sum_delta, count_delta = UserSongRating.score_delta(old_score, score)
+                song_sum, song_count = deltas.get(song_id, (0, 0))
+                deltas[song_id] = (song_sum + sum_delta, song_count + count_delta)
+
+            # bulk writes skip UserSongRating.save(), so the aggregates are applied per song below
+            # A rating created directly since the read above is overwritten instead
+            # of failing the whole batch; reconcile_song_ratings corrects the count
+            upsert = {'update_conflicts': True, 'update_fields': ['score']}
+            # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+            if connection.features.supports_update_conflicts_with_target:
+                upsert['unique_fields'] = ['user', 'song']
+            UserSongRating.objects.bulk_create(to_create, batch_size=500, **upsert)
+            UserSongRating.objects.bulk_update(to_update, ['score'], batch_size=500)
+            UserSongRating.apply_song_deltas(deltas)
+            SiteCounters.adjust(user_rating_count=len(to_create))
+
+            # ...and the post_save points signal doesn't fire either. bulk_create
+            # doesn't return ids on MySQL, so read the written ratings back
+            changed = {(r.user_id, r.song_id) for r in to_create + to_update}
+            if changed:
+                points.sync_ratings([
+                    rating for rating in UserSongRating.objects.filter(
+                        user_id__in={user_id for user_id, _ in changed},
+                        song_id__in={song_id for _, song_id in changed},
+                    )
+                    if (rating.user_id, rating.song_id) in changed
+                ])
+                UserStatsSnapshot.mark_stale({user_id for user_id, _ in changed})
+
+            cls.objects.filter(id__in=[event.id for event in events]).delete()
+        return len(events), len(deltas), len(user_ids)
@@ -0,0 +1,136 @@
+"""
+Multiple-choice quiz questions.
+
+Wrong artist options come from QuizDistractorPool rows: the artists credited
+in the same decade and peak band as the song, preferring ones that share an
+ArtistTag with the right answer. Each worker loads all pools into memory once
+(and again after build_quiz_pools changes them), so building a quiz is one
+pass over in-memory lists with no queries per question. Year and peak options
+are picked from the numbers around the right answer.
+"""
+import datetime
+import random
+import threading
+
+from . import cache as songs_cache
+
+QUESTION_TYPES = ('artist', 'year', 'peak')
+CHOICES = 4
+# Tries at drawing a tag-sharing artist before falling back to any artist in the pool
+SIMILAR_ATTEMPTS = 12
+
+
+class DistractorPools:
+    def __init__(self, pools, version=None):
+        # (decade, band) -> (credits, {credit: tag ids}, {tag id: [credits]})
+        self._pools = {}
+        for key, artists in pools.items():
+            credits = [credit for credit, _ in artists]
+            tags = {credit: tag_ids for credit, tag_ids in artists}
+            by_tag = {}
+            for credit, tag_ids in artists:
+                for tag_id in tag_ids:
+                    by_tag.setdefault(tag_id, []).append(credit)
+            self._pools[key] = (credits, tags, by_tag)
+        self.version = version
+
+    @classmethod
+    def load(cls, version=None):
+        from .models import QuizDistractorPool
+
+        if not QuizDistractorPool.objects.exists():
+            QuizDistractorPool.refresh()
+        rows = QuizDistractorPool.objects.values_list('decade', 'peak_band', 'artists')
+        return cls({(decade, band): artists for decade, band, artists in rows}, version)
+
+    def _fallback_keys(self, decade, band):
+        """The song's own pool first, then its decade's other bands, then neighbouring decades"""
+        from .models import QuizDistractorPool
+
+        bands = sorted((b for b, _, _ in QuizDistractorPool.PEAK_BANDS), key=lambda b: abs(b - band))
+        yield from ((decade, b) for b in bands)
+        for offset in (10, -10, 20, -20):
+            yield from ((decade + offset, b) for b in bands)
+
+    def artist_options(self, answer, decade, band, rng, count=CHOICES - 1):
+        """Up to `count` wrong artists for a song credited to `answer`."""
+        picked = []
+        credits, tags, by_tag = self._pools.get((decade, band), ([], {}, {}))
+        answer_tags = tags.get(answer, [])
+        if answer_tags:
+            for _ in range(SIMILAR_ATTEMPTS):
+                similar = by_tag[rng.choice(answer_tags)]
+                credit = rng.choice(similar)
+                if credit != answer and credit not in picked:
+                    picked.append(credit)
+                    if len(picked) == count:
+                        return picked
+
+        for key in self._fallback_keys(decade, band):
+            credits = self._pools.get(key, ([], {}, {}))[0]
+            for index in rng.sample(range(len(credits)), min(len(credits), count * 2)):
+                if credits[index] != answer and credits[index] not in picked:
+                    picked.append(credits[index])
+                    if len(picked) == count:
+                        return picked
+        return picked
+
+
+def year_options(year, rng, count=CHOICES - 1):
+    first, last = max(1958, year - 5), min(datetime.date.today().year, year + 5)
+    years = [candidate for candidate in range(first, last + 1) if candidate != year]
+    return rng.sample(years, min(count, len(years)))
+
+
+def peak_options(peak_rank, rng, count=CHOICES - 1):
+    # Close enough to be tempting: the nearest positions (fewer for top-5 hits)
+    nearest = count * 2 if peak_rank <= 5 else 20
+    ranks = sorted((rank for rank in range(1, 101) if rank != peak_rank), key=lambda rank: abs(rank - peak_rank))
+    return rng.sample(ranks[:nearest], count)
+
+
+def build_question(song, question_type, pools, rng):
+    from .models import QuizDistractorPool
+
+    if question_type == 'year':
+        question = f"In what year did '{song.title}' by {song.artist} chart, peaking at #{song.peak_rank}?"
+        answer, options = song.year, year_options(song.year, rng)
+    elif question_type == 'peak':
+        question = f"What was the highest chart position of '{song.title}' by {song.artist} ({song.year})?"
+        answer, options = song.peak_rank, peak_options(song.peak_rank, rng)
+    else:
+        question = f"Who had a hit with '{song.title}' in {song.year} peaking at #{song.peak_rank}?"
+        answer = song.artist
+        options = pools.artist_options(
+            song.artist, song.year // 10 * 10, QuizDistractorPool.band_of(song.peak_rank), rng
+        )
+
+    options.append(answer)
+    rng.shuffle(options)
+    return {'type': question_type, 'question': question, 'answer': answer, 'options': options}
+
+
+def build_quiz(songs, question_types=('artist',), rng=random):
+    """One multiple-choice question per song, cycling through question_types."""
+    pools = get_pools()
+    return [
+        build_question(song, question_types[index % len(question_types)], pools, rng)
+        for index, song in enumerate(songs)
+    ]
+
+
+_pools = None
+_load_lock = threading.Lock()
+
+
+def get_pools():
+    """Return this worker's pools, reloading them after build_quiz_pools changed them."""
+    global _pools
+    from .models import QuizDistractorPool
+
+    version = songs_cache.versions([QuizDistractorPool.CACHE_DEPENDENCY])[QuizDistractorPool.CACHE_DEPENDENCY]
+    if _pools is None or _pools.version != version:
+        with _load_lock:
+            if _pools is None or _pools.version != version:
+                _pools = DistractorPools.load(version)
+    return _pools
@@ -0,0 +1,196 @@
+"""
+Uniform random sampling of songs and artists without ORDER BY RAND().
+
+Each worker keeps dense arrays of ids, one per filter the random endpoints use:
+
+    songs            every song
+    spotify          songs with a Spotify URL
+    spotify:<1980>   songs with a Spotify URL from one decade
+    artist:<slug>    the songs of one artist (slices of one shared array)
+    artist-images    artists with an image
+
+plus, per decade, the songs ordered by peak rank (all songs and those with a
+Spotify URL), so "peaked at #N or better in these decades" is a prefix of a
+few arrays found with one bisect each. sample_songs() draws from the union of
+those prefixes for the playlist and quiz generators.
+
+Picking k random indices into an array is O(k) and unbiased, unlike probing
+random ids, which favours the songs that follow gaps in the id sequence.
+
+The arrays are rebuilt from one values_list() pass. Song and Artist signals
+(and the bulk import paths) invalidate the CACHE_DEPENDENCY version in the
+shared cache; every worker compares it on use and rebuilds when it changed,
+at most once per MIN_REBUILD_INTERVAL, so a burst of imports costs one
+rebuild. Callers fetch the sampled ids and skip any that have been deleted
+in the meantime.
+"""
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+from django.conf import settings
+
+from . import cache as songs_cache
+
+CACHE_DEPENDENCY = 'samples'
+MIN_REBUILD_INTERVAL = 30
+
+
+def decade_of(year):
+    return year // 10 * 10
+
+
+class IdPool:
+    """A read-only window onto an id array."""
+    __slots__ = ('ids', 'start', 'stop')
+
+    def __init__(self, ids, start=0, stop=None):
+        self.ids = ids
+        self.start = start
+        self.stop = len(ids) if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        return self.ids[self.start + index]
+
+
+EMPTY = IdPool(array('q'))
+
+
+class SamplePools:
+    def __init__(self, pools, by_peak=None, version=None):
+        self._pools = pools
+        # (decade, spotify_only) -> (peak ranks, song ids), both ordered by peak rank
+        self._by_peak = by_peak or {}
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, version=None):
+        from .models import Artist, Song
+
+        songs = array('q')
+        spotify = array('q')
+        by_decade = {}
+        by_artist = []
+        charted = {}
+        rows = Song.objects.order_by('id').values_list('id', 'year', 'peak_rank', 'spotify_url', 'artist_fk__slug')
+        for song_id, year, peak_rank, spotify_url, artist_slug in rows.iterator(chunk_size=5000):
+            songs.append(song_id)
+            charted.setdefault((decade_of(year), False), []).append((peak_rank, song_id))
+            if spotify_url:
+                spotify.append(song_id)
+                by_decade.setdefault(decade_of(year), array('q')).append(song_id)
+                charted.setdefault((decade_of(year), True), []).append((peak_rank, song_id))
+            if artist_slug:
+                by_artist.append((artist_slug, song_id))
+
+        by_peak = {}
+        for key, entries in charted.items():
+            entries.sort()
+            by_peak[key] = (array('q', (peak for peak, _ in entries)), array('q', (song_id for _, song_id in entries)))
+
+        pools = {'songs': IdPool(songs), 'spotify': IdPool(spotify)}
+        for decade, ids in by_decade.items():
+            pools[f'spotify:{decade}'] = IdPool(ids)
+
+        # One array for all artists, each artist a contiguous slice of it
+        by_artist.sort()
+        artist_songs = array('q', (song_id for _, song_id in by_artist))
+        start = 0
+        for index in range(1, len(by_artist) + 1):
+            if index == len(by_artist) or by_artist[index][0] != by_artist[start][0]:
+                pools[f'artist:{by_artist[start][0]}'] = IdPool(artist_songs, start, index)
+                start = index
+
+        pools['artist-images'] = IdPool(array(
+            'q', Artist.objects.exclude(image='').exclude(image__isnull=True).order_by('id').values_list('id', flat=True)
+        ))
+        return cls(pools, by_peak, version)
+
+    def size(self, name):
+        return len(self._pools.get(name, EMPTY))
+
+    def choice(self, name, rng=random):
+        """One id drawn uniformly from the pool, or None if it is empty."""
+        pool = self._pools.get(name, EMPTY)
+        return pool[rng.randrange(len(pool))] if len(pool) else None
+
+    def sample(self, name, k, rng=random):
+        """Up to k distinct ids drawn uniformly from the pool."""
+        pool = self._pools.get(name, EMPTY)
+        return [pool[index] for index in rng.sample(range(len(pool)), min(k, len(pool)))]
+
+    def sample_charted(self, k, decades, max_peak_rank, spotify_only=True, rng=random):
+        """
+        Up to k distinct song ids, uniform over the songs from `decades` that
+        peaked at max_peak_rank or better. Returns (ids, number of candidates).
+        """
+        windows = []
+        for decade in sorted(set(decades)):
+            peaks, ids = self._by_peak.get((decade, spotify_only), (array('q'), array('q')))
+            count = bisect_right(peaks, max_peak_rank)
+            if count:
+                windows.append((ids, count))
+        total = sum(count for _, count in windows)
+
+        picks = []
+        for index in rng.sample(range(total), min(k, total)):
+            for ids, count in windows:
+                if index < count:
+                    picks.append(ids[index])
+                    break
+                index -= count
+        return picks, total
+
+
+_pools = None
+_build_lock = threading.Lock()
+
+
+def _is_current(pools, version, max_age):
+    if pools is None:
+        return False
+    age = time.monotonic() - pools.built_at
+    if age > max_age:
+        return False
+    return pools.version == version or age < MIN_REBUILD_INTERVAL
+
+
+def get_pools():
+    """Return this worker's pools, rebuilding them when invalidated or too old."""
+    global _pools
+    max_age = getattr(settings, 'SAMPLE_POOLS_MAX_AGE', 3600)
+    version = songs_cache.versions([CACHE_DEPENDENCY])[CACHE_DEPENDENCY]
+    if not _is_current(_pools, version, max_age):
+        with _build_lock:
+            if not _is_current(_pools, version, max_age):
+                _pools = SamplePools.build(version)
+    return _pools
+
+
+def sample_songs(k, decades, max_peak_rank, spotify_only=True, rng=random):
+    """
+    Up to k distinct song ids from the decades (start years, e.g. 1980 for
+    1980-1989) with peak_rank <= max_peak_rank, plus the number of candidates.
+    With the same rng seed and catalogue the same ids come back in the same order.
+    """
+    if all(decade % 10 == 0 for decade in decades):
+        return get_pools().sample_charted(k, decades, max_peak_rank, spotify_only, rng)
+
+    # Ranges that don't line up with the pooled decades: sample ids in the database instead
+    from django.db.models import Q
+    from .models import Song
+
+    ranges = Q()
+    for start_year in decades:
+        ranges |= Q(year__gte=start_year, year__lte=start_year + 9)
+    candidates = Song.objects.filter(ranges, peak_rank__lte=max_peak_rank)
+    if spotify_only:
+        candidates = candidates.filter(spotify_url__isnull=False).exclude(spotify_url='')
+    ids = list(candidates.order_by('peak_rank', 'id').values_list('id', flat=True))
+    return rng.sample(ids, min(k, len(ids))), len(ids)
@@ -0,0 +1,163 @@
+"""
+Full-text song search.
+
+Production (MySQL) queries a FULLTEXT index on (title, artist) in boolean mode.
+Local SQLite runs use an FTS5 table that is kept in sync from the Song signals.
+Any other backend falls back to the old icontains filter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import ExpressionWrapper, RawSQL
+from django.db.models.functions import Least
+
+FULLTEXT_INDEX = 'songs_song_title_artist_ft'
+FTS_TABLE = 'songs_song_fts'
+
+# InnoDB does not index words shorter than innodb_ft_min_token_size (3)
+# or words on its default stopword list, so those terms are matched with
+# icontains on the already narrowed result set instead.
+MYSQL_MIN_TOKEN_LENGTH = 3
+MYSQL_STOPWORDS = {
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en',
+    'for', 'from', 'how', 'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or',
+    'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'who',
+    'will', 'with', 'und', 'www',
+}
+
+# How much chart success can lift a text match (multiplier on relevance).
+PEAK_WEIGHT = 0.6
+WEEKS_WEIGHT = 0.4
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def backend_supports_search():
+    return connection.vendor in ('mysql', 'sqlite')
+
+
+def search_songs(queryset, query):
+    """
+    Filter a Song queryset by a free-text query and annotate it with
+    `search_score` (text relevance boosted by peak_rank and weeks_on_chart).
+    """
+    tokens = tokenize(query)
+    if not tokens or not backend_supports_search():
+        return _icontains_search(queryset, query)
+
+    if connection.vendor == 'mysql':
+        indexed = [t for t in tokens if len(t) >= MYSQL_MIN_TOKEN_LENGTH and t not in MYSQL_STOPWORDS]
+        leftover = [t for t in tokens if t not in indexed]
+        if not indexed:
+            return _icontains_search(queryset, query)
+
+        table = queryset.model._meta.db_table
+        match_sql = f'MATCH ({table}.title, {table}.artist) AGAINST (%s IN BOOLEAN MODE)'
+        boolean_query = ' '.join(f'+{t}*' for t in indexed)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT id FROM {table} WHERE {match_sql}', [boolean_query])
+        ).annotate(
+            search_relevance=RawSQL(match_sql, [boolean_query], output_field=FloatField())
+        )
+        for token in leftover:
+            queryset = queryset.filter(Q(title__icontains=token) | Q(artist__icontains=token))
+    else:
+        table = queryset.model._meta.db_table
+        match_query = ' '.join(f'"{t}"*' for t in tokens)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match_query])
+        ).annotate(
+            # bm25() is lower-is-better, so flip the sign
+            search_relevance=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id',
+                [match_query],
+                output_field=FloatField(),
+            )
+        )
+
+    return queryset.annotate(search_score=_score_expression())
+
+
+def _score_expression():
+    peak_boost = (Value(101.0) - Least(F('peak_rank'), Value(100))) / Value(100.0) * Value(PEAK_WEIGHT)
+    weeks_boost = Least(F('weeks_on_chart'), Value(52)) / Value(52.0) * Value(WEEKS_WEIGHT)
+    return ExpressionWrapper(
+        F('search_relevance') * (Value(1.0) + peak_boost + weeks_boost),
+        output_field=FloatField(),
+    )
+
+
+def _icontains_search(queryset, query):
+    queryset = queryset.filter(Q(title__icontains=query) | Q(artist__icontains=query))
+    return queryset.annotate(
+        search_relevance=Value(1.0, output_field=FloatField())
+    ).annotate(search_score=_score_expression())
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance. MySQL keeps its FULLTEXT index up to date by itself; the
+# SQLite FTS5 table has to be written to explicitly.
+# ---------------------------------------------------------------------------
+
+def _uses_fts_table():
+    return connection.vendor == 'sqlite'
+
+
+def index_song(song):
+    if not _uses_fts_table():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [song.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, artist) VALUES (%s, %s, %s)',
+            [song.pk, song.title, song.artist],
+        )
+
+
+def remove_song(song_id):
+    if not _uses_fts_table():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [song_id])
+
+
+def index_songs(song_ids):
+    """Re-index a batch of songs (for bulk writes that skip the signals)."""
+    if not _uses_fts_table() or not song_ids:
+        return
+    from .models import Song
+
+    rows = list(Song.objects.filter(id__in=song_ids).values_list('id', 'title', 'artist'))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[row[0]] for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, artist) VALUES (%s, %s, %s)', rows
+        )
+
+
+def rebuild_index(optimize=False):
+    """
+    Rebuild the search index from scratch. Returns the number of songs indexed.
+
+    MySQL keeps its FULLTEXT index current on every write, so there is nothing
+    to rebuild there. optimize=True runs OPTIMIZE TABLE to merge the index's
+    deleted entries; that locks the songs table, so keep it to maintenance
+    windows.
+    """
+    from .models import Song
+
+    if connection.vendor == 'sqlite':
+        table = Song._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, artist) SELECT id, title, artist FROM {table}'
+            )
+    elif connection.vendor == 'mysql' and optimize:
+        with connection.cursor() as cursor:
+            cursor.execute(f'OPTIMIZE TABLE {Song._meta.db_table}')
+    return Song.objects.count()
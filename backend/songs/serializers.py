@@ -1,6 +1,7 @@
 # songs/serializers.py
 from rest_framework import serializers
 from .models import Song, UserSongComment, UserSongRating, CurrentHot100, Artist, ArtistRelationship, ArtistTagRelation, SongTimeline, SongTag, Bookmark
+from django.db import models
 from django.db.models import Min, Max, Sum, Count
 
 
@@ -132,29 +133,53 @@ class ArtistDetailSerializer(serializers.ModelSerializer):
         } for rel in participants]
     
     def get_billboard_stats(self, obj):
-        """Get Billboard Hot 100 statistics - uses prefetched songs"""
-        songs = [s for s in obj.songs.all()]
-        
-        if not songs:
-            return None
-        
-        # Calculate stats in Python from prefetched data
-        total_hits = len(songs)
-        highest_peak = min(s.peak_rank for s in songs)
-        total_weeks = sum(s.weeks_on_chart for s in songs)
-        first_hit_year = min(s.year for s in songs)
-        last_hit_year = max(s.year for s in songs)
-        number_one_hits = sum(1 for s in songs if s.peak_rank == 1)
-        
-        return {
-            'total_hits': total_hits,
-            'highest_peak': highest_peak,
-            'number_one_hits': number_one_hits,
-            'total_weeks': total_weeks,
-            'first_hit_year': first_hit_year,
-            'last_hit_year': last_hit_year
-        }
+        """Get Billboard Hot 100 statistics - stored on the artist (Artist.refresh_stats)"""
+        return obj.billboard_stats()
+
+
+
+def song_lookup(obj, field):
+    """Filter kwargs matching `field` to the Song behind obj (a Song, or a NumberOneSong by slug)"""
+    if isinstance(obj, Song):
+        return {field: obj}
+    return {f'{field}__slug': obj.slug}
+
+
+class SongListSerializer(serializers.ListSerializer):
+    """
+    many=True mode for SongSerializer: loads the requesting user's ratings and
+    bookmarks for the whole page in two queries instead of two per song.
+    The lookups live on this serializer, keyed by Song id, and the child reads
+    them through self.parent. NumberOneSong rows are matched to their Song by slug.
+    """
+    user_ratings = None
+    bookmarked_song_ids = None
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        request = self.context.get('request')
+        self.song_ids = {}
+        if request and request.user.is_authenticated and items:
+            self.song_ids = self.resolve_song_ids(items)
+            song_ids = list(self.song_ids.values())
+            self.user_ratings = dict(
+                UserSongRating.objects.filter(user=request.user, song_id__in=song_ids).values_list('song_id', 'score')
+            )
+            self.bookmarked_song_ids = set(
+                Bookmark.songs.through.objects.filter(
+                    bookmark__user=request.user, song_id__in=song_ids
+                ).values_list('song_id', flat=True)
+            )
+        return super().to_representation(items)
 
+    @staticmethod
+    def resolve_song_ids(items):
+        """{slug: Song id} for the page; Song rows are their own id, anything else goes by slug"""
+        song_ids = {obj.slug: obj.pk for obj in items if isinstance(obj, Song)}
+        other_slugs = [obj.slug for obj in items if not isinstance(obj, Song)]
+        if other_slugs:
+            song_ids.update(Song.objects.filter(slug__in=other_slugs).values_list('slug', 'id'))
+        return song_ids
 
 
 class SongSerializer(serializers.ModelSerializer):
@@ -173,22 +198,28 @@ class SongSerializer(serializers.ModelSerializer):
     class Meta:
         model = Song
         fields = '__all__'
+        list_serializer_class = SongListSerializer
 
     # --- NEW METHODS ---
     def get_user_rating(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            # Prefetched for the whole page by SongListSerializer
+            if getattr(self.parent, 'user_ratings', None) is not None:
+                return self.parent.user_ratings.get(self.parent.song_ids.get(obj.slug), 0)
             # Using the UserSongRating already imported at the top
-            rating = UserSongRating.objects.filter(song=obj, user=request.user).first()
+            rating = UserSongRating.objects.filter(user=request.user, **song_lookup(obj, 'song')).first()
             return rating.score if rating else 0
         return 0
 
     def get_is_bookmarked(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if getattr(self.parent, 'bookmarked_song_ids', None) is not None:
+                return self.parent.song_ids.get(obj.slug) in self.parent.bookmarked_song_ids
             # Change 'song' to 'songs' to match your model choices:
             # Choices are: id, songs, user, user_id
-            return Bookmark.objects.filter(songs=obj, user=request.user).exists()
+            return Bookmark.objects.filter(user=request.user, **song_lookup(obj, 'songs')).exists()
         return False
 
     # --- YOUR ORIGINAL METHODS (UNCHANGED) ---
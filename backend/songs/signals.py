@@ -1,6 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
+from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Song
+from django.utils import timezone
+from .models import (
+    Song, Artist, SongTag, SongTagRelation, ArtistTagRelation, ArtistRelationship, UserSongComment,
+    ChartSnapshot, UserSongRating, Bookmark, SiteCounters,
+)
+from . import cache as songs_cache, sampling, search, suggest
 
 @receiver(post_save, sender=Song)
 def copy_image_to_artist_songs(sender, instance, created, **kwargs):
@@ -16,8 +22,150 @@ def copy_image_to_artist_songs(sender, instance, created, **kwargs):
         ).exclude(id=instance.id)
         
         # Copy the image to all other songs by this artist
-        updated_count = songs_to_update.update(image_upload=instance.image_upload)
+        updated_count = songs_to_update.update(image_upload=instance.image_upload, updated_at=timezone.now())
         
         # Optional: Print to console for debugging
         if updated_count > 0:
             print(f'Auto-copied image to {updated_count} songs by {instance.artist}')
+
+
+@receiver(post_save, sender=Song)
+def update_search_index(sender, instance, **kwargs):
+    """Keep the full-text search index in step with song titles/artists"""
+    search.index_song(instance)
+
+
+@receiver(post_delete, sender=Song)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_song(instance.pk)
+
+
+# Detail endpoints answer conditional GETs from Song/Artist.updated_at, so
+# changes to rows embedded in those payloads bump the parent's stamp
+
+@receiver([post_save, post_delete], sender=UserSongComment)
+@receiver([post_save, post_delete], sender=SongTagRelation)
+def touch_song(sender, instance, **kwargs):
+    Song.touch([instance.song_id])
+
+
+@receiver([post_save, post_delete], sender=ArtistTagRelation)
+def touch_artist(sender, instance, **kwargs):
+    Artist.touch([instance.artist_id])
+    invalidate_artists([instance.artist_id])
+
+
+@receiver([post_save, post_delete], sender=ArtistRelationship)
+def touch_related_artists(sender, instance, **kwargs):
+    Artist.touch([instance.from_artist_id, instance.to_artist_id])
+    invalidate_artists([instance.from_artist_id, instance.to_artist_id])
+
+
+# Artist chart totals (Artist.total_hits etc.) follow their songs
+
+@receiver(post_save, sender=Song)
+def refresh_artist_stats(sender, instance, **kwargs):
+    Artist.refresh_stats({instance.artist_fk_id, getattr(instance, '_loaded_artist_fk_id', None)})
+
+
+@receiver(post_delete, sender=Song)
+def refresh_artist_stats_after_delete(sender, instance, **kwargs):
+    Artist.refresh_stats([instance.artist_fk_id])
+
+
+# Response cache invalidation (songs/cache.py)
+
+def invalidate_artists(artist_ids):
+    slugs = Artist.objects.filter(pk__in=[pk for pk in artist_ids if pk]).values_list('slug', flat=True)
+    songs_cache.invalidate(*(songs_cache.artist(slug) for slug in slugs))
+
+
+@receiver([post_save, post_delete], sender=Song)
+def invalidate_song_caches(sender, instance, **kwargs):
+    songs_cache.invalidate('songs', 'site', sampling.CACHE_DEPENDENCY, suggest.CACHE_DEPENDENCY)
+    if instance.artist_fk_id:
+        invalidate_artists([instance.artist_fk_id])
+
+
+@receiver([post_save, post_delete], sender=SongTagRelation)
+def invalidate_song_lists(sender, instance, **kwargs):
+    # ?tag= list pages
+    songs_cache.invalidate('songs')
+
+
+@receiver([post_save, post_delete], sender=Artist)
+def invalidate_artist_cache(sender, instance, **kwargs):
+    songs_cache.invalidate(
+        songs_cache.artist(instance.slug), 'site', sampling.CACHE_DEPENDENCY, suggest.CACHE_DEPENDENCY
+    )
+
+
+@receiver([post_save, post_delete], sender=SongTag)
+def invalidate_tag_cache(sender, instance, **kwargs):
+    songs_cache.invalidate(songs_cache.tag(instance.slug), suggest.CACHE_DEPENDENCY)
+
+
+@receiver([post_save, post_delete], sender=ChartSnapshot)
+def invalidate_chart_cache(sender, instance, **kwargs):
+    songs_cache.invalidate(songs_cache.chart(instance.chart_date), 'charts', 'site')
+
+
+# Site counters behind /website-stats/ (SiteCounters). The import commands
+# adjust them for their bulk writes; reconcile_site_counters corrects drift.
+
+@receiver(post_save, sender=Song)
+def count_song_saved(sender, instance, created, **kwargs):
+    deltas = {}
+    # None when the stored credit isn't known (deferred field); assume it didn't change
+    previous = getattr(instance, '_loaded_artist', None)
+    if created:
+        deltas['song_count'] = 1
+        previous = None
+    elif previous is None or previous == instance.artist:
+        return
+    artist_delta = 0
+    if not Song.objects.filter(artist=instance.artist).exclude(pk=instance.pk).exists():
+        artist_delta += 1
+    if previous is not None and not Song.objects.filter(artist=previous).exists():
+        artist_delta -= 1
+    deltas['artist_count'] = artist_delta
+    SiteCounters.adjust(**deltas)
+
+
+@receiver(post_delete, sender=Song)
+def count_song_deleted(sender, instance, **kwargs):
+    last_credit = not Song.objects.filter(artist=instance.artist).exists()
+    SiteCounters.adjust(song_count=-1, artist_count=-1 if last_credit else 0)
+
+
+ENGAGEMENT_COUNTERS = {
+    UserSongRating: 'user_rating_count',
+    UserSongComment: 'user_comment_count',
+    Bookmark: 'bookmark_count',
+}
+
+
+@receiver(post_save, sender=UserSongRating)
+@receiver(post_save, sender=UserSongComment)
+@receiver(post_save, sender=Bookmark)
+def count_engagement_saved(sender, instance, created, **kwargs):
+    if created:
+        SiteCounters.adjust(**{ENGAGEMENT_COUNTERS[sender]: 1})
+
+
+@receiver(post_delete, sender=UserSongRating)
+@receiver(post_delete, sender=UserSongComment)
+@receiver(post_delete, sender=Bookmark)
+def count_engagement_deleted(sender, instance, **kwargs):
+    SiteCounters.adjust(**{ENGAGEMENT_COUNTERS[sender]: -1})
+
+
+@receiver(post_save, sender=User)
+def count_new_member(sender, instance, created, **kwargs):
+    if created:
+        SiteCounters.refresh_newest_user()
+
+
+@receiver(post_delete, sender=User)
+def count_removed_member(sender, instance, **kwargs):
+    SiteCounters.refresh_newest_user()
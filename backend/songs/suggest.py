@@ -0,0 +1,171 @@
+"""
+In-memory prefix index for search-box suggestions.
+
+Each worker builds the index from values_list() queries. Keys live in one
+sorted list so a prefix lookup is two bisects; the ranked top results for very
+short prefixes (where the matching range is huge) are precomputed.
+
+A built index is never modified. Song, Artist and SongTag signals (and the
+bulk import paths) invalidate the CACHE_DEPENDENCY version in the shared
+cache; every worker compares it on use and rebuilds when it changed, at most
+once per MIN_REBUILD_INTERVAL, while its other requests keep answering from
+the previous index. Suggestions can therefore trail a write by up to
+MIN_REBUILD_INTERVAL seconds on every worker.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+
+from . import cache as songs_cache
+
+KINDS = ('songs', 'artists', 'tags')
+CACHE_DEPENDENCY = 'suggest'
+MIN_REBUILD_INTERVAL = 30
+MAX_LIMIT = 10
+SHORT_PREFIX = 2
+# Longer prefixes are answered by scanning the matching key range; cap the scan
+SCAN_LIMIT = 5000
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in text).split())
+
+
+def index_keys(text):
+    """Full normalized name plus every word-start suffix ("the beatles" -> "beatles")."""
+    words = normalize(text).split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+def song_rank(peak_rank, weeks_on_chart):
+    return peak_rank * 1000 - min(weeks_on_chart or 0, 999)
+
+
+def artist_rank(best_peak, hits):
+    return (best_peak or 100) * 1000 - min(hits or 0, 999)
+
+
+def tag_rank(song_count):
+    return -(song_count or 0)
+
+
+class PrefixIndex:
+    def __init__(self, version=None):
+        self._keys = []   # sorted (key, kind, item_id)
+        self._items = {}  # (kind, item_id) -> (rank, payload, keys)
+        self._top = {}    # short prefix -> {kind: [(rank, item_id), ...]}
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, version=None):
+        from .models import Song, Artist, SongTag
+
+        index = cls(version)
+        songs = Song.objects.values_list('id', 'title', 'artist', 'slug', 'peak_rank', 'weeks_on_chart')
+        for song_id, title, artist, slug, peak_rank, weeks in songs.iterator(chunk_size=5000):
+            index._add('songs', song_id, song_rank(peak_rank, weeks),
+                       {'title': title, 'artist': artist, 'slug': slug}, title)
+
+        artists = Artist.objects.filter(total_hits__gt=0).values_list(
+            'id', 'name', 'slug', 'best_peak', 'total_hits'
+        )
+        for artist_id, name, slug, best_peak, hits in artists:
+            index._add('artists', artist_id, artist_rank(best_peak, hits),
+                       {'name': name, 'slug': slug}, name)
+
+        for tag_id, name, slug, song_count in SongTag.objects.values_list('id', 'name', 'slug', 'song_count'):
+            index._add('tags', tag_id, tag_rank(song_count), {'name': name, 'slug': slug}, name)
+
+        index._keys.sort()
+        index._rebuild_top()
+        return index
+
+    def _add(self, kind, item_id, rank, payload, text):
+        keys = index_keys(text)
+        self._items[(kind, item_id)] = (rank, payload, keys)
+        for key in keys:
+            self._keys.append((key, kind, item_id))
+
+    def _rebuild_top(self):
+        self._top = {}
+        seen = set()
+        for key, kind, item_id in self._keys:
+            for length in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                prefix = key[:length]
+                if (prefix, kind, item_id) in seen:
+                    continue
+                seen.add((prefix, kind, item_id))
+                bucket = self._top.setdefault(prefix, {}).setdefault(kind, [])
+                bucket.append((self._items[(kind, item_id)][0], item_id))
+
+        for buckets in self._top.values():
+            for bucket in buckets.values():
+                bucket.sort()
+                del bucket[MAX_LIMIT:]
+
+    def _range(self, prefix):
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + '\uffff',))
+        return self._keys[lo:hi]
+
+    # -- lookups ------------------------------------------------------------
+
+    def suggest(self, query, limit=5):
+        prefix = normalize(query)
+        if not prefix:
+            return {kind: [] for kind in KINDS}
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        if len(prefix) <= SHORT_PREFIX:
+            top = self._top.get(prefix, {})
+            ranked = {kind: top.get(kind, [])[:limit] for kind in KINDS}
+        else:
+            best = {kind: {} for kind in KINDS}
+            for key, kind, item_id in self._range(prefix)[:SCAN_LIMIT]:
+                best[kind][item_id] = self._items[(kind, item_id)][0]
+            ranked = {
+                kind: sorted((rank, item_id) for item_id, rank in found.items())[:limit]
+                for kind, found in best.items()
+            }
+        return {
+            kind: [self._items[(kind, item_id)][1] for _, item_id in ranked[kind]]
+            for kind in KINDS
+        }
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _is_current(index, version, max_age):
+    if index is None:
+        return False
+    age = time.monotonic() - index.built_at
+    if age > max_age:
+        return False
+    return index.version == version or age < MIN_REBUILD_INTERVAL
+
+
+def get_index():
+    """
+    Return this worker's index, rebuilding it when invalidated or too old.
+    Only the first build makes requests wait; a rebuild runs in one request
+    while the others keep using the previous index.
+    """
+    global _index
+    max_age = getattr(settings, 'SUGGEST_INDEX_MAX_AGE', 3600)
+    version = songs_cache.versions([CACHE_DEPENDENCY])[CACHE_DEPENDENCY]
+    if not _is_current(_index, version, max_age):
+        if _build_lock.acquire(blocking=_index is None):
+            try:
+                if not _is_current(_index, version, max_age):
+                    _index = PrefixIndex.build(version)
+            finally:
+                _build_lock.release()
+    return _index
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+
+class SongsAPITestCase(TestCase):
+    """TestCase whose client sends the internal API key, with a clean cache per test"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.defaults['HTTP_X_INTERNAL_KEY'] = settings.INTERNAL_API_KEY
@@ -0,0 +1,42 @@
+from songs.models import Artist, Song
+from songs.tests import SongsAPITestCase
+
+
+class ArtistStatsViewTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist = Artist.objects.create(name='Star')
+        for title, year, peak_rank, weeks in [
+            ('One', 1964, 1, 14), ('Two', 1968, 4, 9), ('Three', 1971, 30, 6), ('Four', 1975, 72, 2),
+        ]:
+            Song.objects.create(title=title, artist='Star', artist_fk=self.artist, year=year,
+                                peak_rank=peak_rank, weeks_on_chart=weeks)
+        # Another artist's songs stay out of the breakdowns
+        Song.objects.create(title='Elsewhere', artist='Other', artist_fk=Artist.objects.create(name='Other'),
+                            year=1966, peak_rank=1, weeks_on_chart=20)
+
+    def stats(self, stats_type):
+        return self.client.get(f'/api/artists/{self.artist.slug}/stats/', {'type': stats_type})
+
+    def test_peaks_and_decades_come_from_one_query(self):
+        with self.assertNumQueries(2):  # the artist, then the aggregation
+            peaks = self.stats('peaks').json()
+        self.assertEqual(peaks, {'#1': 1, 'top_5': 2, 'top_10': 2, 'top_50': 3, 'lower': 1})
+
+        with self.assertNumQueries(2):
+            decades = self.stats('decades').json()
+        self.assertEqual(decades, {
+            '1960s': {'hits': 2, 'total_weeks': 23, 'avg_peak': 2.5},
+            '1970s': {'hits': 2, 'total_weeks': 8, 'avg_peak': 51.0},
+        })
+
+    def test_all_returns_both_breakdowns_and_the_stored_totals(self):
+        with self.assertNumQueries(2):
+            response = self.stats('all').json()
+        self.assertEqual(response['peaks'], self.stats('peaks').json())
+        self.assertEqual(response['decades'], self.stats('decades').json())
+        self.assertEqual(response['billboard_stats']['total_hits'], 4)
+
+    def test_rejects_unknown_types(self):
+        self.assertEqual(self.stats('years').status_code, 400)
+        self.assertEqual(self.client.get('/api/artists/nobody/stats/', {'type': 'peaks'}).status_code, 404)
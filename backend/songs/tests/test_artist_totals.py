@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from songs.models import Artist, Song
+from songs.tests import SongsAPITestCase
+
+
+class ArtistChartTotalsTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.star = Artist.objects.create(name='Star')
+        self.other = Artist.objects.create(name='Other')
+        self.first = Song.objects.create(title='First', artist='Star', artist_fk=self.star, year=1980,
+                                         peak_rank=1, weeks_on_chart=20)
+        self.second = Song.objects.create(title='Second', artist='Star', artist_fk=self.star, year=1986,
+                                          peak_rank=12, weeks_on_chart=7)
+
+    def totals(self, artist):
+        artist.refresh_from_db()
+        return tuple(getattr(artist, field) for field in Artist.STATS_FIELDS)
+
+    def test_song_saves_and_deletes_keep_the_totals_current(self):
+        self.assertEqual(self.totals(self.star), (2, 1, 1, 27, 1980, 1986))
+
+        self.second.peak_rank = 1
+        self.second.save()
+        self.assertEqual(self.totals(self.star), (2, 2, 1, 27, 1980, 1986))
+
+        # Relinking a song moves it between both artists' totals
+        song = Song.objects.get(pk=self.first.pk)
+        song.artist_fk = self.other
+        song.save()
+        self.assertEqual(self.totals(self.star), (1, 1, 1, 7, 1986, 1986))
+        self.assertEqual(self.totals(self.other), (1, 1, 1, 20, 1980, 1980))
+
+        self.second.delete()
+        self.assertEqual(self.totals(self.star), (0, 0, None, 0, None, None))
+        self.assertIsNone(self.star.billboard_stats())
+
+    def test_refresh_writes_only_changed_artists(self):
+        Song.objects.filter(pk=self.first.pk).update(weeks_on_chart=25)  # bypasses the signals
+        before = Artist.objects.get(pk=self.other.pk).updated_at
+
+        self.assertEqual(Artist.refresh_stats([self.star.id, self.other.id, None]), 1)
+        self.assertEqual(self.totals(self.star)[3], 32)
+        self.assertEqual(Artist.objects.get(pk=self.other.pk).updated_at, before)
+        self.assertEqual(Artist.refresh_stats(), 0)
+        self.assertEqual(Artist.refresh_stats([None]), 0)
+
+    def test_command_corrects_drift(self):
+        Artist.objects.filter(pk=self.star.pk).update(total_hits=9, best_peak=None)
+        stdout = StringIO()
+        call_command('refresh_artist_stats', stdout=stdout)
+        self.assertIn('Corrected chart totals on 1 artists', stdout.getvalue())
+        self.assertEqual(self.totals(self.star), (2, 1, 1, 27, 1980, 1986))
+
+    def test_list_and_detail_read_the_stored_totals(self):
+        Artist.objects.filter(pk=self.star.pk).update(total_hits=5)
+        listed = self.client.get('/api/artists/').json()['results']
+        self.assertEqual([(artist['slug'], artist['total_hits']) for artist in listed], [('star', 5)])
+
+        detail = self.client.get('/api/artists/star/').json()
+        self.assertEqual(detail['billboard_stats'], {
+            'total_hits': 5, 'highest_peak': 1, 'number_one_hits': 1, 'total_weeks': 27,
+            'first_hit_year': 1980, 'last_hit_year': 1986,
+        })
@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from songs import cache as songs_cache
+from songs.models import Song, UserSongRating
+from songs.tests import SongsAPITestCase
+
+
+class VersionedCacheTests(SongsAPITestCase):
+    def version(self, dependency='songs'):
+        return songs_cache.versions([dependency])[dependency]
+
+    def test_cached_data_follows_the_dependency_versions(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {'n': len(builds)}
+
+        def fetch(params=None):
+            return songs_cache.cached('view', params, ['songs', songs_cache.song(1)], build)
+
+        self.assertEqual(fetch(), {'n': 1})
+        self.assertEqual(fetch(), {'n': 1})
+        songs_cache.invalidate(songs_cache.song(1))
+        self.assertEqual(fetch(), {'n': 2})
+        songs_cache.invalidate('charts')  # unrelated
+        self.assertEqual(fetch(), {'n': 2})
+        # An evicted version comes back as a new token, never as the old one
+        cache.delete(songs_cache._version_key('songs'))
+        self.assertEqual(fetch(), {'n': 3})
+
+    def test_invalidation_inside_a_transaction_is_repeated_on_commit(self):
+        before = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                songs_cache.invalidate('songs')
+                # Seen at once inside the transaction...
+                during = self.version()
+                self.assertNotEqual(during, before)
+        # ...and replaced again once the write is visible to everyone
+        self.assertNotIn(self.version(), (before, during))
+
+    def test_rating_writes_invalidate_song_lists(self):
+        song = Song.objects.create(title='Hit', artist='Star', year=1990, peak_rank=3, weeks_on_chart=10)
+        params = {'search': 'Hit'}
+        self.assertEqual(self.client.get('/api/songs/', params).json()['results'][0]['total_ratings'], 0)
+        rating = UserSongRating.objects.create(user=User.objects.create_user('alice', password='x'), song=song, score=7)
+        self.assertEqual(self.client.get('/api/songs/', params).json()['results'][0]['average_user_score'], 7.0)
+        rating.delete()
+        self.assertEqual(self.client.get('/api/songs/', params).json()['results'][0]['total_ratings'], 0)
@@ -0,0 +1,43 @@
+import datetime
+
+from songs.models import ChartSnapshot, Song, SongTimeline
+from songs.tests import SongsAPITestCase
+from songs.views.charts import compact_dates
+
+
+class ChartDatesTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        song = Song.objects.create(title='Song', artist='Artist', year=1984, peak_rank=1, weeks_on_chart=3)
+        self.dates = [datetime.date(1984, 1, 7), datetime.date(1984, 1, 14), datetime.date(1984, 1, 28)]
+        for date in self.dates:
+            SongTimeline.objects.create(song=song, chart_date=date, rank=1)
+
+    def test_compact_dates_encodes_gaps_as_exceptions(self):
+        self.assertEqual(compact_dates(self.dates), {
+            'start': '1984-01-07', 'stride': 7, 'count': 3, 'exceptions': [[2, 14]],
+        })
+        self.assertEqual(compact_dates([])['start'], None)
+
+    def test_falls_back_to_timeline_before_snapshots_exist(self):
+        response = self.client.get('/api/songs/charts/dates/')
+        self.assertEqual(response.json()['dates'], ['1984-01-07', '1984-01-14', '1984-01-28'])
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_snapshot_index_answers_conditional_gets(self):
+        for date in self.dates:
+            ChartSnapshot.build_from_timeline(date)
+        response = self.client.get('/api/songs/charts/dates/', {'format': 'compact'})
+        self.assertEqual(response.json()['count'], 3)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get('/api/songs/charts/dates/', {'format': 'compact'}, HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        # Each format has its own ETag
+        self.assertNotEqual(self.client.get('/api/songs/charts/dates/')['ETag'], etag)
+
+        ChartSnapshot.objects.create(chart_date=datetime.date(1984, 2, 4), entries=[])
+        response = self.client.get('/api/songs/charts/dates/', {'format': 'compact'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 4)
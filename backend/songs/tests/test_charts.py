@@ -0,0 +1,75 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+
+from songs.management.commands.update_current_hot100 import Command as UpdateHot100
+from songs.models import ChartSnapshot, Song, SongTimeline
+from songs.tests import SongsAPITestCase
+
+WEEK_1 = datetime.date(1984, 1, 7)
+WEEK_2 = datetime.date(1984, 1, 14)
+
+
+class ChartSnapshotTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.songs = [
+            Song.objects.create(title=f'Song {n}', artist=f'Artist {n}', year=1984, peak_rank=n, weeks_on_chart=10)
+            for n in range(1, 4)
+        ]
+        for rank, song in enumerate(self.songs[:2], start=1):
+            SongTimeline.objects.create(song=song, chart_date=WEEK_1, rank=rank)
+        # Week 2: song 2 climbs, song 3 debuts, song 1 drops off
+        SongTimeline.objects.create(song=self.songs[1], chart_date=WEEK_2, rank=1)
+        SongTimeline.objects.create(song=self.songs[2], chart_date=WEEK_2, rank=2)
+        call_command('build_chart_snapshots', stdout=StringIO())
+
+    def chart(self, date):
+        response = self.client.get(f'/api/songs/charts/hot-100/{date}/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_snapshot_keeps_only_week_fixed_fields(self):
+        snapshot = ChartSnapshot.objects.get(chart_date=WEEK_2)
+        self.assertEqual(snapshot.previous_chart_date, WEEK_1)
+        self.assertEqual(snapshot.entries, [
+            {'song_id': self.songs[1].id, 'position': 1, 'previous_rank': 2, 'movement': 1, 'is_new': False},
+            {'song_id': self.songs[2].id, 'position': 2, 'previous_rank': None, 'movement': None, 'is_new': True},
+        ])
+
+    def test_chart_shows_current_song_details(self):
+        response = self.chart(WEEK_2)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.json()['entries'][0]['slug'], 'artist-2-song-2')
+
+        song = self.songs[1]
+        song.title = 'Renamed'
+        song.peak_rank = 1
+        song.save()
+        entry = self.chart(WEEK_2).json()['entries'][0]
+        self.assertEqual((entry['title'], entry['slug'], entry['peak_rank']), ('Renamed', 'artist-2-renamed', 1))
+
+        song.delete()
+        self.assertEqual([e['title'] for e in self.chart(WEEK_2).json()['entries']], ['Song 3'])
+
+    def test_fallback_date_resolves_to_earlier_week(self):
+        data = self.chart('1984-01-10').json()
+        self.assertEqual((data['chart_date'], data['requested_date']), ('1984-01-07', '1984-01-10'))
+
+    def test_weekly_ingest_and_rebuild_agree(self):
+        chart = [
+            {'title': 'Song 3', 'artist': 'Artist 3', 'rank': 1, 'last_week_rank': 2, 'peak_rank': 1, 'weeks_on_chart': 2},
+            {'title': 'Song 1', 'artist': 'Artist 1', 'rank': 2, 'last_week_rank': None, 'peak_rank': 1, 'weeks_on_chart': 3},
+        ]
+        week_3 = datetime.date(1984, 1, 21)
+        command = UpdateHot100(stdout=StringIO())
+        command.record_chart_week(week_3, chart, command.resolve_chart_songs(chart))
+        ingested = ChartSnapshot.objects.get(chart_date=week_3)
+        self.assertEqual(SongTimeline.objects.filter(chart_date=week_3).count(), 2)
+
+        call_command('build_chart_snapshots', '--rebuild', stdout=StringIO())
+        rebuilt = ChartSnapshot.objects.get(chart_date=week_3)
+        self.assertEqual(rebuilt.entries, ingested.entries)
+        self.assertEqual(rebuilt.previous_chart_date, WEEK_2)
+        self.assertEqual([entry['is_new'] for entry in rebuilt.entries], [False, True])
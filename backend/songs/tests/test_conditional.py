@@ -0,0 +1,73 @@
+from django.test import override_settings
+
+from songs.models import Artist, Song, SongTag, SongTagRelation
+from songs.tests import SongsAPITestCase
+from songs.views import conditional
+
+
+class ConditionalGetTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist = Artist.objects.create(name='Star', musicbrainz_id='mbid-star')
+        self.song = Song.objects.create(title='Hit', artist='Star', artist_fk=self.artist, year=1990,
+                                        peak_rank=1, weeks_on_chart=3)
+        self.urls = [f'/api/songs/{self.song.pk}/', f'/api/songs/{self.song.slug}/']
+
+    def etags(self):
+        etags = []
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etags.append(response['ETag'])
+        return etags
+
+    def statuses(self, etags):
+        return [self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code for url, etag in zip(self.urls, etags)]
+
+    def test_matching_etag_gets_an_empty_304(self):
+        etags = self.etags()
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=f'"other", W/{etags[0]}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etags[0])
+        self.assertEqual(self.statuses(etags), [304, 304])
+
+    def test_song_changes_invalidate(self):
+        etags = self.etags()
+        SongTagRelation.objects.create(song=self.song, tag=SongTag.objects.create(name='Summer'))
+        self.assertEqual(self.statuses(etags), [200, 200])
+
+    def test_embedded_artist_changes_invalidate(self):
+        etags = self.etags()
+        self.artist.bio = 'A new biography'
+        self.artist.save()
+        self.assertEqual(self.statuses(etags), [200, 200])
+
+    def test_authenticated_requests_skip_conditional_handling(self):
+        from django.contrib.auth.models import User
+        from rest_framework.authtoken.models import Token
+
+        etags = self.etags()
+        token = Token.objects.create(user=User.objects.create_user('historian', password='x'))
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etags[0], HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_misses_are_sampled(self):
+        view = 'SongDetailView'
+        conditional.reset_stats([view])
+        with override_settings(CONDITIONAL_GET_MISS_SAMPLE_RATE=0):
+            etag = self.client.get(self.urls[0])['ETag']
+        self.assertEqual(conditional.get_stats([view])[view]['misses'], 0)
+
+        with override_settings(CONDITIONAL_GET_MISS_SAMPLE_RATE=0.5):
+            for _ in range(40):
+                self.client.get(self.urls[0])
+        misses = conditional.get_stats([view])[view]['misses']
+        self.assertEqual(misses % 2, 0)  # each sampled miss counts twice
+        self.assertGreater(misses, 0)
+
+        self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag)
+        stats = conditional.get_stats([view])[view]
+        self.assertEqual(stats['hits'], 1)
+        self.assertGreater(stats['bytes_saved'], 0)
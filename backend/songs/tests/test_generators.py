@@ -0,0 +1,64 @@
+from unittest import mock
+
+from songs import quiz, sampling
+from songs.models import Song
+from songs.tests import SongsAPITestCase
+from songs.views import generators
+
+
+@mock.patch.object(sampling, 'MIN_REBUILD_INTERVAL', 0)
+class GeneratorViewTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        sampling._pools = None
+        self.addCleanup(setattr, sampling, '_pools', None)
+        for n in range(12):
+            Song.objects.create(
+                title=f'Song {n}', artist=f'Artist {n}', year=1960 + n, peak_rank=n + 1, weeks_on_chart=5,
+                spotify_url=f'https://open.spotify.com/track/{n}',
+            )
+
+    def playlist(self, **params):
+        return self.client.get('/api/songs/generate-playlist/', {'decades': [1960], **params})
+
+    def test_playlist_draws_from_the_requested_hits(self):
+        response = self.playlist(number_of_songs=20, hit_size=4)  # top 10
+        self.assertEqual(response.status_code, 200)
+        songs = response.json()
+        self.assertEqual(len(songs), 10)
+        self.assertTrue(all(1960 <= song['year'] <= 1969 and song['peak_rank'] <= 10 for song in songs))
+
+    def test_seed_repeats_the_selection(self):
+        first = self.playlist(number_of_songs=3, hit_size=10)
+        self.assertTrue(first['X-Seed'])
+        again = self.playlist(number_of_songs=3, hit_size=10, seed=first['X-Seed'])
+        self.assertEqual([s['id'] for s in again.json()], [s['id'] for s in first.json()])
+
+    def test_deleted_songs_are_skipped(self):
+        sampling.get_pools()
+        Song.objects.filter(title='Song 0').delete()
+        with mock.patch.object(sampling, 'MIN_REBUILD_INTERVAL', 60):
+            songs = self.playlist(number_of_songs=100, hit_size=10).json()
+        self.assertEqual(len(songs), 9)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/songs/generate-playlist/').status_code, 400)
+        self.assertEqual(self.playlist(decades=['sixties']).status_code, 400)
+        self.assertEqual(self.playlist(decades=[1990]).status_code, 404)
+        self.assertEqual(self.client.get('/api/songs/generate-quiz/', {'decades': [1960], 'types': 'lyrics'}).status_code, 400)
+
+    def test_number_of_songs_is_capped(self):
+        with mock.patch.object(generators, 'MAX_SONGS', 2):
+            self.assertEqual(len(self.playlist(number_of_songs=50, hit_size=10).json()), 2)
+
+    def test_quiz_loads_only_the_sampled_songs(self):
+        self.addCleanup(setattr, quiz, '_pools', None)
+        sampling.get_pools()
+        quiz.get_pools()  # builds the pool table, which bumps the version it loaded
+        quiz.get_pools()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/songs/generate-quiz/', {'decades': [1960], 'number_of_songs': 5, 'hit_size': 10}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
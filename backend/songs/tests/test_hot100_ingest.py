@@ -0,0 +1,75 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from songs.management.commands.update_current_hot100 import Command
+from songs.models import CurrentHot100, NumberOneSong, Song, SongTimeline
+from songs.tests import SongsAPITestCase
+
+
+def entry(rank, title, artist, peak_rank=None, weeks_on_chart=1, last_week_rank=None):
+    return {
+        'rank': rank, 'title': title, 'artist': artist, 'peak_rank': peak_rank or rank,
+        'weeks_on_chart': weeks_on_chart, 'last_week_rank': last_week_rank,
+    }
+
+
+@mock.patch.object(Command, 'run_additional_scripts')
+class UpdateDatabaseTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.command = Command(stdout=StringIO())
+        self.rising = Song.objects.create(title='Rising', artist='Old Band', year=2023, peak_rank=40, weeks_on_chart=3)
+        self.steady = Song.objects.create(title='Steady', artist='Old Band', year=2023, peak_rank=2, weeks_on_chart=30)
+        # Stored under a different slug than the scraper would generate; found by name
+        self.renamed = Song.objects.create(title='Renamed', artist='Someone', year=2022, peak_rank=10, weeks_on_chart=5)
+        Song.objects.filter(pk=self.renamed.pk).update(slug='someone-renamed-legacy')
+        self.renamed.refresh_from_db()
+
+    def chart(self, *songs, chart_date='2024-01-06'):
+        return {'chart_date': chart_date, 'songs': list(songs)}
+
+    def test_resolves_by_slug_then_by_name(self, run_additional_scripts):
+        found = self.command.resolve_chart_songs([
+            entry(1, 'Rising', 'Old Band'), entry(2, 'RENAMED', 'someone'), entry(3, 'Brand New', 'Newcomer'),
+        ])
+        self.assertEqual(found, {'old-band-rising': self.rising, 'someone-renamed': self.renamed})
+
+    def test_creates_and_improves_songs(self, run_additional_scripts):
+        self.command.update_database(self.chart(
+            entry(1, 'Rising', 'Old Band', weeks_on_chart=4),
+            entry(2, 'Steady', 'Old Band', peak_rank=2, weeks_on_chart=20),  # nothing better, skipped
+            entry(3, 'Brand New', 'Newcomer'),
+            entry(4, 'Brand New', 'Newcomer'),  # duplicate entry, created once
+        ))
+
+        self.rising.refresh_from_db()
+        self.assertEqual((self.rising.peak_rank, self.rising.weeks_on_chart), (1, 4))
+        self.steady.refresh_from_db()
+        self.assertEqual((self.steady.peak_rank, self.steady.weeks_on_chart), (2, 30))
+        created = Song.objects.get(slug='newcomer-brand-new')
+        self.assertEqual((created.year, created.artist_slug), (2024, 'newcomer'))
+
+        updated_ids = run_additional_scripts.call_args.args[1]
+        self.assertCountEqual(updated_ids, [self.rising.id, created.id])
+        self.assertEqual(CurrentHot100.objects.count(), 4)
+        self.assertEqual(list(NumberOneSong.objects.values_list('slug', flat=True)), ['old-band-rising'])
+        self.assertEqual(
+            SongTimeline.objects.filter(chart_date=date(2024, 1, 6)).count(), 3,
+        )
+
+    def test_song_writes_do_not_grow_with_the_chart(self, run_additional_scripts):
+        def song_writes(size):
+            songs = [entry(rank, f'Title {size}-{rank}', f'Artist {rank}') for rank in range(2, size + 2)]
+            with CaptureQueriesContext(connection) as queries:
+                with mock.patch.object(Command, 'update_current_hot100_table'):
+                    self.command.update_database(self.chart(*songs))
+            return sum(
+                1 for query in queries.captured_queries
+                if query['sql'].startswith(('INSERT INTO "songs_song"', 'UPDATE "songs_song"'))
+            )
+
+        self.assertEqual(song_writes(5), song_writes(50))
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from songs.models import Song, SongTimeline
+from songs.tests import SongsAPITestCase
+from songs.utils import iter_json_array
+
+
+def split_every(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    items = [{'date': '2020-01-04', 'data': [{'song': 'Señorita', 'rank': 1}]}, 12345, -2.5e3, 'x', [], None, True]
+
+    def test_every_chunk_size(self):
+        data = json.dumps(self.items, ensure_ascii=False).encode()
+        for size in range(1, len(data) + 1):
+            with self.subTest(size=size):
+                self.assertEqual(list(iter_json_array(split_every(data, size))), self.items)
+
+    def test_number_split_across_chunks(self):
+        # "12" would decode on its own; the element isn't final until the next character
+        self.assertEqual(list(iter_json_array([b'[1', b'2', b'3.', b'5e', b'1, 4', b'2]'])), [123.5e1, 42])
+        self.assertEqual(list(iter_json_array([b' [ 7', b' ] '])), [7])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array([b'[', b']'])), [])
+
+    def test_rejects_truncated_or_non_array_input(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[{"a": 1}, {"b"']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[1, 2']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"a": 1}']))
+
+
+class ImportBillboardDataTests(SongsAPITestCase):
+    weeks = [
+        {'date': '2008-12-27', 'data': [{'song': 'Too Early', 'artist': 'Nobody', 'this_week': 1,
+                                         'peak_position': 1, 'weeks_on_chart': 1}]},
+        {'date': '2010-01-02', 'data': [
+            {'song': 'Tik Tok', 'artist': 'Ke$ha', 'this_week': 1, 'peak_position': 1, 'weeks_on_chart': 8},
+            {'song': 'Bad Romance', 'artist': 'Lady Gaga', 'this_week': 2, 'peak_position': 2, 'weeks_on_chart': 9},
+        ]},
+        {'date': '2010-01-09', 'data': [
+            {'song': 'Tik Tok', 'artist': 'Ke$ha', 'this_week': 1, 'peak_position': 1, 'weeks_on_chart': 9},
+        ]},
+    ]
+
+    def write_archive(self, content):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'wb') as archive:
+            archive.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, content, *args):
+        call_command('import_billboard_data', '--import', '--file', self.write_archive(content), *args,
+                     stdout=StringIO())
+
+    def test_stream_import_matches_the_in_memory_import(self):
+        content = json.dumps(self.weeks).encode()
+        results = []
+        for args in ([], ['--stream', '--batch-size', '1']):
+            SongTimeline.objects.all().delete()
+            Song.objects.all().delete()
+            self.run_import(content, *args)
+            results.append((
+                sorted(Song.objects.values_list('title', 'peak_rank', 'weeks_on_chart')),
+                sorted(SongTimeline.objects.values_list('song__title', 'chart_date', 'rank')),
+            ))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual([title for title, _, _ in results[0][0]], ['Bad Romance', 'Tik Tok'])
+        self.assertEqual(len(results[0][1]), 3)
+
+    def test_malformed_archive_fails_the_command(self):
+        content = json.dumps(self.weeks).encode()[:-20]
+        for args in ([], ['--stream']):
+            with self.subTest(args=args), self.assertRaisesMessage(CommandError, 'Error parsing JSON'):
+                self.run_import(content, *args)
+
+    def test_bad_entry_field_is_named(self):
+        weeks = json.loads(json.dumps(self.weeks))
+        weeks[2]['data'][0]['weeks_on_chart'] = 'nine'
+        content = json.dumps(weeks).encode()
+        message = "Invalid weeks_on_chart 'nine' for 'Tik Tok' by Ke$ha in the 2010-01-09 chart"
+        for args in ([], ['--stream']):
+            with self.subTest(args=args), self.assertRaisesMessage(CommandError, message):
+                self.run_import(content, *args)
+        self.assertFalse(Song.objects.exists())
@@ -0,0 +1,39 @@
+from songs.models import NumberOneSong, Song
+from songs.tests import SongsAPITestCase
+
+
+class NumberOneSyncTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.hit = Song.objects.create(title='Hit', artist='Star', year=1999, peak_rank=1, weeks_on_chart=12)
+        self.other = Song.objects.create(title='Other', artist='Star', year=1998, peak_rank=1, weeks_on_chart=8)
+        Song.objects.create(title='Near Miss', artist='Star', year=1999, peak_rank=2, weeks_on_chart=9)
+
+    def test_only_changed_rows_are_written(self):
+        self.assertEqual(NumberOneSong.sync_from_songs(), (2, 0, 0))
+        row_ids = dict(NumberOneSong.objects.values_list('slug', 'id'))
+        self.assertEqual(NumberOneSong.sync_from_songs(), (0, 0, 0))
+
+        Song.objects.filter(pk=self.hit.pk).update(weeks_on_chart=13)
+        Song.objects.filter(pk=self.other.pk).update(peak_rank=3)
+        Song.objects.create(title='New Hit', artist='Star', year=2000, peak_rank=1, weeks_on_chart=4)
+        self.assertEqual(NumberOneSong.sync_from_songs(), (1, 1, 1))
+
+        rows = {row.slug: row for row in NumberOneSong.objects.all()}
+        self.assertEqual(set(rows), {'star-hit', 'star-new-hit'})
+        self.assertEqual(rows['star-hit'].id, row_ids['star-hit'])  # updated in place
+        self.assertEqual(rows['star-hit'].weeks_on_chart, 13)
+
+    def test_anonymous_list_is_cached_until_the_table_changes(self):
+        NumberOneSong.sync_from_songs()
+        self.assertEqual(len(self.client.get('/api/songs/number-one-songs/').json()), 2)
+
+        # Song edits only show up once a sync actually changes the table
+        Song.objects.filter(pk=self.other.pk).update(peak_rank=3)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get('/api/songs/number-one-songs/').json()), 2)
+
+        self.assertEqual(NumberOneSong.sync_from_songs(), (0, 0, 1))
+        self.assertEqual(
+            [row['slug'] for row in self.client.get('/api/songs/number-one-songs/').json()], ['star-hit'],
+        )
@@ -0,0 +1,81 @@
+import base64
+import json
+
+from songs.models import Artist, Song
+from songs.tests import SongsAPITestCase
+
+
+def crafted(values, reverse=False):
+    cursor = {'v': values, 'r': 1} if reverse else {'v': values}
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode('ascii')
+
+
+class KeysetPaginationTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Repeated years and peaks, so the pages have to break ties on id
+        for n in range(11):
+            Song.objects.create(title=f'Song {n:02}', artist='Star', year=1980 + n % 3,
+                                peak_rank=1 + n % 4, weeks_on_chart=n)
+
+    def walk(self, params):
+        """Titles page by page following next links, then back again following previous links"""
+        response = self.client.get('/api/songs/', {'pagination': 'cursor', 'page_size': 3, **params}).json()
+        forward = [[song['title'] for song in response['results']]]
+        self.assertIsNone(response['previous'])
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            forward.append([song['title'] for song in response['results']])
+        backward = [[song['title'] for song in response['results']]]
+        while response['previous']:
+            response = self.client.get(response['previous']).json()
+            backward.insert(0, [song['title'] for song in response['results']])
+        return forward, backward
+
+    def test_cursors_round_trip_under_every_sort(self):
+        for sort_by in ('id', 'title', 'year', 'peak_rank'):
+            for order in ('asc', 'desc'):
+                with self.subTest(sort_by=sort_by, order=order):
+                    expected = [song['title'] for song in self.client.get(
+                        '/api/songs/', {'sort_by': sort_by, 'order': order}).json()['results']]
+                    forward, backward = self.walk({'sort_by': sort_by, 'order': order})
+                    self.assertEqual([title for page in forward for title in page], expected)
+                    self.assertEqual([len(page) for page in forward], [3, 3, 3, 2])
+                    self.assertEqual(backward, forward)
+
+    def test_artist_list_cursor_round_trip(self):
+        for name in ('Cee', 'Abe', 'Bea', 'Dee', 'Eve'):
+            Artist.objects.create(name=name, total_hits=1)
+        response = self.client.get('/api/artists/', {'pagination': 'cursor', 'page_size': 2}).json()
+        names = [artist['name'] for artist in response['results']]
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            names.extend(artist['name'] for artist in response['results'])
+        self.assertEqual(names, ['Abe', 'Bea', 'Cee', 'Dee', 'Eve'])
+
+    def test_crafted_cursors_are_not_found(self):
+        for cursor in [
+            'not base64!', crafted([1]), crafted({'a': 1}), crafted([{'a': 1}, 1]), crafted([[1], 1]),
+            crafted(['not a year', 1]), crafted([None, 1]), crafted([1980, 2 ** 70]), crafted([1980, 'x'], True),
+        ]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/songs/', {'sort_by': 'year', 'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+        # Numeric strings are what the field would accept
+        response = self.client.get('/api/songs/', {'sort_by': 'year', 'cursor': crafted(['1981', '0'])})
+        self.assertEqual(response.status_code, 200)
+
+    def test_relevance_ranked_search_keeps_page_numbers(self):
+        response = self.client.get('/api/songs/', {'search': 'song', 'pagination': 'cursor', 'page_size': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 11)
+        self.assertIn('page=2', response.json()['next'])
+
+        # A cursor left over from another listing doesn't apply to relevance pages
+        response = self.client.get('/api/songs/', {'search': 'song', 'cursor': crafted([{'a': 1}, 1])})
+        self.assertEqual(response.status_code, 200)
+
+        # An explicit sort is a stable order again
+        response = self.client.get('/api/songs/', {'search': 'song', 'sort_by': 'year', 'pagination': 'cursor'})
+        self.assertNotIn('count', response.json())
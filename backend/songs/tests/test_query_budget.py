@@ -0,0 +1,118 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from songs import sampling, quiz, suggest
+from songs.models import (
+    Artist, ArtistTag, ArtistTagRelation, Bookmark, ChartSnapshot, CurrentHot100, NumberOneSong,
+    Song, SongTag, SongTagRelation, SongTimeline, UserSongComment, UserSongRating,
+)
+from songs.tests import SongsAPITestCase
+from songs.urls import urlpatterns
+
+# More rows of each kind than QUERY_BUDGET_N_PLUS_ONE_THRESHOLD, so a query per
+# row shows up as a repeated SQL shape
+ROWS = 12
+CHART_DATE = datetime.date(1985, 3, 2)
+
+# GET request (path relative to /api/songs/, query) per songs/urls.py route.
+# Routes without GET are listed as None.
+REQUESTS = {
+    '': ('', {'sort_by': 'peak_rank'}),
+    'suggest/': ('suggest/', {'q': 'so'}),
+    'website-stats/': ('website-stats/', {}),
+    'trending-archive/': ('trending-archive/', {}),
+    '<int:pk>/': ('{song}/', {}),
+    '<int:pk>/timeline/': ('{song}/timeline/', {}),
+    'slug/<slug:slug>/timeline/': ('slug/{slug}/timeline/', {}),
+    'bookmarked-songs/': ('bookmarked-songs/', {}),
+    '<int:song_id>/bookmark-status/': ('{song}/bookmark-status/', {}),
+    '<int:song_id>/comment-status/': ('{song}/comment-status/', {}),
+    'random-song/': ('random-song/', {}),
+    'top-rated-songs/': ('top-rated-songs/', {}),
+    'number-one-songs/': ('number-one-songs/', {}),
+    'songs-with-images/': ('songs-with-images/', {}),
+    'featured-artists/': ('featured-artists/', {}),
+    'random-songs-by-decade/': ('random-songs-by-decade/', {'decade': 1980}),
+    'random-by-artist/': ('random-by-artist/', {'artist_slug': 'artist-0'}),
+    'generate-playlist/': ('generate-playlist/', {'decades': 1980, 'hit_size': 10}),
+    'generate-quiz/': ('generate-quiz/', {'decades': 1980, 'hit_size': 10, 'types': ['artist', 'year', 'peak']}),
+    'current-hot100/': ('current-hot100/', {}),
+    'charts/dates/': ('charts/dates/', {}),
+    'charts/hot-100/<str:date_str>/': ('charts/hot-100/1985-03-02/', {}),
+    '<slug:slug>/': ('{slug}/', {}),
+    '<int:pk>/comment/': None,
+    '<int:song_pk>/comment/<int:comment_pk>/': None,
+    '<int:pk>/rate/': None,
+    'ratings/<int:song_id>/user/<int:user_id>/': ('ratings/{song}/user/{user}/', {}),
+    '<int:song_id>/bookmark/': None,
+}
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, QUERY_BUDGET_DEFAULT=10)
+class QueryBudgetTests(SongsAPITestCase):
+    """Every songs endpoint stays within its query budget and free of N+1 queries"""
+    client_class = APIClient
+
+    def setUp(self):
+        super().setUp()
+        sampling._pools = quiz._pools = suggest._index = None
+        self.user = User.objects.create_user('historian', password='x')
+        bookmarks = Bookmark.objects.create(user=self.user)
+        tags = [SongTag.objects.create(name=f'Tag {n}') for n in range(3)]
+        genre = ArtistTag.objects.create(name='Pop')
+        for n in range(ROWS):
+            artist = Artist.objects.create(name=f'Artist {n}', image=f'artists/{n}.jpg')
+            ArtistTagRelation.objects.create(artist=artist, tag=genre)
+            song = Song.objects.create(
+                title=f'Song {n}', artist=artist.name, artist_fk=artist, year=1980 + n % 10,
+                peak_rank=n + 1, weeks_on_chart=10, spotify_url=f'https://open.spotify.com/track/{n}',
+                image_upload=f'song_images/{n}.jpg',
+            )
+            SongTagRelation.objects.create(song=song, tag=tags[n % 3])
+            UserSongRating.objects.create(user=self.user, song=song, score=8)
+            UserSongComment.objects.create(user=self.user, song=song, text='Great')
+            bookmarks.songs.add(song)
+            SongTimeline.objects.create(song=song, chart_date=CHART_DATE, rank=n + 1)
+            CurrentHot100.objects.create(
+                title=song.title, artist=song.artist, year=song.year, peak_rank=song.peak_rank,
+                weeks_on_chart=10, current_position=n + 1, slug=song.slug, chart_date=CHART_DATE,
+            )
+        NumberOneSong.sync_from_songs()
+        ChartSnapshot.build_from_timeline(CHART_DATE)
+        self.song = song
+        self.client.force_authenticate(self.user)
+
+    def test_every_route_is_covered(self):
+        self.assertEqual({str(pattern.pattern) for pattern in urlpatterns}, set(REQUESTS))
+
+    def test_endpoints_stay_within_budget(self):
+        ids = {'song': self.song.id, 'slug': self.song.slug, 'user': self.user.id}
+        for route, request in REQUESTS.items():
+            if request is None:
+                continue
+            path, params = request
+            with self.subTest(route=route):
+                response = self.client.get(f'/api/songs/{path.format(**ids)}', params)
+                self.assertEqual(response.status_code, 200, response.content[:200])
+
+
+class QueryBudgetReportTests(SongsAPITestCase):
+    @override_settings(QUERY_BUDGET_REPORT=False)
+    def test_no_timing_header_or_log_by_default(self):
+        with self.assertNoLogs('core.query_budget', level='INFO'):
+            response = self.client.get('/api/songs/charts/dates/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(QUERY_BUDGET_REPORT=True)
+    def test_report_mode_adds_timing_and_log_line(self):
+        with self.assertLogs('core.query_budget', level='INFO'):
+            response = self.client.get('/api/songs/charts/dates/')
+        self.assertIn('queries"', response['Server-Timing'])
+
+    @override_settings(QUERY_BUDGET_REPORT=False, QUERY_BUDGET_DEFAULT=0)
+    def test_over_budget_is_logged_as_warning(self):
+        with self.assertLogs('core.query_budget', level='WARNING'):
+            self.client.get('/api/songs/charts/dates/')
@@ -0,0 +1,62 @@
+import random
+
+from songs import quiz
+from songs.models import Artist, ArtistTag, ArtistTagRelation, QuizDistractorPool, Song
+from songs.tests import SongsAPITestCase
+
+
+class QuizTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        quiz._pools = None
+        self.addCleanup(setattr, quiz, '_pools', None)
+        disco = ArtistTag.objects.create(name='Disco', category='genre')
+        for name, peak, tagged in [
+            ('Bee Gees', 1, True), ('Chic', 1, True), ('Donna Summer', 2, True),
+            ('Eagles', 1, False), ('Foreigner', 2, False), ('Queen', 3, False), ('Styx', 60, False),
+        ]:
+            artist = Artist.objects.create(name=name)
+            if tagged:
+                ArtistTagRelation.objects.create(artist=artist, tag=disco, source='test')
+            Song.objects.create(title=f'{name} hit', artist=name, artist_fk=artist, year=1978,
+                                peak_rank=peak, weeks_on_chart=10)
+        self.song = Song.objects.get(artist='Bee Gees')
+
+    def test_pools_group_credits_by_decade_and_peak_band(self):
+        self.assertEqual(QuizDistractorPool.refresh(), (3, 0, 0))
+        pools = {(pool.decade, pool.peak_band): [credit for credit, _ in pool.artists]
+                 for pool in QuizDistractorPool.objects.all()}
+        self.assertEqual(pools, {
+            (1970, 1): ['Bee Gees', 'Chic', 'Eagles'],
+            (1970, 2): ['Donna Summer', 'Foreigner', 'Queen'],
+            (1970, 4): ['Styx'],
+        })
+        self.assertEqual(QuizDistractorPool.refresh(), (0, 0, 0))
+
+    def test_artist_options_prefer_shared_tags_then_fall_back(self):
+        pools = quiz.get_pools()
+        for seed in range(20):
+            options = pools.artist_options('Bee Gees', 1970, 1, random.Random(seed))
+            self.assertEqual(len(set(options)), 3)
+            self.assertNotIn('Bee Gees', options)
+            self.assertIn('Chic', options)  # the only tag-sharing artist in the same pool
+        # Styx's band has nobody else; the other bands of the decade fill in
+        self.assertEqual(len(pools.artist_options('Styx', 1970, 4, random.Random(1), count=6)), 6)
+
+    def test_questions(self):
+        questions = quiz.build_quiz([self.song] * 3, ['artist', 'year', 'peak'], random.Random(3))
+        self.assertEqual([q['type'] for q in questions], ['artist', 'year', 'peak'])
+        for question in questions:
+            self.assertEqual(len(set(question['options'])), 4)
+            self.assertIn(question['answer'], question['options'])
+        self.assertEqual([q['answer'] for q in questions], ['Bee Gees', 1978, 1])
+        self.assertTrue(all(abs(year - 1978) <= 5 for year in questions[1]['options']))
+
+    def test_workers_reload_after_the_pools_change(self):
+        pools = quiz.get_pools()
+        self.assertIs(quiz.get_pools(), quiz.get_pools())
+        Song.objects.create(title='Another', artist='Village People', year=1979, peak_rank=3, weeks_on_chart=5)
+        QuizDistractorPool.refresh()
+        reloaded = quiz.get_pools()
+        self.assertIsNot(reloaded, pools)
+        self.assertIn('Village People', reloaded.artist_options('Chic', 1970, 2, random.Random(0), count=4))
@@ -0,0 +1,122 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from songs.models import RatingEvent, Song, UserSongRating
+from songs.tests import SongsAPITestCase
+
+
+class RatingAggregateTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.song = Song.objects.create(title='Hit', artist='Star', year=1990, peak_rank=3, weeks_on_chart=10)
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+
+    def aggregates(self):
+        self.song.refresh_from_db()
+        return self.song.total_ratings, self.song.rating_sum, self.song.average_user_score
+
+    def test_insert_update_delete_move_the_aggregates(self):
+        rating = UserSongRating.objects.create(user=self.alice, song=self.song, score=8)
+        UserSongRating.objects.create(user=self.bob, song=self.song, score=5)
+        self.assertEqual(self.aggregates(), (2, 13, 6.5))
+
+        rating.score = 10
+        rating.save()
+        self.assertEqual(self.aggregates(), (2, 15, 7.5))
+
+        # A freshly loaded instance still knows the stored score
+        UserSongRating.objects.get(pk=rating.pk).delete()
+        self.assertEqual(self.aggregates(), (1, 5, 5.0))
+
+    def test_unloaded_instance_reads_the_stored_score(self):
+        rating = UserSongRating.objects.create(user=self.alice, song=self.song, score=4)
+        UserSongRating(pk=rating.pk, user=self.alice, song=self.song, score=9, created_at=rating.created_at).save()
+        self.assertEqual(self.aggregates(), (1, 9, 9.0))
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        UserSongRating.objects.create(user=self.alice, song=self.song, score=6)
+        Song.objects.filter(pk=self.song.pk).update(total_ratings=3, rating_sum=1, average_user_score=0.3)
+
+        stdout = StringIO()
+        call_command('reconcile_song_ratings', stdout=stdout)
+        self.assertIn('1 songs have drifted', stdout.getvalue())
+        self.assertEqual(self.aggregates(), (3, 1, 0.3))
+
+        call_command('reconcile_song_ratings', '--fix', stdout=StringIO())
+        self.assertEqual(self.aggregates(), (1, 6, 6.0))
+
+
+class RatingEventFlushTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.songs = [
+            Song.objects.create(title=f'Song {n}', artist='Star', year=1990, peak_rank=3, weeks_on_chart=10)
+            for n in range(2)
+        ]
+        self.alice = User.objects.create_user('alice', password='x')
+        self.bob = User.objects.create_user('bob', password='x')
+
+    def test_last_event_per_user_and_song_wins(self):
+        first, second = self.songs
+        UserSongRating.objects.create(user=self.alice, song=second, score=2)
+        for user, song, score in [
+            (self.alice, first, 3), (self.bob, first, 6), (self.alice, first, 9),
+            (self.alice, second, 4), (self.alice, second, 8),
+        ]:
+            RatingEvent.objects.create(user=user, song=song, score=score)
+
+        self.assertEqual(RatingEvent.flush(batch_size=3), (3, 1, 2))
+        self.assertEqual(RatingEvent.flush(), (2, 1, 1))
+        self.assertEqual(RatingEvent.flush(), (0, 0, 0))
+
+        self.assertEqual(
+            sorted(UserSongRating.objects.values_list('user__username', 'song__title', 'score')),
+            [('alice', 'Song 0', 9), ('alice', 'Song 1', 8), ('bob', 'Song 0', 6)],
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.total_ratings, first.rating_sum, first.average_user_score), (2, 15, 7.5))
+        self.assertEqual((second.total_ratings, second.rating_sum, second.average_user_score), (1, 8, 8.0))
+
+    def test_flush_invalidates_cached_song_lists(self):
+        song = self.songs[0]
+        params = {'search': 'Song 0'}
+        self.assertEqual(self.client.get('/api/songs/', params).json()['results'][0]['total_ratings'], 0)
+        RatingEvent.objects.create(user=self.alice, song=song, score=7)
+        RatingEvent.flush()
+        self.assertEqual(self.client.get('/api/songs/', params).json()['results'][0]['total_ratings'], 1)
+
+
+class RatingViewTests(SongsAPITestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        super().setUp()
+        self.song = Song.objects.create(title='Hit', artist='Star', year=1990, peak_rank=3, weeks_on_chart=10)
+        self.client.force_authenticate(User.objects.create_user('alice', password='x'))
+
+    def rate(self, rating, pk=None):
+        return self.client.post(f'/api/songs/{pk or self.song.pk}/rate/', {'rating': rating}, format='json')
+
+    def test_bad_ratings_are_rejected_before_queuing(self):
+        for write_behind in (True, False):
+            with self.subTest(write_behind=write_behind), override_settings(RATING_WRITE_BEHIND=write_behind):
+                for rating in ('abc', '', [7], 0, -3, 11):
+                    self.assertEqual(self.rate(rating).status_code, 400, rating)
+                self.assertEqual(self.rate(7, pk=self.song.pk + 100).status_code, 404)
+        self.assertFalse(RatingEvent.objects.exists())
+        self.assertFalse(UserSongRating.objects.exists())
+
+    def test_valid_ratings_are_queued_or_applied(self):
+        with override_settings(RATING_WRITE_BEHIND=True):
+            self.assertEqual(self.rate('8').status_code, 201)
+        self.assertEqual(list(RatingEvent.objects.values_list('score', flat=True)), [8])
+
+        with override_settings(RATING_WRITE_BEHIND=False):
+            self.assertEqual(self.rate(10).status_code, 201)
+        self.assertEqual(list(UserSongRating.objects.values_list('score', flat=True)), [10])
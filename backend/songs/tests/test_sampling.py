@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+from unittest import mock
+
+from songs import sampling
+from songs.models import Artist, Song
+from songs.tests import SongsAPITestCase
+
+
+@mock.patch.object(sampling, 'MIN_REBUILD_INTERVAL', 0)
+class SamplePoolsTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        sampling._pools = None
+        self.addCleanup(setattr, sampling, '_pools', None)
+        self.artist = Artist.objects.create(name='Star')
+        self.songs = {}
+        for title, year, peak, spotify in [
+            ('A', 1961, 1, True), ('B', 1965, 5, True), ('C', 1969, 40, True), ('D', 1968, 2, False),
+            ('E', 1984, 3, True), ('F', 1987, 90, False),
+        ]:
+            self.songs[title] = Song.objects.create(
+                title=title, artist='Star', artist_fk=self.artist if title in 'AE' else None, year=year,
+                peak_rank=peak, weeks_on_chart=1, spotify_url=f'https://open.spotify.com/{title}' if spotify else None,
+            )
+
+    def ids(self, *titles):
+        return {self.songs[title].id for title in titles}
+
+    def test_pools(self):
+        pools = sampling.get_pools()
+        self.assertEqual(pools.size('songs'), 6)
+        self.assertEqual(pools.size('spotify'), 4)
+        self.assertEqual(pools.size('spotify:1960'), 3)
+        self.assertEqual(set(pools.sample('artist:star', 10)), self.ids('A', 'E'))
+        self.assertEqual(pools.size('artist:nobody'), 0)
+        self.assertIsNone(pools.choice('artist:nobody'))
+
+    def test_sample_charted_filters_by_decade_and_peak(self):
+        pools = sampling.get_pools()
+        ids, total = pools.sample_charted(10, [1960, 1980], max_peak_rank=5)
+        self.assertEqual((set(ids), total), (self.ids('A', 'B', 'E'), 3))
+        ids, total = pools.sample_charted(10, [1960], max_peak_rank=5, spotify_only=False)
+        self.assertEqual((set(ids), total), (self.ids('A', 'B', 'D'), 3))
+        self.assertEqual(len(pools.sample_charted(2, [1960, 1980], 100)[0]), 2)
+
+    def test_sampling_is_uniform_and_repeatable(self):
+        pools = sampling.get_pools()
+        counts = Counter(pools.choice('songs', random.Random(seed)) for seed in range(6000))
+        self.assertEqual(set(counts), self.ids(*'ABCDEF'))
+        self.assertLess(max(counts.values()) - min(counts.values()), 200)
+        self.assertEqual(
+            sampling.sample_songs(3, [1960], 100, rng=random.Random(7)),
+            sampling.sample_songs(3, [1960], 100, rng=random.Random(7)),
+        )
+
+    def test_odd_year_ranges_fall_back_to_the_database(self):
+        ids, total = sampling.sample_songs(10, [1965], max_peak_rank=50)
+        self.assertEqual((set(ids), total), (self.ids('B', 'C'), 2))  # 1965-1974
+
+    def test_rebuilds_after_song_changes(self):
+        pools = sampling.get_pools()
+        Song.objects.create(title='G', artist='Star', year=1990, peak_rank=1, weeks_on_chart=1)
+        with mock.patch.object(sampling, 'MIN_REBUILD_INTERVAL', 60):
+            self.assertIs(sampling.get_pools(), pools)
+        self.assertEqual(sampling.get_pools().size('songs'), 7)
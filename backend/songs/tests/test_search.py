@@ -0,0 +1,40 @@
+from django.core.management import call_command
+from io import StringIO
+
+from songs import search
+from songs.models import Song
+from songs.tests import SongsAPITestCase
+
+
+class SongSearchTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Song.objects.create(title='Billie Jean', artist='Michael Jackson', year=1983, peak_rank=1, weeks_on_chart=24)
+        Song.objects.create(title='Jean Genie', artist='David Bowie', year=1973, peak_rank=71, weeks_on_chart=3)
+        self.song = Song.objects.create(title='Beat It', artist='Michael Jackson', year=1983, peak_rank=1, weeks_on_chart=25)
+
+    def titles(self, query):
+        return [song.title for song in search.search_songs(Song.objects.all(), query).order_by('-search_score', 'id')]
+
+    def test_prefix_match_ranks_bigger_hits_first(self):
+        self.assertEqual(self.titles('jea'), ['Billie Jean', 'Jean Genie'])
+
+    def test_index_follows_song_saves_and_deletes(self):
+        self.song.title = 'Thriller'
+        self.song.save()
+        self.assertEqual(self.titles('thrill'), ['Thriller'])
+        self.assertEqual(self.titles('beat'), [])
+
+        self.song.delete()
+        self.assertEqual(self.titles('thrill'), [])
+
+    def test_song_list_search(self):
+        response = self.client.get('/api/songs/', {'search': 'michael'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({song['title'] for song in response.json()['results']}, {'Billie Jean', 'Beat It'})
+
+    def test_rebuild_command_restores_the_index(self):
+        search.remove_song(self.song.pk)
+        self.assertEqual(self.titles('beat'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.titles('beat'), ['Beat It'])
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from songs.models import Bookmark, NumberOneSong, Song, UserSongRating
+from songs.serializers import SongSerializer
+from songs.tests import SongsAPITestCase
+
+
+class SongListSerializerTests(SongsAPITestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('historian', password='x')
+        self.songs = [
+            Song.objects.create(title=f'Song {n}', artist='Artist', year=1970 + n, peak_rank=1, weeks_on_chart=5)
+            for n in range(3)
+        ]
+        # Burn some ids so NumberOneSong pks don't line up with Song ids
+        NumberOneSong.objects.bulk_create(
+            NumberOneSong(title='Gone', artist='Gone', year=1900, peak_rank=1, weeks_on_chart=1, slug=f'gone-{n}')
+            for n in range(5)
+        )
+        NumberOneSong.objects.filter(slug__startswith='gone-').delete()
+        NumberOneSong.sync_from_songs()
+        UserSongRating.objects.create(user=self.user, song=self.songs[1], score=9)
+        Bookmark.objects.create(user=self.user).songs.add(self.songs[2])
+        self.client.force_authenticate(self.user)
+
+    def assert_personal_fields(self, rows):
+        by_slug = {row['slug']: row for row in rows}
+        self.assertEqual([by_slug[song.slug]['user_rating'] for song in self.songs], [0, 9, 0])
+        self.assertEqual([by_slug[song.slug]['is_bookmarked'] for song in self.songs], [False, False, True])
+
+    def test_number_ones_match_their_song_by_slug(self):
+        with self.assertNumQueries(4):  # page, Song ids, ratings, bookmarks
+            response = self.client.get('/api/songs/number-one-songs/')
+        self.assertEqual(response.status_code, 200)
+        self.assert_personal_fields(response.json())
+
+    def test_single_number_one_falls_back_to_slug_lookup(self):
+        request = self.client.get('/api/songs/number-one-songs/').wsgi_request
+        number_one = NumberOneSong.objects.get(slug=self.songs[1].slug)
+        data = SongSerializer(number_one, context={'request': request}).data
+        self.assertEqual(data['user_rating'], 9)
+        self.assertFalse(data['is_bookmarked'])
+
+    def test_song_lists_leave_the_context_alone(self):
+        request = self.client.get('/api/songs/number-one-songs/').wsgi_request
+        context = {'request': request}
+        serializer = SongSerializer(Song.objects.all(), many=True, context=context)
+        self.assert_personal_fields(serializer.data)
+        self.assertEqual(list(context), ['request'])
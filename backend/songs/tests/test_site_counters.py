@@ -0,0 +1,56 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from songs.models import Bookmark, SiteCounters, Song, UserSongComment, UserSongRating
+from songs.tests import SongsAPITestCase
+
+
+class SiteCountersTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Song.objects.create(title='First', artist='Star', year=1990, peak_rank=1, weeks_on_chart=5)
+        SiteCounters.get()
+
+    def assert_in_step(self):
+        counters = SiteCounters.get()
+        self.assertEqual({field: getattr(counters, field) for field in SiteCounters.COUNTERS}, {
+            field: value for field, value in SiteCounters.counts().items() if field in SiteCounters.COUNTERS
+        })
+
+    def test_signals_keep_the_counters_in_step(self):
+        song = Song.objects.create(title='Second', artist='Star', year=1991, peak_rank=2, weeks_on_chart=5)
+        other = Song.objects.create(title='Solo', artist='Newcomer', year=1992, peak_rank=9, weeks_on_chart=1)
+        self.assert_in_step()
+
+        # Moving the only song of a credit to an existing credit removes that artist
+        other.artist = 'Star'
+        other.save()
+        self.assertEqual(SiteCounters.get().artist_count, 1)
+
+        user = User.objects.create_user('historian', password='x')
+        rating = UserSongRating.objects.create(user=user, song=song, score=8)
+        UserSongComment.objects.create(user=user, song=song, text='Classic')
+        Bookmark.objects.create(user=user).songs.add(song)
+        self.assert_in_step()
+        self.assertEqual(SiteCounters.get().newest_username, 'historian')
+
+        rating.delete()
+        song.delete()
+        self.assert_in_step()
+
+    def test_website_stats_reads_the_counters_row(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/songs/website-stats/')
+        self.assertEqual(response.json()['song_count'], 1)
+        with self.assertNumQueries(0):
+            self.client.get('/api/songs/website-stats/')
+
+    def test_reconcile_corrects_drift(self):
+        SiteCounters.objects.filter(pk=1).update(song_count=40, bookmark_count=3)
+        stdout = StringIO()
+        call_command('reconcile_site_counters', stdout=stdout)
+        counters = SiteCounters.get()
+        self.assertEqual((counters.song_count, counters.bookmark_count), (1, 0))
+        self.assertIsNotNone(counters.reconciled_at)
@@ -0,0 +1,57 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from songs import _sitemap
+from songs.models import Artist, Song
+from songs.tests import SongsAPITestCase
+
+
+@mock.patch.object(_sitemap.logger, 'info')
+class SitemapTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        self.shard_dir = os.path.join(self.output_dir, 'sitemaps')
+        for n in range(5):
+            Song.objects.create(title=f'Song {n}', artist='Star', year=1990, peak_rank=n + 1, weeks_on_chart=5)
+        Artist.objects.create(name='Star & Co')
+
+    def generate(self, force=False):
+        return _sitemap.generate_sitemap(self.output_dir, shard_size=2, force=force)
+
+    def shard(self, name):
+        with gzip.open(os.path.join(self.shard_dir, name), 'rt') as f:
+            return f.read()
+
+    def test_sections_are_split_into_shards_listed_in_the_index(self, info):
+        self.generate()
+        shards = sorted(name for name in os.listdir(self.shard_dir) if name.endswith('.xml.gz'))
+        self.assertEqual([name for name in shards if name.startswith('songs-')],
+                         ['songs-1.xml.gz', 'songs-2.xml.gz', 'songs-3.xml.gz'])
+        self.assertEqual(self.shard('songs-3.xml.gz').count('<url>'), 1)
+        self.assertIn('<loc>https://pophits.org/artist/star-co</loc>', self.shard('artists-1.xml.gz'))
+
+        with open(os.path.join(self.output_dir, 'sitemap.xml')) as f:
+            index = f.read()
+        for name in shards:
+            self.assertIn(f'<loc>{_sitemap.SHARD_URL}/{name}</loc>', index)
+
+    def test_unchanged_shards_are_not_rewritten(self, info):
+        self.assertEqual(self.generate()[1], 0)
+        total = len(os.listdir(self.shard_dir)) - 1  # without the manifest
+        self.assertEqual(self.generate(), (0, total))
+
+        Song.objects.create(title='Song 5', artist='Star', year=1991, peak_rank=9, weeks_on_chart=1)
+        self.assertEqual(self.generate(), (1, total - 1))  # only songs-3 gains a URL
+        self.assertEqual(self.generate(force=True), (total, 0))
+
+    def test_shards_from_a_bigger_run_are_removed(self, info):
+        self.generate()
+        Song.objects.filter(title__in=['Song 3', 'Song 4']).delete()
+        self.generate()
+        self.assertFalse(os.path.exists(os.path.join(self.shard_dir, 'songs-3.xml.gz')))
+        self.assertTrue(os.path.exists(os.path.join(self.shard_dir, 'songs-2.xml.gz')))
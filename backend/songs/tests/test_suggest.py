@@ -0,0 +1,62 @@
+from unittest import mock
+
+from songs import suggest
+from songs.models import Artist, Song, SongTag
+from songs.tests import SongsAPITestCase
+
+
+@mock.patch.object(suggest, 'MIN_REBUILD_INTERVAL', 0)
+class SuggestTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        suggest._index = None
+        self.addCleanup(setattr, suggest, '_index', None)
+        self.beatles = Artist.objects.create(name='The Beatles')
+        for title, peak in [('Hey Jude', 1), ('Help!', 1), ('Hello, Goodbye', 1)]:
+            Song.objects.create(title=title, artist='The Beatles', artist_fk=self.beatles,
+                                year=1968, peak_rank=peak, weeks_on_chart=10)
+        SongTag.objects.create(name='Heartbreak')
+
+    def suggest(self, q, **params):
+        response = self.client.get('/api/songs/suggest/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_requires_internal_key(self):
+        del self.client.defaults['HTTP_X_INTERNAL_KEY']
+        self.assertIn(self.client.get('/api/songs/suggest/', {'q': 'he'}).status_code, (401, 403))
+
+    def test_matches_word_starts(self):
+        result = self.suggest('beat')
+        self.assertEqual([artist['slug'] for artist in result['artists']], ['the-beatles'])
+        self.assertEqual(len(self.suggest('he', limit=2)['songs']), 2)
+        self.assertEqual([tag['name'] for tag in self.suggest('hea')['tags']], ['Heartbreak'])
+
+    def test_new_artist_ranks_by_chart_totals(self):
+        self.suggest('the')
+        minor = Artist.objects.create(name='The Beat Boys')
+        Song.objects.create(title='Minor Hit', artist='The Beat Boys', artist_fk=minor,
+                            year=1968, peak_rank=90, weeks_on_chart=1)
+        Artist.objects.create(name='The Beat Nobodies')  # no songs, not suggested
+        self.assertEqual(
+            [artist['name'] for artist in self.suggest('the beat')['artists']],
+            ['The Beatles', 'The Beat Boys'],
+        )
+
+    def test_other_workers_rebuild_after_invalidation(self):
+        index = suggest.get_index()
+        song = Song.objects.get(title='Hey Jude')
+        song.title = 'Hey Judy'
+        song.save()
+        # Still the old object until another request compares the shared version
+        self.assertEqual(index.suggest('hey judy')['songs'], [])
+        self.assertEqual([s['title'] for s in self.suggest('hey judy')['songs']], ['Hey Judy'])
+        song.delete()
+        self.assertEqual(self.suggest('hey judy')['songs'], [])
+
+    def test_rebuild_waits_for_min_interval(self):
+        with mock.patch.object(suggest, 'MIN_REBUILD_INTERVAL', 60):
+            index = suggest.get_index()
+            Song.objects.create(title='Yesterday', artist='The Beatles', year=1965, peak_rank=1, weeks_on_chart=11)
+            self.assertIs(suggest.get_index(), index)
+        self.assertIsNot(suggest.get_index(), index)
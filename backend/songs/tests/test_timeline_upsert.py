@@ -0,0 +1,44 @@
+from datetime import date
+from io import StringIO
+
+from songs.models import SiteCounters, Song, SongTimeline
+from songs.tests import SongsAPITestCase
+from songs.utils import bulk_upsert_timeline
+
+
+class BulkUpsertTimelineTests(SongsAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.song = Song.objects.create(title='Hit', artist='Star', year=2001, peak_rank=5, weeks_on_chart=2)
+        self.other = Song.objects.create(title='Other', artist='Star', year=2001, peak_rank=9, weeks_on_chart=1)
+        SongTimeline.objects.create(song=self.song, chart_date=date(2001, 1, 6), rank=7, peak_rank=7, weeks_on_chart=1)
+        SiteCounters.get()
+
+    def test_conflicting_rows_are_updated_in_place(self):
+        original_id = SongTimeline.objects.get().id
+        rows = (
+            SongTimeline(song=song, chart_date=chart_date, rank=rank, peak_rank=rank, weeks_on_chart=weeks)
+            for song, chart_date, rank, weeks in [
+                (self.song, date(2001, 1, 6), 5, 2),  # same song and week: updated
+                (self.other, date(2001, 1, 6), 9, 1),
+                (self.song, date(2001, 1, 13), 4, 3),
+            ]
+        )
+        stdout = StringIO()
+        self.assertEqual(bulk_upsert_timeline(rows, batch_size=2, stdout=stdout), 3)
+
+        self.assertEqual(
+            sorted(SongTimeline.objects.values_list('song__title', 'chart_date', 'rank', 'weeks_on_chart')),
+            [('Hit', date(2001, 1, 6), 5, 2), ('Hit', date(2001, 1, 13), 4, 3), ('Other', date(2001, 1, 6), 9, 1)],
+        )
+        self.assertEqual(SongTimeline.objects.get(song=self.song, chart_date=date(2001, 1, 6)).id, original_id)
+        self.assertEqual(stdout.getvalue().count('Upserted'), 2)
+
+    def test_only_new_weeks_count_as_charts(self):
+        self.assertEqual(SiteCounters.get().chart_count, 1)
+        bulk_upsert_timeline([
+            SongTimeline(song=self.other, chart_date=date(2001, 1, 6), rank=9, peak_rank=9, weeks_on_chart=1),
+            SongTimeline(song=self.song, chart_date=date(2001, 1, 13), rank=4, peak_rank=4, weeks_on_chart=3),
+            SongTimeline(song=self.other, chart_date=date(2001, 1, 13), rank=8, peak_rank=8, weeks_on_chart=2),
+        ], batch_size=1)
+        self.assertEqual(SiteCounters.get().chart_count, 2)
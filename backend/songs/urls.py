@@ -6,11 +6,12 @@ from .views import (
     RandomSongView, TopRatedSongsView, RandomSongsByDecadeView, NumberOneSongsView,
     SongsWithImagesView, PlaylistGeneratorView, QuizGeneratorView, CurrentHot100View, 
     featured_artists, random_song_by_artist, SongTimelineView, historic_chart, chart_dates,
-    website_stats, TrendingArchiveView
+    website_stats, TrendingArchiveView, suggest
 )
 
 urlpatterns = [
     path('', SongListCreateView.as_view(), name='song-list-create'),
+    path('suggest/', suggest, name='song-suggest'),
     path('website-stats/', website_stats, name='website-stats'),
     path('trending-archive/', TrendingArchiveView.as_view(), name='trending-archive'),
     path('<int:pk>/', SongDetailView.as_view(), name='song-detail'),
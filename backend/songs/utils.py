@@ -0,0 +1,111 @@
+import codecs
+import json
+import time
+
+from django.db import connection
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(chunks):
+    """
+    Yield the elements of a top-level JSON array from an iterable of byte chunks
+    (e.g. response.iter_content() or a file read in blocks), one at a time.
+
+    Only the current element and the unparsed tail of the input are held in memory.
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    started = False
+    exhausted = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise json.JSONDecodeError('Expected a JSON array', buffer, pos)
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # A number can decode from a prefix ("2" of "2.5"), so only accept an
+                # element once the character after it shows it is complete
+                if (end < len(buffer) and buffer[end] in ' \t\r\n,]') or exhausted:
+                    yield item
+                    pos = end
+                    continue
+
+        if exhausted:
+            raise json.JSONDecodeError('Unexpected end of JSON array', buffer, len(buffer))
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer = buffer[pos:] + utf8.decode(b'', final=True)
+            exhausted = True
+        else:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+
+
+def bulk_upsert_timeline(rows, batch_size=5000, stdout=None):
+    """
+    Insert or update SongTimeline rows (unique on song + chart_date) with one
+    INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE per batch.
+
+    `rows` can be any iterable of unsaved SongTimeline objects, including a
+    generator, so callers don't have to build the full list. Progress and
+    throughput are written to `stdout` (a command's self.stdout) after each batch.
+    Chart weeks that didn't exist before are added to SiteCounters.chart_count.
+    Returns the number of rows written.
+    """
+    from .models import SiteCounters, SongTimeline
+
+    upsert = {'update_conflicts': True, 'update_fields': ['rank', 'peak_rank', 'weeks_on_chart']}
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+    if connection.features.supports_update_conflicts_with_target:
+        upsert['unique_fields'] = ['song', 'chart_date']
+
+    started = time.perf_counter()
+    written = 0
+    batch = []
+    known_dates = set()
+
+    def flush():
+        nonlocal written
+        # Weeks this batch adds to the chart archive (each week is checked once)
+        # (chart_date may be a date, a datetime or an ISO string; compare the YYYY-MM-DD part)
+        dates = {str(row.chart_date)[:10] for row in batch} - known_dates
+        new_dates = set()
+        if dates:
+            existing = SongTimeline.objects.filter(chart_date__in=dates).values_list('chart_date', flat=True).distinct()
+            new_dates = dates - {str(chart_date) for chart_date in existing}
+            known_dates.update(dates)
+        SongTimeline.objects.bulk_create(batch, batch_size=batch_size, **upsert)
+        if new_dates:
+            SiteCounters.adjust(chart_count=len(new_dates))
+        written += len(batch)
+        batch.clear()
+        if stdout:
+            elapsed = time.perf_counter() - started
+            stdout.write(f"Upserted {written} timeline rows ({written / elapsed:.0f} rows/s)")
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return written
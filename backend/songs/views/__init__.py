@@ -1,6 +1,6 @@
 from .songs import (
     SongListCreateView, SongDetailView, SongDetailBySlugView, RandomSongView,
-    SongsWithImagesView, random_song_by_artist, SongTimelineView
+    SongsWithImagesView, random_song_by_artist, SongTimelineView, suggest
 )
 from .artists import (
     ArtistDetailView, ArtistListView, featured_artists
@@ -30,6 +30,7 @@ __all__ = [
     'RandomSongView',
     'SongsWithImagesView',
     'random_song_by_artist',
+    'suggest',
     # Artists
     'ArtistDetailView',
     'ArtistListView',
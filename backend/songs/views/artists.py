@@ -3,21 +3,30 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Prefetch
+from django.db.models import Prefetch
 
 
 from ..models import Artist, ArtistRelationship
 from ..serializers import ArtistDetailSerializer, SongSerializer
-from .pagination import ArtistPagination
+from .pagination import ArtistPagination, KeysetPagination
+from .conditional import ConditionalGetMixin, stamp
+from .. import cache as songs_cache
+from ..sampling import get_pools
 import random
 
-class ArtistDetailView(generics.RetrieveAPIView):
+class ArtistDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API endpoint to get detailed artist information by slug
     Returns artist bio, tags, members, billboard stats, etc.
     """
     serializer_class = ArtistDetailSerializer
     lookup_field = 'slug'
+
+    def get_etag(self, request, *args, **kwargs):
+        # Song changes reach the payload through the stored chart totals,
+        # and Artist.refresh_stats() bumps updated_at when those change
+        artist = Artist.objects.filter(slug=kwargs['slug']).values_list('id', 'updated_at').first()
+        return stamp('artist', *artist) if artist else None
     
     def get_queryset(self):
         return Artist.objects.prefetch_related(
@@ -30,29 +39,32 @@ class ArtistDetailView(generics.RetrieveAPIView):
                 'relationships_from',  # Changed from 'from_relationships'
                 queryset=ArtistRelationship.objects.select_related('to_artist')
             ),
-            'songs'  # For billboard_stats
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        slug = kwargs['slug']
+        data = songs_cache.cached(
+            'artist-detail', None, [songs_cache.artist(slug)],
+            lambda: super(ArtistDetailView, self).retrieve(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
 
 class ArtistListView(APIView):
-    """List all artists with their hit count"""
+    """List all artists with their hit count (?pagination=cursor for keyset pages)"""
 
     def get(self, request):
         letter = request.query_params.get('letter', None)
 
-        # Annotate with hit count in the main query instead of counting per artist
-        artists = Artist.objects.filter(
-            songs__isnull=False
-        ).annotate(
-            total_hits=Count('songs')
-        ).distinct()
+        # Hit counts are stored on the artist, so this is a plain scan of the artist table
+        artists = Artist.objects.filter(total_hits__gt=0)
 
         if letter and len(letter) == 1:
             artists = artists.filter(name__istartswith=letter)
 
         artists = artists.order_by('name', 'id')
 
-        paginator = ArtistPagination()
+        paginator = KeysetPagination() if KeysetPagination.requested(request) else ArtistPagination()
         paginated_artists = paginator.paginate_queryset(artists, request)
 
         # Build response using annotated field
@@ -63,7 +75,7 @@ class ArtistListView(APIView):
                 'name': artist.name,
                 'slug': artist.slug,
                 'image': f'/media/{artist.image}' if artist.image else None,
-                'total_hits': artist.total_hits,  # Use annotated field instead of .count()
+                'total_hits': artist.total_hits,
                 'nationality': artist.nationality,
                 'artist_type': artist.artist_type,
             })
@@ -75,15 +87,12 @@ class ArtistListView(APIView):
 def featured_artists(request):
     """Get random artists with images for homepage"""
     
-    # Only fetch needed fields and limit to 25 in database
-    artists = Artist.objects.exclude(
-        image=''
-    ).only(
-        'id', 'name', 'slug', 'image'
-    ).order_by('?')[:25]
+    # 25 uniform picks from the artists with images (see songs/sampling.py)
+    artist_ids = get_pools().sample('artist-images', 25)
+    artists = Artist.objects.filter(id__in=artist_ids).exclude(image='').only('id', 'name', 'slug', 'image').in_bulk()
     
     artists_list = []
-    for artist in artists:
+    for artist in (artists[artist_id] for artist_id in artist_ids if artist_id in artists):
         image_url = None
         if artist.image:
             image_url = f"https://pophits.org{artist.image.url}"
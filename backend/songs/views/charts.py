@@ -1,15 +1,30 @@
 from rest_framework import generics
 from rest_framework.response import Response
+from django.db.models import Count, Max
 from django.http import JsonResponse
+from django.views.decorators.http import condition
 from datetime import datetime, timedelta
 
-from ..models import CurrentHot100, SongTimeline
+from ..models import ChartSnapshot, CurrentHot100, SongTimeline
 from ..serializers import CurrentHot100Serializer
+from .conditional import ConditionalGetMixin, stamp
+from .. import cache as songs_cache
 
+# Browser/CDN lifetime of a historic chart: the week is fixed, but the song
+# titles, slugs and totals on it are live
+CHART_MAX_AGE = 60 * 60
+# Billboard publishes one chart a week
+CHART_STRIDE_DAYS = 7
 
-class CurrentHot100View(generics.ListAPIView):
+
+class CurrentHot100View(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = CurrentHot100Serializer
 
+    def get_etag(self, request, *args, **kwargs):
+        # The table is replaced wholesale each week, so new rows mean new ids
+        chart = CurrentHot100.objects.aggregate(date=Max('chart_date'), last_id=Max('id'), rows=Count('id'))
+        return stamp('hot100', chart['date'], chart['last_id'], chart['rows']) if chart['rows'] else None
+
     def get_queryset(self):
         return CurrentHot100.objects.all().order_by('current_position')
 
@@ -26,6 +41,28 @@ class CurrentHot100View(generics.ListAPIView):
             'songs': serializer.data
         })
     
+def _historic_chart_data(chart_date_obj, date_str):
+    # Exact week, or the most recent chart published before the requested date
+    snapshot = ChartSnapshot.objects.filter(chart_date__lte=chart_date_obj).order_by('-chart_date').first()
+
+    # Weeks not materialised yet (build_chart_snapshots hasn't run) are computed from the timeline.
+    # They aren't saved: the snapshot table doubles as the chart week index and must stay complete.
+    if snapshot is None or snapshot.chart_date != chart_date_obj:
+        closest_chart = SongTimeline.objects.filter(
+            chart_date__lte=chart_date_obj
+        ).values_list('chart_date', flat=True).order_by('-chart_date').first()
+        if closest_chart and (snapshot is None or closest_chart > snapshot.chart_date):
+            snapshot = ChartSnapshot.build_from_timeline(closest_chart, save=False)
+
+    if snapshot is None:
+        return None
+    return {
+        'chart_date': str(snapshot.chart_date),
+        'requested_date': date_str,
+        'entries': snapshot.chart_entries()
+    }
+
+
 def historic_chart(request, date_str):
     """API endpoint: Get Billboard Hot 100 for a specific week with movement data"""
     
@@ -35,80 +72,68 @@ def historic_chart(request, date_str):
     except ValueError:
         return JsonResponse({'error': 'Invalid date format'}, status=400)
     
-    # Try the exact date first
-    chart_entries = SongTimeline.objects.filter(
-        chart_date=chart_date_obj
-    ).select_related('song').order_by('rank')[:100]
-    
-    # If no chart for this date, find the most recent chart before this date
-    if not chart_entries.exists():
-        closest_chart = SongTimeline.objects.filter(
-            chart_date__lte=chart_date_obj
-        ).values_list('chart_date', flat=True).distinct().order_by('-chart_date').first()
-        
-        if closest_chart:
-            chart_entries = SongTimeline.objects.filter(
-                chart_date=closest_chart
-            ).select_related('song').order_by('rank')[:100]
-            chart_date_obj = closest_chart
-    
-    if not chart_entries.exists():
+    # Fallback dates resolve to whichever week is newest, so they depend on the whole
+    # chart set; the entries embed live song details
+    data = songs_cache.cached(
+        f'historic-chart:{date_str}', None, ['charts', songs_cache.chart(chart_date_obj), 'songs'],
+        lambda: _historic_chart_data(chart_date_obj, date_str),
+    )
+    if data is None:
         return JsonResponse({'error': 'No chart found'}, status=404)
-    
-    # Get previous week's chart for comparison
-    # Get the previous chart that actually exists (not exactly 7 days ago)
-    previous_week_date = SongTimeline.objects.filter(
-        chart_date__lt=chart_date_obj
-    ).values_list('chart_date', flat=True).order_by('-chart_date').first()
-
-    previous_entries = {}
-    if previous_week_date:
-        previous_entries = {
-            entry.song_id: entry.rank 
-            for entry in SongTimeline.objects.filter(chart_date=previous_week_date)
-        }
 
-    
-    # Serialize the data with movement info
-    entries_data = []
-    for entry in chart_entries:
-        previous_rank = previous_entries.get(entry.song_id)
-        
-        # Determine if new or calculate movement
-        if previous_rank is None:
-            movement = None
-            is_new = True
-        else:
-            movement = previous_rank - entry.rank  # Positive = moved up
-            is_new = False
-        
-        entries_data.append({
-            'position': entry.rank,
-            'title': entry.song.title,
-            'artist': entry.song.artist,
-            'artist_slug': entry.song.artist_slug,
-            'slug': entry.song.slug,
-            'peak_rank': entry.song.peak_rank,
-            'weeks_on_chart': entry.song.weeks_on_chart,
-            'year': entry.song.year,
-            'previous_rank': previous_rank,
-            'movement': movement,
-            'is_new': is_new,
-        })
-    
-    data = {
-        'chart_date': str(chart_date_obj),
-        'requested_date': date_str,
-        'entries': entries_data
+    response = JsonResponse(data)
+    response['Cache-Control'] = f'public, max-age={CHART_MAX_AGE}'
+    return response
+
+def _chart_week_state(request):
+    """(week count, last snapshot write) for the chart week index, computed once per request"""
+    if not hasattr(request, '_chart_week_state'):
+        state = ChartSnapshot.objects.aggregate(weeks=Count('chart_date'), updated=Max('updated_at'))
+        request._chart_week_state = (state['weeks'], state['updated'])
+    return request._chart_week_state
+
+
+def _chart_dates_etag(request):
+    weeks, updated = _chart_week_state(request)
+    if not weeks:
+        return None
+    return f"{weeks}-{updated.timestamp():.0f}-{request.GET.get('format', 'full')}"
+
+
+def _chart_dates_last_modified(request):
+    return _chart_week_state(request)[1]
+
+
+def compact_dates(dates):
+    """First date plus a weekly stride; exceptions list [index, days since previous date]"""
+    exceptions = [
+        [index, (date - dates[index - 1]).days]
+        for index, date in enumerate(dates[1:], start=1)
+        if (date - dates[index - 1]).days != CHART_STRIDE_DAYS
+    ]
+    return {
+        'start': str(dates[0]) if dates else None,
+        'stride': CHART_STRIDE_DAYS,
+        'count': len(dates),
+        'exceptions': exceptions,
     }
-    
-    return JsonResponse(data)
 
+
+@condition(etag_func=_chart_dates_etag, last_modified_func=_chart_dates_last_modified)
 def chart_dates(request):
-    """API endpoint: Get all unique chart dates"""
-    dates = SongTimeline.objects.values_list('chart_date', flat=True).distinct().order_by('chart_date')
-    
+    """API endpoint: Get all unique chart dates (?format=compact for the delta-encoded form)"""
+    weeks, _ = _chart_week_state(request)
+    if weeks:
+        # ChartSnapshot is keyed by chart_date, so this is a primary-key scan
+        dates = list(ChartSnapshot.objects.values_list('chart_date', flat=True).order_by('chart_date'))
+    else:
+        # Snapshots not built yet
+        dates = list(SongTimeline.objects.values_list('chart_date', flat=True).distinct().order_by('chart_date'))
+
+    if request.GET.get('format') == 'compact':
+        return JsonResponse(compact_dates(dates))
+
     # Convert to list of strings
     date_list = [str(date) for date in dates]
     
-    return JsonResponse({'dates': date_list})
\ No newline at end of file
+    return JsonResponse({'dates': date_list})
@@ -0,0 +1,137 @@
+"""
+Conditional GET (ETag / If-None-Match) for read-mostly API views.
+
+A view mixes in ConditionalGetMixin and implements get_etag(), which should
+derive a version stamp from one cheap query (an updated_at, a chart date)
+without loading what the response is built from. Matching anonymous requests
+get a 304 before the view does any serialising; authenticated requests are
+left alone because their payloads carry per-user fields.
+
+Hits and misses are counted per view in the cache, together with the size of
+the 200 responses, so `manage.py conditional_get_stats` can show what the
+304s saved. Misses are the common case and a cache counter isn't atomic on
+every backend, so only a sample of them (CONDITIONAL_GET_MISS_SAMPLE_RATE) is
+recorded and scaled up; the miss count and bytes saved are estimates.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+STATS_KEY_PREFIX = 'conditional-get'
+# Keep the counters for a long time; they are reset explicitly
+STATS_TIMEOUT = 60 * 60 * 24 * 30
+# Views that report counters (conditional_get_stats lists these)
+TRACKED_VIEWS = set()
+
+
+def stamp(*parts):
+    """Join version parts (ids, dates, counts) into an ETag value."""
+    return '-'.join(part.isoformat() if hasattr(part, 'isoformat') else str(part) for part in parts)
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = 'Not modified.'
+
+
+def _incr(key, delta=1):
+    key = f'{STATS_KEY_PREFIX}:{key}'
+    if not cache.add(key, delta, STATS_TIMEOUT):
+        try:
+            cache.incr(key, delta)
+        except ValueError:  # expired between add() and incr()
+            cache.set(key, delta, STATS_TIMEOUT)
+
+
+def record_hit(view_name, etag):
+    _incr(f'{view_name}:hits')
+    # The size of the body we would have sent, remembered from the last 200
+    size = cache.get(f'{STATS_KEY_PREFIX}:size:{etag}')
+    if size:
+        _incr(f'{view_name}:bytes_saved', size)
+
+
+def miss_sample_rate():
+    return getattr(settings, 'CONDITIONAL_GET_MISS_SAMPLE_RATE', 0.05)
+
+
+def record_miss(view_name, etag, size, weight=1):
+    """Count `weight` misses (the inverse of the sample rate) and remember the body size for later hits."""
+    _incr(f'{view_name}:misses', weight)
+    cache.set(f'{STATS_KEY_PREFIX}:size:{etag}', size, STATS_TIMEOUT)
+
+
+def get_stats(view_names=None):
+    """{view name: {'hits', 'misses', 'bytes_saved'}}"""
+    stats = {}
+    for view_name in sorted(view_names or TRACKED_VIEWS):
+        keys = {field: f'{STATS_KEY_PREFIX}:{view_name}:{field}' for field in ('hits', 'misses', 'bytes_saved')}
+        values = cache.get_many(keys.values())
+        stats[view_name] = {field: values.get(key, 0) for field, key in keys.items()}
+    return stats
+
+
+def reset_stats(view_names=None):
+    cache.delete_many([
+        f'{STATS_KEY_PREFIX}:{view_name}:{field}'
+        for view_name in (view_names or TRACKED_VIEWS)
+        for field in ('hits', 'misses', 'bytes_saved')
+    ])
+
+
+class ConditionalGetMixin:
+    """Answer anonymous GETs with 304 Not Modified when get_etag() still matches."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        TRACKED_VIEWS.add(cls.__name__)
+
+    def get_etag(self, request, *args, **kwargs):
+        """Version stamp for the resource, or None to skip conditional handling."""
+        raise NotImplementedError
+
+    def initial(self, request, *args, **kwargs):
+        # Runs after authentication and permission checks, before the handler
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method != 'GET' or request.user.is_authenticated:
+            return
+        version = self.get_etag(request, *args, **kwargs)
+        if version is None:
+            return
+        self._etag = quote_etag(str(version))
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            client_etags = {etag.removeprefix('W/') for etag in parse_etags(if_none_match)}
+            if self._etag in client_etags or '*' in client_etags:
+                record_hit(type(self).__name__, self._etag)
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = self._etag
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag:
+            # Cached copies must not be shared between anonymous and signed-in requests
+            patch_vary_headers(response, ['Authorization'])
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+                rate = miss_sample_rate()
+                if rate > 0 and random.random() < rate:
+                    view_name = type(self).__name__
+                    response.add_post_render_callback(
+                        lambda rendered: record_miss(view_name, etag, len(rendered.content), round(1 / rate))
+                    )
+        return response
@@ -1,114 +1,102 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q
 import random
 
 from ..models import Song
+from .. import quiz
+from ..sampling import sample_songs
 from ..serializers import SongSerializer
 
+RANK_CUTOFFS = {
+    1: 1, 2: 3, 3: 5, 4: 10, 5: 20,
+    6: 30, 7: 50, 8: 60, 9: 80, 10: 100
+}
+MAX_SONGS = 100
 
-class PlaylistGeneratorView(APIView):
+
+class SongGeneratorView(APIView):
     """
-    API View to generate a playlist of random songs based on the number of songs,
-    hit level (1 for top hits, 10 for more obscure hits), and selected decades.
+    Shared part of the playlist and quiz generators: parse number_of_songs,
+    hit_size and decades, sample song ids from the sampling pools (see
+    songs/sampling.py) and load only the chosen rows.
+
+    Pass ?seed= to get the same selection again; the seed used is returned in
+    the X-Seed header either way.
     """
 
     def get(self, request):
         try:
-            num_songs = int(request.GET.get('number_of_songs', 10))
+            num_songs = min(int(request.GET.get('number_of_songs', 10)), MAX_SONGS)
             hit_level = int(request.GET.get('hit_size', 1))
             decades = request.GET.getlist('decades', [])
-
-            rank_cutoffs = {
-                1: 1, 2: 3, 3: 5, 4: 10, 5: 20,
-                6: 30, 7: 50, 8: 60, 9: 80, 10: 100
-            }
-            max_peak_rank = rank_cutoffs.get(hit_level, 100)
-
-            filtered_songs = Song.objects.filter(
-                peak_rank__lte=max_peak_rank,
-                spotify_url__isnull=False
-            ).exclude(spotify_url='')
+            max_peak_rank = RANK_CUTOFFS.get(hit_level, 100)
 
             if not decades:
                 return Response({'detail': 'Decades parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            decade_filters = Q()
-            for decade in decades:
-                try:
-                    start_year = int(decade)
-                    end_year = start_year + 9
-                    decade_filters |= Q(year__gte=start_year, year__lte=end_year)
-                except ValueError:
-                    return Response({'detail': 'Invalid decade format.'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                start_years = [int(decade) for decade in decades]
+            except ValueError:
+                return Response({'detail': 'Invalid decade format.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            filtered_songs = filtered_songs.filter(decade_filters)
+            seed = request.GET.get('seed') or str(random.getrandbits(32))
+            rng = random.Random(seed)
+            song_ids, _ = sample_songs(num_songs, start_years, max_peak_rank, rng=rng)
 
-            if len(filtered_songs) == 0:
+            songs = self.get_songs(song_ids)
+            # Keep the sampled order; skip songs deleted since the pools were built
+            song_list = [songs[song_id] for song_id in song_ids if song_id in songs]
+            if not song_list:
                 return Response({'detail': 'No songs match the criteria.'}, status=status.HTTP_404_NOT_FOUND)
 
-            song_list = random.sample(list(filtered_songs), min(num_songs, len(filtered_songs)))
-
-            serializer = SongSerializer(song_list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            response = Response(self.build(song_list, rng), status=status.HTTP_200_OK)
+            response['X-Seed'] = seed
+            return response
 
         except Exception as e:
             return Response({'detail': 'An error occurred while processing your request.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def get_songs(self, song_ids):
+        return Song.objects.in_bulk(song_ids)
+
+    def build(self, song_list, rng):
+        raise NotImplementedError
 
-class QuizGeneratorView(APIView):
+
+class PlaylistGeneratorView(SongGeneratorView):
     """
-    API View to generate quiz questions based on the number of songs,
+    API View to generate a playlist of random songs based on the number of songs,
     hit level (1 for top hits, 10 for more obscure hits), and selected decades.
-    Each question asks for the artist of a song.
     """
 
-    def get(self, request):
-        try:
-            num_songs = int(request.GET.get('number_of_songs', 10))
-            hit_level = int(request.GET.get('hit_size', 1))
-            decades = request.GET.getlist('decades', [])
+    def get_songs(self, song_ids):
+        return Song.objects.select_related('artist_fk').prefetch_related('tag_relations__tag').in_bulk(song_ids)
 
-            rank_cutoffs = {
-                1: 1, 2: 3, 3: 5, 4: 10, 5: 20,
-                6: 30, 7: 50, 8: 60, 9: 80, 10: 100
-            }
-            max_peak_rank = rank_cutoffs.get(hit_level, 100)
+    def build(self, song_list, rng):
+        return SongSerializer(song_list, many=True).data
 
-            filtered_songs = Song.objects.filter(
-                peak_rank__lte=max_peak_rank,
-                spotify_url__isnull=False
-            ).exclude(spotify_url='')
 
-            if not decades:
-                return Response({'detail': 'Decades parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
-
-            decade_filters = Q()
-            for decade in decades:
-                try:
-                    start_year = int(decade)
-                    end_year = start_year + 9
-                    decade_filters |= Q(year__gte=start_year, year__lte=end_year)
-                except ValueError:
-                    return Response({'detail': 'Invalid decade format.'}, status=status.HTTP_400_BAD_REQUEST)
-
-            filtered_songs = filtered_songs.filter(decade_filters)
-
-            if len(filtered_songs) == 0:
-                return Response({'detail': 'No songs match the criteria.'}, status=status.HTTP_404_NOT_FOUND)
-
-            song_list = random.sample(list(filtered_songs), min(num_songs, len(filtered_songs)))
-
-            quiz_questions = [
-                {
-                    "question": f"Who had a hit with '{song.title}' in {song.year} peaking at #{song.peak_rank}?",
-                    "answer": song.artist
-                }
-                for song in song_list
-            ]
-
-            return Response(quiz_questions, status=status.HTTP_200_OK)
+class QuizGeneratorView(SongGeneratorView):
+    """
+    API View to generate multiple-choice quiz questions based on the number of songs,
+    hit level (1 for top hits, 10 for more obscure hits), and selected decades.
+    By default each question asks for the artist of a song; pass types=artist,
+    types=year and/or types=peak to mix in the other kinds (see songs/quiz.py).
+    """
 
-        except Exception as e:
-            return Response({'detail': 'An error occurred while processing your request.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    def get(self, request):
+        types = request.GET.getlist('types') or ['artist']
+        if any(question_type not in quiz.QUESTION_TYPES for question_type in types):
+            return Response(
+                {'detail': f"Invalid question type. Choose from: {', '.join(quiz.QUESTION_TYPES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        self.question_types = types
+        return super().get(request)
+
+    def get_songs(self, song_ids):
+        return Song.objects.only('id', 'title', 'artist', 'year', 'peak_rank').in_bulk(song_ids)
+
+    def build(self, song_list, rng):
+        return quiz.build_quiz(song_list, self.question_types, rng)
@@ -1,4 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
@@ -11,3 +21,162 @@ class ArtistPagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
     max_page_size = 1000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks past the last row of the previous page
+    instead of OFFSET-ing to it, so every page costs the same as the first.
+
+    The order comes from the queryset's order_by(); id is appended as a
+    tiebreaker when it isn't there already, which makes the order total and
+    the pages stable under any sort. A cursor holds the sort values of the
+    row it continues from, so rows added or removed while paging never
+    shift the rest. The total is only counted when asked for with ?count=true.
+
+    Enabled with ?pagination=cursor; the next/previous links carry ?cursor=.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or cls.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = queryset.count() if self.count_requested(request) else None
+
+        values, reverse = self.decode_cursor(request, queryset)
+        if reverse:
+            queryset = queryset.order_by(*(name if desc else f'-{name}' for name, desc in self.ordering))
+        else:
+            queryset = queryset.order_by(*(f'-{name}' if desc else name for name, desc in self.ordering))
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, reverse))
+
+        # One extra row tells whether there is another page in this direction
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, 'false').lower() == 'true'
+
+    def get_ordering(self, queryset):
+        """[(field, descending), ...] ending in id"""
+        ordering = []
+        for field in queryset.query.order_by:
+            name = field.lstrip('-')
+            ordering.append(('id' if name == 'pk' else name, field.startswith('-')))
+        if 'id' not in (name for name, _ in ordering):
+            # Break ties in the direction of the last sort field
+            ordering.append(('id', ordering[-1][1] if ordering else False))
+        return ordering
+
+    def seek(self, values, reverse):
+        """
+        Rows after `values` in the requested order. The row comparison is
+        spelled out as (a > x) OR (a = x AND b > y) ..., ANDed with a >= x so
+        the database can start from the first sort column's index.
+        """
+        after = Q()
+        equal = {}
+        for (name, desc), value in zip(self.ordering, values):
+            lookup = 'lt' if desc != reverse else 'gt'
+            after |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        name, desc = self.ordering[0]
+        return Q(**{f'{name}__{"lte" if desc != reverse else "gte"}': values[0]}) & after
+
+    def get_field(self, queryset, name):
+        """The model field (or annotation output field) a sort value belongs to"""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        model = queryset.model
+        *path, name = name.split(LOOKUP_SEP)
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(name)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values, reverse = cursor['v'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Cursors come from the client: every value has to be one the sort
+        # field could hold, or the seek query fails instead of the request
+        cleaned = []
+        for (name, _), value in zip(self.ordering, values):
+            if not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+            field = self.get_field(queryset, name)
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned, reverse
+
+    def encode_cursor(self, row, reverse):
+        cursor = {'v': [getattr(row, name) for name, _ in self.ordering]}
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        return self.encode_cursor(self.page[-1], False) if self.has_next and self.page else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.page[0], True) if self.has_previous and self.page else None
+
+    def get_paginated_response(self, data):
+        fields = [('next', self.get_next_link()), ('previous', self.get_previous_link()), ('results', data)]
+        if self.count is not None:
+            fields.insert(0, ('count', self.count))
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
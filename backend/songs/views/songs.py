@@ -2,22 +2,32 @@ from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import AllowAny
 
 from rest_framework.decorators import api_view
 from django.shortcuts import get_object_or_404
-from django.db.models import Max, Min, Q
-import random
-from random import randint
 
 from ..permissions import IsInternalServer, IsInternalServerWithOptionalAuth
 from ..models import Song, UserSongComment, SongTimeline, UserSongRating
 from ..serializers import SongSerializer, UserSongCommentSerializer, SongTimelineSerializer
-from .pagination import CustomPagination
+from ..search import search_songs
+from .. import cache as songs_cache
+from ..suggest import get_index
+from ..sampling import get_pools
+from .pagination import CustomPagination, KeysetPagination
+from .conditional import ConditionalGetMixin, stamp
 
 class SongListCreateView(generics.ListCreateAPIView):
+    """
+    Songs, filtered and sorted by the query parameters. Pages are numbered
+    (?page=) by default; ?pagination=cursor switches to keyset pages that
+    stay fast however deep they go (see KeysetPagination).
+    """
     serializer_class = SongSerializer
     pagination_class = CustomPagination
+    SORT_FIELDS = ('id', 'title', 'artist', 'year', 'peak_rank', 'weeks_on_chart',
+                   'average_user_score', 'total_ratings')
 
     authentication_classes = [TokenAuthentication]  # Change this
     permission_classes = [IsInternalServerWithOptionalAuth]
@@ -31,11 +41,9 @@ class SongListCreateView(generics.ListCreateAPIView):
         )
 
         search_query = self.request.GET.get('search', None)
-        # Apply search query
+        # Apply search query (full-text index, ranked by relevance + chart success)
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) | Q(artist__icontains=search_query)
-            )
+            queryset = search_songs(queryset, search_query)
 
         # Apply artist and year filters
         artist_slug = self.request.GET.get('artist')
@@ -84,31 +92,71 @@ class SongListCreateView(generics.ListCreateAPIView):
                 pass
 
         # Apply sorting in get_queryset for better query optimization
-        sort_by = self.request.GET.get('sort_by', 'id')
+        sort_by = self.request.GET.get('sort_by')
+        if self.sorted_by_relevance():
+            # Best matches first unless the client asked for a specific order
+            return queryset.order_by('-search_score', 'id')
+
+        sort_by = sort_by or 'id'
+        if sort_by not in self.SORT_FIELDS:
+            raise ParseError(f"Invalid sort_by. Choose from: {', '.join(self.SORT_FIELDS)}.")
         order = self.request.GET.get('order', 'asc')
-        order_field = sort_by if order == 'asc' else f'-{sort_by}'
-        queryset = queryset.order_by(order_field)
+        prefix = '' if order == 'asc' else '-'
+        # id breaks ties so every song has one place in the order, page after page
+        ordering = [f'{prefix}{sort_by}'] if sort_by == 'id' else [f'{prefix}{sort_by}', f'{prefix}id']
+        queryset = queryset.order_by(*ordering)
 
         return queryset
 
+    def sorted_by_relevance(self):
+        return bool(self.request.GET.get('search')) and not self.request.GET.get('sort_by')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            # Relevance scores are computed per query and aren't stable sort
+            # keys to seek on, so search results ranked by them keep page numbers
+            keyset = KeysetPagination.requested(self.request) and not self.sorted_by_relevance()
+            self._paginator = KeysetPagination() if keyset else self.pagination_class()
+        return self._paginator
+
+    # Anonymous pages are cached until a song or tag assignment changes; rating
+    # averages on them may lag by up to this long
+    LIST_CACHE_TIMEOUT = 15 * 60
+
     def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return Response(self.build_page())
+        data = songs_cache.cached(
+            'song-list', request.query_params, ['songs'], self.build_page, timeout=self.LIST_CACHE_TIMEOUT
+        )
+        return Response(data)
+
+    def build_page(self):
         queryset = self.get_queryset()
 
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer.data).data
 
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return serializer.data
 
 
 
 
-class SongDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SongDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsInternalServerWithOptionalAuth]
     serializer_class = SongSerializer
+    # The payload embeds the artist's detail (members, collaborations, tags)
+    query_budget = 15
+
+    def get_etag(self, request, *args, **kwargs):
+        # The payload embeds the artist, so their updated_at is part of the version
+        song = Song.objects.filter(pk=kwargs['pk']).values_list('updated_at', 'artist_fk__updated_at').first()
+        return stamp('song', kwargs['pk'], *song) if song else None
 
     def get_queryset(self):
         return Song.objects.all().prefetch_related('tag_relations__tag')
@@ -175,11 +223,18 @@ class SongTimelineView(APIView):
         })
 
 
-class SongDetailBySlugView(generics.RetrieveUpdateDestroyAPIView):
+class SongDetailBySlugView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsInternalServerWithOptionalAuth]
 
     serializer_class = SongSerializer
+    query_budget = 15
+
+    def get_etag(self, request, *args, **kwargs):
+        song = Song.objects.filter(slug=kwargs.get('slug')).values_list(
+            'id', 'updated_at', 'artist_fk__updated_at'
+        ).first()
+        return stamp('song-slug', *song) if song else None
 
     def get_queryset(self):
         return Song.objects.all()
@@ -209,13 +264,13 @@ class RandomSongView(APIView):
     serializer_class = SongSerializer
 
     def get(self, request, *args, **kwargs):
-        max_id = Song.objects.aggregate(max_id=Max("id"))["max_id"]
-        if not max_id:
-            return Response({"detail": "No songs"}, status=404)
-
+        pools = get_pools()
+        # A sampled id can have been deleted since the pools were built
         for _ in range(5):
-            pk = randint(1, max_id)
-            song = Song.objects.filter(pk=pk).first()
+            song_id = pools.choice('songs')
+            if song_id is None:
+                break
+            song = Song.objects.filter(pk=song_id).first()
             if song:
                 serializer = self.serializer_class(song)
                 return Response(serializer.data)
@@ -227,7 +282,9 @@ class SongsWithImagesView(generics.ListAPIView):
     serializer_class = SongSerializer
 
     def get_queryset(self):
-        return Song.objects.exclude(image_upload='').exclude(image_upload__isnull=True)
+        return Song.objects.exclude(image_upload='').exclude(image_upload__isnull=True).select_related(
+            'artist_fk'
+        ).prefetch_related('tag_relations__tag')
 
 
 @api_view(['GET'])
@@ -237,25 +294,39 @@ def random_song_by_artist(request):
     if not artist_slug:
         return Response({'error': 'artist_slug required'}, status=400)
 
-    # Get the min and max IDs for this artist
     qs = Song.objects.filter(artist_fk__slug=artist_slug)
-    min_max = qs.aggregate(min_id=Min('id'), max_id=Max('id'))
-    if not min_max['min_id']:
-        return Response({'detail': 'Not found'}, status=404)
-
-    # Try random IDs until we find one (handles gaps in IDs)
-    for _ in range(10):  # up to 10 attempts
-        random_id = random.randint(min_max['min_id'], min_max['max_id'])
-        song = qs.filter(id__gte=random_id).values(
-            'id', 'title', 'year', 'peak_rank', 'weeks_on_chart',
-            'average_user_score', 'slug', 'artist_slug', 'is_original_recording'
-        ).first()
+    fields = (
+        'id', 'title', 'year', 'peak_rank', 'weeks_on_chart',
+        'average_user_score', 'slug', 'artist_slug', 'is_original_recording'
+    )
+
+    # Uniform pick from the artist's songs (see songs/sampling.py)
+    pools = get_pools()
+    for _ in range(5):
+        song_id = pools.choice(f'artist:{artist_slug}')
+        if song_id is None:
+            break
+        song = qs.filter(id=song_id).values(*fields).first()
         if song:
             return Response(song)
 
-    # Fallback: pick the first song if random attempts fail
-    song = qs.values(
-        'id', 'title', 'year', 'peak_rank', 'weeks_on_chart',
-        'average_user_score', 'slug', 'artist_slug', 'is_original_recording'
-    ).first()
-    return Response(song)
\ No newline at end of file
+    # Fallback: the pools may not have caught up with a new artist yet
+    song = qs.values(*fields).first()
+    if not song:
+        return Response({'detail': 'Not found'}, status=404)
+    return Response(song)
+
+
+@api_view(['GET'])
+def suggest(request):
+    """Typeahead suggestions for the search box, served from the in-memory prefix index"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', 5))
+    except ValueError:
+        limit = 5
+
+    if not query:
+        return Response({'songs': [], 'artists': [], 'tags': []})
+
+    return Response(get_index().suggest(query, limit))
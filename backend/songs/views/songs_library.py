@@ -1,11 +1,11 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
 import datetime
 
 from ..models import Song, NumberOneSong
+from .. import cache as songs_cache
+from ..sampling import get_pools
 from ..serializers import SongSerializer
 
 
@@ -28,14 +28,16 @@ class TopRatedSongsView(APIView):
         # If your site is mostly positive, use 7.0. If you are strict, use 5.0.
         C = 7.0
 
-        top_rated_songs = Song.objects.filter(total_ratings__gt=0).annotate(
+        top_rated_songs = Song.objects.filter(total_ratings__gt=0).select_related(
+            'artist_fk'
+        ).prefetch_related('tag_relations__tag').annotate(
             # Bayesian Weighted Rating Formula
             weighted_score=(
                 (F('total_ratings') * F('average_user_score')) + (m * C)
             ) / (F('total_ratings') + m)
         ).order_by('-weighted_score')[:limit]
 
-        serializer = SongSerializer(top_rated_songs, many=True)
+        serializer = SongSerializer(top_rated_songs, many=True, context={'request': request})
         return Response(serializer.data)
 
 
@@ -44,21 +46,12 @@ class RandomSongsByDecadeView(APIView):
 
     def get(self, request, *args, **kwargs):
         current_year = datetime.datetime.now().year
-        decades = [(year, year + 9) for year in range(1950, current_year, 10)]
-
-        random_songs_by_decade = []
-        for start_year, end_year in decades:
-            sample_size = 100
-            sample_songs = Song.objects.filter(
-                year__gte=start_year,
-                year__lte=end_year,
-                spotify_url__isnull=False
-            ).exclude(spotify_url='').values('id').order_by('?')[:sample_size]
-
-            random_song_ids = [song['id'] for song in sample_songs]
-            if random_song_ids:
-                random_song = Song.objects.filter(id__in=random_song_ids).order_by('?').first()
-                random_songs_by_decade.append(random_song)
+        pools = get_pools()
+
+        # One uniform pick per decade from the sampling pools, then a single query
+        picks = [pools.choice(f'spotify:{decade}') for decade in range(1950, current_year, 10)]
+        songs = Song.objects.in_bulk([song_id for song_id in picks if song_id is not None])
+        random_songs_by_decade = [songs[song_id] for song_id in picks if song_id in songs]
 
         serializer = self.serializer_class(random_songs_by_decade, many=True)
         return Response(serializer.data)
@@ -68,6 +61,15 @@ class NumberOneSongsView(generics.ListAPIView):
     queryset = NumberOneSong.objects.all()
     serializer_class = SongSerializer
 
-    @method_decorator(cache_page(24 * 3600))
-    def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+    def list(self, request, *args, **kwargs):
+        # Anonymous responses are shared; NumberOneSong.sync_from_songs() invalidates
+        # them when the list actually changes. Logged-in users get their own ratings.
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        data = songs_cache.cached(
+            'number-one-songs', None, [NumberOneSong.CACHE_DEPENDENCY],
+            lambda: self.get_serializer(self.get_queryset(), many=True).data,
+            timeout=24 * 3600,
+        )
+        return Response(data)
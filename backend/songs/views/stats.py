@@ -1,13 +1,28 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg, Sum
+from django.db.models import Count, Avg, Q, Sum
 
 from ..models import Song, Artist
 
+DECADES = range(1950, 2030, 10)
+PEAK_BUCKETS = {
+    '#1': Q(peak_rank=1),
+    'top_5': Q(peak_rank__lte=5),
+    'top_10': Q(peak_rank__lte=10),
+    'top_50': Q(peak_rank__lte=50),
+    'lower': Q(peak_rank__gt=50),
+}
+
 
 class ArtistStatsView(APIView):
-    """Get artist statistics (decade breakdown, peak distribution, etc.)"""
+    """
+    Get artist statistics (decade breakdown, peak distribution, etc.)
+
+    ?type=peaks, ?type=decades, or ?type=all for both plus billboard_stats in
+    one response. The breakdowns come from a single conditional-aggregation
+    query; billboard_stats are the totals stored on the artist.
+    """
 
     def get_object(self):
         slug = self.kwargs.get('slug')
@@ -17,46 +32,45 @@ class ArtistStatsView(APIView):
         artist = get_object_or_404(Artist, slug=slug)
         stats_type = request.GET.get('type')
 
+        if stats_type not in ('peaks', 'decades', 'all'):
+            return Response({'detail': 'Invalid stats type. Use "peaks", "decades" or "all"'}, status=400)
+
+        totals = self.aggregate(artist)
         if stats_type == 'peaks':
-            return self.get_peak_distribution(artist)
+            return Response(self.get_peak_distribution(totals))
         elif stats_type == 'decades':
-            return self.get_decade_breakdown(artist)
-        else:
-            return Response({'detail': 'Invalid stats type. Use "peaks" or "decades"'}, status=400)
+            return Response(self.get_decade_breakdown(totals))
+        return Response({
+            'peaks': self.get_peak_distribution(totals),
+            'decades': self.get_decade_breakdown(totals),
+            'billboard_stats': artist.billboard_stats(),
+        })
 
-    def get_peak_distribution(self, artist):
+    def aggregate(self, artist):
+        """Every number the stats types need, from one pass over the artist's songs"""
+        aggregates = {}
+        for key, condition in PEAK_BUCKETS.items():
+            aggregates[f'peak:{key}'] = Count('id', filter=condition)
+        for decade_start in DECADES:
+            in_decade = Q(year__gte=decade_start, year__lte=decade_start + 9)
+            aggregates[f'{decade_start}:hits'] = Count('id', filter=in_decade)
+            aggregates[f'{decade_start}:total_weeks'] = Sum('weeks_on_chart', filter=in_decade)
+            aggregates[f'{decade_start}:avg_peak'] = Avg('peak_rank', filter=in_decade)
+        return Song.objects.filter(artist_fk=artist).aggregate(**aggregates)
+
+    def get_peak_distribution(self, totals):
         """Get breakdown: #1s, top 5, top 10, etc."""
-        songs = Song.objects.filter(artist_fk=artist)
-
-        distribution = {
-            '#1': songs.filter(peak_rank=1).count(),
-            'top_5': songs.filter(peak_rank__lte=5).count(),
-            'top_10': songs.filter(peak_rank__lte=10).count(),
-            'top_50': songs.filter(peak_rank__lte=50).count(),
-            'lower': songs.filter(peak_rank__gt=50).count(),
-        }
-        return Response(distribution)
-
-    def get_decade_breakdown(self, artist):
-        """Get hits by decade with stats"""
-        songs = Song.objects.filter(artist_fk=artist)
+        return {key: totals[f'peak:{key}'] for key in PEAK_BUCKETS}
 
+    def get_decade_breakdown(self, totals):
+        """Get hits by decade with stats"""
         decades = {}
-        for decade_start in range(1950, 2030, 10):
-            decade_end = decade_start + 9
-            decade_key = f"{decade_start}s"
-
-            decade_songs = songs.filter(year__gte=decade_start, year__lte=decade_end)
-            count = decade_songs.count()
-
+        for decade_start in DECADES:
+            count = totals[f'{decade_start}:hits']
             if count > 0:
-                total_weeks = decade_songs.aggregate(Sum('weeks_on_chart'))['weeks_on_chart__sum'] or 0
-                avg_peak = decade_songs.aggregate(Avg('peak_rank'))['peak_rank__avg'] or 0
-
-                decades[decade_key] = {
+                decades[f"{decade_start}s"] = {
                     'hits': count,
-                    'total_weeks': total_weeks,
-                    'avg_peak': round(avg_peak, 2)
+                    'total_weeks': totals[f'{decade_start}:total_weeks'] or 0,
+                    'avg_peak': round(totals[f'{decade_start}:avg_peak'] or 0, 2)
                 }
-
-        return Response(decades)
+        return decades
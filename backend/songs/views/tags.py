@@ -1,10 +1,14 @@
 # songs/views/tags.py
 from rest_framework import generics
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.response import Response
+from django.db.models import Count, Max, Sum
 from ..models.tag import SongTag
 from ..serializers import TagDetailSerializer
 # Import your custom permissions
 from ..permissions import IsInternalServerWithOptionalAuth 
+from .conditional import ConditionalGetMixin, stamp
+from .. import cache as songs_cache
 
 class TagDetailView(generics.RetrieveAPIView):
     queryset = SongTag.objects.all()
@@ -15,8 +19,21 @@ class TagDetailView(generics.RetrieveAPIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsInternalServerWithOptionalAuth]
 
-class TagListView(generics.ListAPIView):
+    def retrieve(self, request, *args, **kwargs):
+        # No per-user fields, so every request shares the cached payload
+        data = songs_cache.cached(
+            'tag-detail', None, [songs_cache.tag(kwargs['slug'])],
+            lambda: super(TagDetailView, self).retrieve(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+class TagListView(ConditionalGetMixin, generics.ListAPIView):
     # We use order_by to prioritize featured tags first, then alphabetically
     queryset = SongTag.objects.all().order_by('-is_featured', 'name')
     serializer_class = TagDetailSerializer
-    pagination_class = None
\ No newline at end of file
+    pagination_class = None
+
+    def get_etag(self, request, *args, **kwargs):
+        # update_song_count() saves with update_fields, which skips updated_at
+        tags = SongTag.objects.aggregate(count=Count('id'), updated=Max('updated_at'), songs=Sum('song_count'))
+        return stamp('tags', tags['count'], tags['updated'], tags['songs'])
\ No newline at end of file
@@ -38,7 +38,9 @@ class TrendingArchiveView(APIView):
         
         # 3. Fetch the actual Song objects in the correct trending order
         preserved = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(song_ids)])
-        final_qs = Song.objects.filter(id__in=song_ids).order_by(preserved)
+        final_qs = Song.objects.filter(id__in=song_ids).select_related('artist_fk').prefetch_related(
+            'tag_relations__tag'
+        ).order_by(preserved)
         
         # 4. Attach the activity data back to each Song object
         for song in final_qs:
@@ -47,5 +49,5 @@ class TrendingArchiveView(APIView):
             song.latest_rater = data.get('rater')
             song.latest_time = data.get('time')
         
-        serializer = SongSerializer(final_qs, many=True)
+        serializer = SongSerializer(final_qs, many=True, context={'request': request})
         return Response(serializer.data)
\ No newline at end of file
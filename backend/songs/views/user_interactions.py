@@ -4,9 +4,11 @@ from rest_framework.views import APIView
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 
-from ..models import Song, UserSongRating, UserSongComment, Bookmark
+from ..models import Song, UserSongRating, UserSongComment, Bookmark, RatingEvent
 from ..serializers import UserSongCommentSerializer, SongSerializer
 
 
@@ -60,10 +62,39 @@ class UserSongRatingCreateView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @staticmethod
+    def clean_score(value):
+        """The rating as an int from 1 to 10 (the UserSongRating choices), or None"""
+        try:
+            score = int(value)
+        except (TypeError, ValueError):
+            return None
+        return score if 1 <= score <= 10 else None
+
     def post(self, request, pk):
-        song = get_object_or_404(Song, pk=pk)
         rating_value = request.data.get('rating', None)
 
+        if rating_value is not None:
+            rating_value = self.clean_score(rating_value)
+            if rating_value is None:
+                return Response({'detail': 'Rating must be a whole number from 1 to 10.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if rating_value is not None and settings.RATING_WRITE_BEHIND:
+            # Queue the rating; process_rating_queue applies it with the aggregates and points
+            if not Song.objects.filter(pk=pk).exists():
+                return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                with transaction.atomic():
+                    RatingEvent.objects.create(user=request.user, song_id=pk, score=rating_value)
+            except IntegrityError:
+                # Only a song deleted since the check above is a 404
+                if Song.objects.filter(pk=pk).exists():
+                    raise
+                return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(status=status.HTTP_201_CREATED)
+
+        song = get_object_or_404(Song, pk=pk)
+
         if rating_value is not None:
             user = request.user
             user_rating = UserSongRating.objects.filter(user=user, song=song).first()
@@ -121,9 +152,12 @@ class UserBookmarkedSongsView(APIView):
     
     def get(self, request):
         user_bookmarks = Bookmark.objects.filter(user=request.user)
-        bookmarked_songs = [bookmark.songs.all() for bookmark in user_bookmarks]
+        bookmarked_songs = [
+            bookmark.songs.select_related('artist_fk').prefetch_related('tag_relations__tag')
+            for bookmark in user_bookmarks
+        ]
         songs = [song for songs_queryset in bookmarked_songs for song in songs_queryset]
-        serializer = SongSerializer(songs, many=True)
+        serializer = SongSerializer(songs, many=True, context={'request': request})
         return Response(serializer.data)
 
     def delete(self, request):
@@ -1,37 +1,17 @@
 from django.http import JsonResponse
-from django.contrib.auth import get_user_model
-from ..models import Song, SongTimeline, UserSongRating, UserSongComment, Bookmark
+from core.middleware import query_budget
+from ..models import SiteCounters
+from .. import cache as songs_cache
 
-def website_stats(request):
-    # Total unique songs
-    song_count = Song.objects.count()
-
-    # Total unique artists (adjust if you have a dedicated Artist model)
-    if hasattr(Song, 'artist'):
-        artist_count = Song.objects.values("artist").distinct().count()
-    else:
-        # Replace with Artist.objects.count() if available
-        artist_count = None
-
-    # Total distinct historic charts by week
-    chart_count = SongTimeline.objects.values("chart_date").distinct().count()
+# The counters row changes with every rating and comment; a short TTL keeps those fresh enough
+STATS_CACHE_TIMEOUT = 60
 
-    # User engagement stats
-    user_rating_count = UserSongRating.objects.count()
-    user_comment_count = UserSongComment.objects.count()
-    bookmark_count = Bookmark.objects.count()
-
-    # Get newest member username (excluding staff and superusers)
-    User = get_user_model()
-    newest_user = User.objects.filter(is_staff=False, is_superuser=False).order_by('-date_joined').first()
-    newest_username = newest_user.username if newest_user else None
+# The very first request creates the counters row with a full recount
+@query_budget(15)
+def website_stats(request):
+    return JsonResponse(songs_cache.cached('website-stats', None, ['site'], _website_stats, STATS_CACHE_TIMEOUT))
 
-    return JsonResponse({
-        "song_count": song_count,
-        "artist_count": artist_count,
-        "chart_count": chart_count,
-        "user_rating_count": user_rating_count,
-        "user_comment_count": user_comment_count,
-        "bookmark_count": bookmark_count,
-        "newest_username": newest_username,
-    })
+def _website_stats():
+    # One primary-key read; the counters are maintained by signals and the import
+    # commands, and recounted by `manage.py reconcile_site_counters`
+    return SiteCounters.get().as_dict()
@@ -0,0 +1,415 @@
+"""
+Historian leaderboard.
+
+All-time and monthly rankings are kept in sorted structures so top-N, the rank
+of one user and the users around them are answered without sorting the
+profiles table. Ties are broken by ascending user_id on both backends.
+
+With REDIS_URL set (and the redis package installed) they are Redis sorted
+sets shared by every worker. Otherwise each worker keeps its own bisect-sorted
+lists, built from UserProfile on first use. Point changes update the board of
+the worker that made them and append the changed user_ids to a short-lived
+change log in the shared cache (CHANGES_KEY); the other workers replay it on
+use with one query for just those profiles. A worker that has fallen more than
+MAX_CHANGES behind, or finds entries expired, rebuilds instead. reset()
+invalidates the CACHE_DEPENDENCY version, which makes every worker rebuild, at
+most once per MIN_REBUILD_INTERVAL (and after LEADERBOARD_MAX_AGE seconds
+regardless), like the sampling pools.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from songs import cache as songs_cache
+
+try:
+    import redis
+except ImportError:  # optional: fall back to the in-process board
+    redis = None
+
+BOARDS = {'all_time': 'points', 'monthly': 'points_monthly'}
+MAX_TOP = 100
+CACHE_DEPENDENCY = 'leaderboard'
+MIN_REBUILD_INTERVAL = 30
+CHANGES_KEY = 'leaderboard:changes'
+CHANGES_TIMEOUT = 10 * 60
+MAX_CHANGES = 500
+BUILD_TIMEOUT = 60 * 60  # leftover keys of a Redis load that died halfway
+
+
+def excluded_usernames():
+    return set(getattr(settings, 'LEADERBOARD_EXCLUDED_USERNAMES', ()))
+
+
+def profile_rows(user_ids=None):
+    """(user_id, username, points, points_monthly) for ranked profiles."""
+    from .models import UserProfile
+
+    profiles = UserProfile.objects.exclude(user__username__in=excluded_usernames())
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    return profiles.values_list('user_id', 'user__username', 'points', 'points_monthly')
+
+
+class SortedBoard:
+    """One ranking: (-score, user_id) pairs in a sorted list, highest score first."""
+
+    def __init__(self):
+        self._entries = []
+        self._scores = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, scores):
+        self._scores = dict(scores)
+        self._entries = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def set(self, user_id, score):
+        if self._scores.get(user_id) == score:
+            return
+        self.remove(user_id)
+        self._scores[user_id] = score
+        insort(self._entries, (-score, user_id))
+
+    def remove(self, user_id):
+        score = self._scores.pop(user_id, None)
+        if score is None:
+            return
+        pos = bisect_left(self._entries, (-score, user_id))
+        if pos < len(self._entries) and self._entries[pos] == (-score, user_id):
+            del self._entries[pos]
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def rank(self, user_id):
+        """0-based position, or None if the user isn't ranked."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._entries, (-score, user_id))
+
+    def slice(self, start, stop):
+        return [(start + i, user_id, -neg) for i, (neg, user_id) in enumerate(self._entries[start:stop])]
+
+
+class LocalLeaderboard:
+    def __init__(self, version=None, changes_seq=0):
+        self._lock = threading.Lock()
+        self._boards = {name: SortedBoard() for name in BOARDS}
+        self._usernames = {}
+        self.version = version
+        self.changes_seq = changes_seq  # the last change log entry applied
+        self.built_at = time.monotonic()
+
+    def load(self, rows):
+        with self._lock:
+            rows = list(rows)
+            self._usernames = {user_id: username for user_id, username, _, _ in rows}
+            self._boards['all_time'].load((user_id, points) for user_id, _, points, _ in rows)
+            self._boards['monthly'].load((user_id, monthly) for user_id, _, _, monthly in rows)
+            self.built_at = time.monotonic()
+
+    def update(self, rows):
+        with self._lock:
+            for user_id, username, points, monthly in rows:
+                self._usernames[user_id] = username
+                self._boards['all_time'].set(user_id, points)
+                self._boards['monthly'].set(user_id, monthly)
+
+    def remove(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._usernames.pop(user_id, None)
+                for board in self._boards.values():
+                    board.remove(user_id)
+
+    def _entries(self, ranked):
+        totals = self._boards['all_time']
+        return [
+            {
+                'rank': position + 1,
+                'user_id': user_id,
+                'username': self._usernames.get(user_id),
+                'points': score,
+                'total_points': totals.score(user_id),
+            }
+            for position, user_id, score in ranked
+        ]
+
+    def top(self, board, n=10):
+        with self._lock:
+            return self._entries(self._boards[board].slice(0, min(n, MAX_TOP)))
+
+    def rank(self, board, user_id):
+        """The user's entry on `board`, or None if they aren't ranked."""
+        with self._lock:
+            sorted_board = self._boards[board]
+            position = sorted_board.rank(user_id)
+            if position is None:
+                return None
+            return self._entries([(position, user_id, sorted_board.score(user_id))])[0]
+
+    def around(self, board, user_id, radius=2):
+        """The user's entry with up to `radius` entries on either side."""
+        with self._lock:
+            sorted_board = self._boards[board]
+            position = sorted_board.rank(user_id)
+            if position is None:
+                return []
+            return self._entries(sorted_board.slice(max(0, position - radius), position + radius + 1))
+
+
+class RedisLeaderboard:
+    """
+    Same interface as LocalLeaderboard, backed by one ZSET per board. Scores
+    are stored negated and members zero-padded, so ZRANGE's ascending order
+    (score, then member bytes) is highest points first, lowest user_id first.
+    """
+
+    def __init__(self, client, prefix='leaderboard'):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, name):
+        return f'{self.prefix}:{name}'
+
+    @staticmethod
+    def _member(user_id):
+        return f'{user_id:012d}'
+
+    def load(self, rows, batch_size=5000):
+        """
+        Fill keys private to this load and swap them in with one MULTI, so
+        readers never see a half-built board and concurrent loads never mix.
+        A reset() during the load wins: the load is discarded and False returned.
+        """
+        generation = self.client.get(self._key('generation'))
+        building = {name: self._key(f'building:{uuid.uuid4().hex}:{name}') for name in (*BOARDS, 'usernames')}
+        pipe = self.client.pipeline(transaction=False)
+        filled = False
+        for i, (user_id, username, points, monthly) in enumerate(rows, 1):
+            pipe.zadd(building['all_time'], {self._member(user_id): -points})
+            pipe.zadd(building['monthly'], {self._member(user_id): -monthly})
+            pipe.hset(building['usernames'], user_id, username)
+            filled = True
+            if i % batch_size == 0:
+                for key in building.values():
+                    pipe.expire(key, BUILD_TIMEOUT)
+                pipe.execute()
+        for key in building.values():
+            pipe.expire(key, BUILD_TIMEOUT)
+        pipe.execute()
+
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self._key('generation'))
+                loaded = pipe.get(self._key('generation')) == generation
+                if loaded:
+                    pipe.multi()
+                    for name, key in building.items():
+                        if filled:
+                            pipe.rename(key, self._key(name))
+                            pipe.persist(self._key(name))
+                        else:
+                            pipe.delete(self._key(name))
+                    pipe.set(self._key('built'), 1)
+                    pipe.execute()
+            except redis.WatchError:
+                loaded = False
+        if not loaded:
+            self.client.delete(*building.values())
+        return loaded
+
+    def is_loaded(self):
+        return bool(self.client.exists(self._key('built')))
+
+    def update(self, rows):
+        pipe = self.client.pipeline()
+        for user_id, username, points, monthly in rows:
+            pipe.zadd(self._key('all_time'), {self._member(user_id): -points})
+            pipe.zadd(self._key('monthly'), {self._member(user_id): -monthly})
+            pipe.hset(self._key('usernames'), user_id, username)
+        pipe.execute()
+
+    def remove(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        pipe = self.client.pipeline()
+        for name in BOARDS:
+            pipe.zrem(self._key(name), *(self._member(user_id) for user_id in user_ids))
+        pipe.hdel(self._key('usernames'), *user_ids)
+        pipe.execute()
+
+    def reset(self):
+        pipe = self.client.pipeline()
+        pipe.incr(self._key('generation'))  # discards loads still in progress
+        pipe.delete(*(self._key(name) for name in (*BOARDS, 'usernames', 'built')))
+        pipe.execute()
+
+    def _entries(self, start, ranked):
+        if not ranked:
+            return []
+        user_ids = [int(member) for member, _ in ranked]
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hmget(self._key('usernames'), user_ids)
+        for user_id in user_ids:
+            pipe.zscore(self._key('all_time'), self._member(user_id))
+        usernames, *totals = pipe.execute()
+        return [
+            {
+                'rank': start + i + 1,
+                'user_id': user_id,
+                'username': username.decode() if username else None,
+                'points': int(-score),
+                'total_points': int(-total) if total is not None else None,
+            }
+            for i, (user_id, (_, score), username, total) in enumerate(zip(user_ids, ranked, usernames, totals))
+        ]
+
+    def top(self, board, n=10):
+        return self._entries(0, self.client.zrange(self._key(board), 0, min(n, MAX_TOP) - 1, withscores=True))
+
+    def rank(self, board, user_id):
+        member = self._member(user_id)
+        position = self.client.zrank(self._key(board), member)
+        if position is None:
+            return None
+        score = self.client.zscore(self._key(board), member)
+        return self._entries(position, [(member, score)])[0]
+
+    def around(self, board, user_id, radius=2):
+        position = self.client.zrank(self._key(board), self._member(user_id))
+        if position is None:
+            return []
+        start = max(0, position - radius)
+        return self._entries(start, self.client.zrange(
+            self._key(board), start, position + radius, withscores=True
+        ))
+
+
+_leaderboard = None
+_build_lock = threading.Lock()
+_redis = None  # (url, client); one connection pool per worker
+
+
+def redis_client():
+    global _redis
+    url = getattr(settings, 'REDIS_URL', None)
+    if not url or redis is None:
+        return None
+    if _redis is None or _redis[0] != url:
+        _redis = (url, redis.Redis.from_url(url))
+    return _redis[1]
+
+
+def _is_current(board, version, max_age):
+    if board is None:
+        return False
+    age = time.monotonic() - board.built_at
+    if age > max_age:
+        return False
+    return board.version == version or age < MIN_REBUILD_INTERVAL
+
+
+def get_leaderboard():
+    """Return the leaderboard, building it from UserProfile when missing or (locally) invalidated or too old."""
+    global _leaderboard
+    client = redis_client()
+    if client is not None:
+        board = RedisLeaderboard(client)
+        if not board.is_loaded():
+            board.load(profile_rows().iterator(chunk_size=5000))
+        return board
+
+    max_age = getattr(settings, 'LEADERBOARD_MAX_AGE', 3600)
+    version = songs_cache.versions([CACHE_DEPENDENCY])[CACHE_DEPENDENCY]
+    changes_seq = cache.get(CHANGES_KEY, 0)
+    board = _leaderboard
+    if not _is_current(board, version, max_age) or board.changes_seq != changes_seq:
+        with _build_lock:
+            board = _leaderboard
+            if _is_current(board, version, max_age):
+                if board.changes_seq == changes_seq or _apply_changes(board, changes_seq):
+                    return board
+            # Changes logged while the rows are read are replayed on a later use
+            board = LocalLeaderboard(version, changes_seq)
+            board.load(profile_rows().iterator(chunk_size=5000))
+            _leaderboard = board
+    return board
+
+
+def _apply_changes(board, changes_seq):
+    """Replay the change log from board.changes_seq; False when a rebuild is needed instead."""
+    if not board.changes_seq < changes_seq <= board.changes_seq + MAX_CHANGES:
+        return False
+    keys = [f'{CHANGES_KEY}:{seq}' for seq in range(board.changes_seq + 1, changes_seq + 1)]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        return False
+    user_ids = set().union(*found.values())
+    rows = list(profile_rows(user_ids))
+    board.update(rows)
+    board.remove(user_ids - {row[0] for row in rows})
+    board.changes_seq = changes_seq
+    return True
+
+
+def _log_changes(user_ids):
+    """Append user_ids to the change log the other workers replay."""
+    cache.add(CHANGES_KEY, 0, None)
+    try:
+        seq = cache.incr(CHANGES_KEY)
+    except ValueError:
+        # The counter was evicted in between; rebuilding everywhere is always safe
+        songs_cache.invalidate(CACHE_DEPENDENCY)
+        return
+    cache.set(f'{CHANGES_KEY}:{seq}', sorted(user_ids), CHANGES_TIMEOUT)
+
+
+def loaded_leaderboard():
+    """The leaderboard if one has been built (point changes never trigger a build)."""
+    client = redis_client()
+    if client is not None:
+        board = RedisLeaderboard(client)
+        return board if board.is_loaded() else None
+    return _leaderboard
+
+
+def sync_users(user_ids):
+    """Push these users' current totals to the leaderboard once the transaction commits."""
+    user_ids = set(user_ids)
+
+    def push():
+        if redis_client() is None:
+            _log_changes(user_ids)
+        board = loaded_leaderboard()
+        if board is None:
+            return
+        rows = list(profile_rows(user_ids))
+        board.update(rows)
+        board.remove(user_ids - {row[0] for row in rows})
+
+    if user_ids:
+        transaction.on_commit(push)
+
+
+def reset():
+    """Drop the leaderboard after bulk point changes, in every worker; the next read rebuilds it."""
+    def drop():
+        global _leaderboard
+        client = redis_client()
+        if client is not None:
+            RedisLeaderboard(client).reset()
+        else:
+            songs_cache.invalidate(CACHE_DEPENDENCY)
+        _leaderboard = None
+
+    transaction.on_commit(drop)
@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from users import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Benchmark leaderboard top-N / rank / neighbour queries on synthetic profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100000, help='Number of synthetic profiles')
+        parser.add_argument('--queries', type=int, default=10000, help='Queries per operation')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--redis',
+            action='store_true',
+            help='Also benchmark the Redis board (uses REDIS_URL, keys under "benchmark:leaderboard")',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['profiles']
+        queries = options['queries']
+        rows = [
+            (user_id, f'user{user_id}', rng.randint(0, 60000), rng.randint(0, 3000))
+            for user_id in range(1, count + 1)
+        ]
+        user_ids = [rng.randint(1, count) for _ in range(queries)]
+
+        self.stdout.write(f"{count:,} profiles, {queries:,} queries per operation")
+
+        board = leaderboard.LocalLeaderboard()
+        self.run('in-process', board, rows, user_ids, rng)
+
+        if options['redis']:
+            client = leaderboard.redis_client()
+            if client is None:
+                self.stdout.write(self.style.WARNING('REDIS_URL is not set or redis is not installed, skipping'))
+            else:
+                board = leaderboard.RedisLeaderboard(client, prefix='benchmark:leaderboard')
+                try:
+                    self.run('redis', board, rows, user_ids, rng)
+                finally:
+                    board.reset()
+
+        # What the view did before: sort every profile for each request
+        started = time.perf_counter()
+        for _ in range(max(1, queries // 100)):
+            sorted(rows, key=lambda row: -row[2])[:10]
+        self.report('full sort (old view)', max(1, queries // 100), time.perf_counter() - started)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def run(self, label, board, rows, user_ids, rng):
+        started = time.perf_counter()
+        board.load(rows)
+        self.stdout.write(f"{label}: built in {time.perf_counter() - started:.2f}s")
+
+        operations = (
+            ('top 10', lambda user_id: board.top('all_time', 10)),
+            ('rank', lambda user_id: board.rank('all_time', user_id)),
+            ('neighbours', lambda user_id: board.around('monthly', user_id, 2)),
+            ('update', lambda user_id: board.update(
+                [(user_id, f'user{user_id}', rng.randint(0, 60000), rng.randint(0, 3000))]
+            )),
+        )
+        for name, operation in operations:
+            started = time.perf_counter()
+            for user_id in user_ids:
+                operation(user_id)
+            self.report(f"{label} {name}", len(user_ids), time.perf_counter() - started)
+
+    def report(self, name, calls, elapsed):
+        self.stdout.write(
+            f"  {name:<24} {calls:>7,} calls in {elapsed:.2f}s = {elapsed / calls * 1e6:,.1f} µs/call"
+        )
@@ -1,12 +1,20 @@
 # users/management/commands/refresh_points.py
 from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
-from users.signals import update_user_points
+from users import points
 
 class Command(BaseCommand):
-    help = 'Recalculates points to keep the 31-day window accurate'
+    help = 'Daily sweep: drops ledger entries older than 31 days from the monthly points'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild the whole points ledger from ratings and comments first',
+        )
 
     def handle(self, *args, **options):
-        for user in User.objects.all():
-            update_user_points(user)
-        self.stdout.write("All points refreshed.")
\ No newline at end of file
+        if options['rebuild']:
+            posted = points.rebuild()
+            self.stdout.write(f"Ledger rebuilt: {posted} entries.")
+        expired = points.expire_monthly()
+        self.stdout.write(f"Monthly points refreshed ({expired} entries expired).")
@@ -0,0 +1,108 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:53
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_ledger(apps, schema_editor):
+    PointEntry = apps.get_model("users", "PointEntry")
+    UserProfile = apps.get_model("users", "UserProfile")
+    UserSongRating = apps.get_model("songs", "UserSongRating")
+    UserSongComment = apps.get_model("songs", "UserSongComment")
+
+    cutoff = timezone.now() - timedelta(days=31)
+    sources = (
+        ("rating", 10, UserSongRating.objects.exclude(score=0)),
+        ("comment", 25, UserSongComment.objects.all()),
+    )
+    for source, points, queryset in sources:
+        PointEntry.objects.bulk_create(
+            (
+                PointEntry(
+                    user_id=user_id,
+                    source=source,
+                    object_id=object_id,
+                    points=points,
+                    created_at=created_at,
+                    expired=created_at < cutoff,
+                )
+                for object_id, user_id, created_at in queryset.values_list(
+                    "id", "user_id", "created_at"
+                ).iterator()
+            ),
+            batch_size=5000,
+        )
+
+    def total(**filters):
+        return Coalesce(
+            Subquery(
+                PointEntry.objects.filter(user_id=OuterRef("user_id"), **filters)
+                .values("user_id")
+                .annotate(total=Sum("points"))
+                .values("total")
+            ),
+            0,
+        )
+
+    UserProfile.objects.update(points=total(), points_monthly=total(expired=False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("songs", "0023_ratingevent"),
+        ("users", "0005_userprofile_points_monthly"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PointEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("rating", "Rating"), ("comment", "Comment")],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("points", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField()),
+                ("expired", models.BooleanField(default=False)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="point_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["expired", "created_at"],
+                        name="users_point_expired_7aaa88_idx",
+                    )
+                ],
+                "unique_together": {("source", "object_id")},
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
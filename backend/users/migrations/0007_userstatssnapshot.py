@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0006_pointentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStatsSnapshot",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats_snapshot",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("ratings_version", models.PositiveIntegerField(default=0)),
+                ("built_version", models.PositiveIntegerField(default=0)),
+                ("format", models.PositiveSmallIntegerField(default=0)),
+                ("data", models.JSONField(default=dict)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
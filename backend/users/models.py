@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import IntegrityError, models
+from django.db.models import F
 from django.contrib.auth.models import User
 
 class UserProfile(models.Model):
@@ -54,4 +55,135 @@ class UserProfile(models.Model):
         return None
 
     def __str__(self):
-        return f"{self.user.username}: {self.historian_title} ({self.points} pts)"
\ No newline at end of file
+        return f"{self.user.username}: {self.historian_title} ({self.points} pts)"
+
+class PointEntry(models.Model):
+    """
+    One ledger line per point-earning contribution (a non-zero rating or a comment).
+
+    UserProfile.points and points_monthly are running totals of these entries;
+    `expired` marks entries the daily sweep has already taken out of the monthly window.
+    """
+    RATING = 'rating'
+    COMMENT = 'comment'
+    SOURCE_CHOICES = [(RATING, 'Rating'), (COMMENT, 'Comment')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='point_entries')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    object_id = models.PositiveIntegerField()
+    points = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    expired = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('source', 'object_id')
+        indexes = [models.Index(fields=['expired', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.user_id}: +{self.points} for {self.source} {self.object_id}"
+
+
+class UserStatsSnapshot(models.Model):
+    """
+    The rating-derived part of a user's stats page, stored as one JSON document.
+
+    Rating writes bump `ratings_version`; the snapshot is stale whenever it was
+    built from an older version (or an older FORMAT) and is rebuilt from that
+    user's ratings on the next read.
+    """
+    # Bump when the shape of `data` changes so existing rows are rebuilt
+    FORMAT = 1
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats_snapshot')
+    ratings_version = models.PositiveIntegerField(default=0)
+    built_version = models.PositiveIntegerField(default=0)
+    format = models.PositiveSmallIntegerField(default=0)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.user_id} (v{self.built_version}/{self.ratings_version})"
+
+    @property
+    def is_stale(self):
+        return self.format != self.FORMAT or self.built_version != self.ratings_version
+
+    @classmethod
+    def mark_stale(cls, user_ids):
+        cls.objects.filter(user_id__in=user_ids).update(ratings_version=F('ratings_version') + 1)
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Return the user's stats data, rebuilding it first if it is stale.
+        Pass a user loaded with select_related('stats_snapshot') to make a fresh
+        snapshot cost no extra queries.
+        """
+        try:
+            snapshot = user.stats_snapshot
+        except cls.DoesNotExist:
+            snapshot = None
+        if snapshot is not None and not snapshot.is_stale:
+            return snapshot.data
+
+        # Build against the version we read; a rating written meanwhile bumps
+        # ratings_version past it, so the row stays stale instead of going wrong
+        version = snapshot.ratings_version if snapshot else 0
+        data = cls.compute(user.pk)
+        if snapshot is None:
+            try:
+                cls.objects.create(user=user, built_version=version, format=cls.FORMAT, data=data)
+            except IntegrityError:
+                pass
+        else:
+            cls.objects.filter(pk=snapshot.pk, ratings_version=version).update(
+                built_version=version, format=cls.FORMAT, data=data
+            )
+        return data
+
+    @staticmethod
+    def compute(user_id):
+        """Build the stats document from one query over the user's ratings."""
+        from songs.models import UserSongRating
+
+        ratings = list(
+            UserSongRating.objects.filter(user_id=user_id)
+            .order_by('id')
+            .values_list('score', 'song_id', 'song__title', 'song__artist', 'song__year')
+        )
+
+        distribution = {}
+        decades = {}
+        for score, _, _, _, year in ratings:
+            distribution[score] = distribution.get(score, 0) + 1
+            if score:
+                decade = year // 10 * 10 if year is not None else None
+                decades.setdefault(decade, []).append(score)
+
+        scored = [r for r in ratings if r[0]]
+        max_score = max((r[0] for r in scored), default=None)
+        min_score = min((r[0] for r in scored), default=None)
+
+        def rated_songs(score):
+            return [
+                {
+                    'score': s,
+                    'song': {'title': title, 'artist': artist, 'year': year, 'id': song_id},
+                }
+                for s, song_id, title, artist, year in scored
+                if s == score
+            ]
+
+        return {
+            'songs_rated': len(ratings),
+            'average_score': sum(r[0] for r in ratings) / len(ratings) if ratings else None,
+            'score_distribution': [
+                {'score': score, 'count': count} for score, count in sorted(distribution.items())
+            ],
+            'decade_averages': [
+                {'decade': decade, 'avg_score': sum(scores) / len(scores), 'scores': scores}
+                for decade, scores in sorted(decades.items(), key=lambda item: (item[0] is not None, item[0]))
+            ],
+            'highest_rated_songs': rated_songs(max_score) if max_score is not None else [],
+            'lowest_rated_songs': rated_songs(min_score) if min_score is not None else [],
+        }
@@ -0,0 +1,204 @@
+"""
+Historian points ledger.
+
+Every point-earning contribution (a non-zero rating or a comment) posts one
+PointEntry, and UserProfile.points / points_monthly are kept as running totals
+with atomic UPDATEs. The monthly window only needs a daily sweep
+(`refresh_points`) that subtracts entries which have aged out of it, so nothing
+on the read side ever recounts ratings or comments.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import leaderboard
+from .models import PointEntry, UserProfile
+
+POINTS = {PointEntry.RATING: 10, PointEntry.COMMENT: 25}
+MONTHLY_WINDOW = timedelta(days=31)
+
+
+def monthly_cutoff(now=None):
+    return (now or timezone.now()) - MONTHLY_WINDOW
+
+
+def _decrement(field, amount):
+    # The totals are unsigned columns on MySQL, so never let them go below zero
+    return Case(
+        When(**{f'{field}__gte': amount}, then=F(field) - amount),
+        default=Value(0),
+    )
+
+
+def _apply_totals(totals):
+    """totals: {user_id: (all-time delta, monthly delta)}"""
+    for user_id, (delta, monthly_delta) in totals.items():
+        changes = {}
+        for field, value in (('points', delta), ('points_monthly', monthly_delta)):
+            if value > 0:
+                changes[field] = F(field) + value
+            elif value < 0:
+                changes[field] = _decrement(field, -value)
+        if changes:
+            UserProfile.objects.filter(user_id=user_id).update(**changes)
+    leaderboard.sync_users(totals)
+
+
+def _lock_profiles(user_ids):
+    """Create any missing profiles, then lock them all in user_id order (so lockers can't deadlock)."""
+    existing = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id) for user_id in user_ids if user_id not in existing],
+        ignore_conflicts=True,
+    )
+    list(UserProfile.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id').values_list('pk'))
+
+
+def post_entries(source, items):
+    """
+    Post ledger entries for contributions that don't have one yet.
+    items: iterable of (object_id, user_id, created_at).
+    """
+    items = {object_id: (user_id, created_at) for object_id, user_id, created_at in items}
+    if not items:
+        return
+    cutoff = monthly_cutoff()
+    with transaction.atomic():
+        # Two callers posting the same contribution would otherwise both find it
+        # missing and both count it. Holding the users' profile locks serialises
+        # them, and the locking read below sees whatever the other one committed.
+        _lock_profiles({user_id for user_id, _ in items.values()})
+        posted = set(
+            PointEntry.objects.select_for_update()
+            .filter(source=source, object_id__in=items)
+            .values_list('object_id', flat=True)
+        )
+        entries = [
+            PointEntry(
+                user_id=user_id,
+                source=source,
+                object_id=object_id,
+                points=POINTS[source],
+                created_at=created_at,
+                expired=created_at < cutoff,
+            )
+            for object_id, (user_id, created_at) in items.items()
+            if object_id not in posted
+        ]
+        PointEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+        totals = defaultdict(lambda: (0, 0))
+        for entry in entries:
+            delta, monthly_delta = totals[entry.user_id]
+            totals[entry.user_id] = (delta + entry.points, monthly_delta + (0 if entry.expired else entry.points))
+        _apply_totals(totals)
+
+
+def remove_entries(source, object_ids):
+    """Reverse the entries posted for these contributions, if any."""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    with transaction.atomic():
+        entries = list(
+            PointEntry.objects.select_for_update()
+            .filter(source=source, object_id__in=object_ids)
+            .values_list('id', 'user_id', 'points', 'expired')
+        )
+        if not entries:
+            return
+        PointEntry.objects.filter(id__in=[entry[0] for entry in entries]).delete()
+
+        totals = defaultdict(lambda: (0, 0))
+        for _, user_id, points, expired in entries:
+            delta, monthly_delta = totals[user_id]
+            totals[user_id] = (delta - points, monthly_delta - (0 if expired else points))
+        _apply_totals(totals)
+
+
+def sync_ratings(ratings):
+    """Post entries for rated songs and reverse them for ratings whose score is 0."""
+    post_entries(PointEntry.RATING, [(r.pk, r.user_id, r.created_at) for r in ratings if r.score])
+    remove_entries(PointEntry.RATING, [r.pk for r in ratings if not r.score])
+
+
+def expire_monthly(now=None):
+    """
+    Take entries older than the monthly window out of points_monthly with one
+    set-based UPDATE, then mark them expired. Returns the number of entries expired.
+    """
+    cutoff = monthly_cutoff(now)
+    with transaction.atomic():
+        expiring = PointEntry.objects.filter(expired=False, created_at__lt=cutoff)
+        expired_points = Subquery(
+            expiring.filter(user_id=OuterRef('user_id'))
+            .values('user_id')
+            .annotate(total=Sum('points'))
+            .values('total')
+        )
+        UserProfile.objects.filter(user_id__in=expiring.values('user_id')).update(
+            points_monthly=_decrement('points_monthly', Coalesce(expired_points, 0))
+        )
+        expired = expiring.update(expired=True)
+    if expired:
+        leaderboard.reset()
+    return expired
+
+
+def rebuild(now=None):
+    """
+    Rebuild the whole ledger from the ratings and comments tables and reset
+    every profile's totals from it. Returns the number of entries posted.
+    """
+    from songs.models import UserSongComment, UserSongRating
+
+    cutoff = monthly_cutoff(now)
+    sources = (
+        (PointEntry.RATING, UserSongRating.objects.exclude(score=0)),
+        (PointEntry.COMMENT, UserSongComment.objects.all()),
+    )
+    posted = 0
+    with transaction.atomic():
+        PointEntry.objects.all().delete()
+        for source, queryset in sources:
+            rows = queryset.values_list('id', 'user_id', 'created_at')
+            batch = []
+            for object_id, user_id, created_at in rows.iterator(chunk_size=5000):
+                batch.append(PointEntry(
+                    user_id=user_id,
+                    source=source,
+                    object_id=object_id,
+                    points=POINTS[source],
+                    created_at=created_at,
+                    expired=created_at < cutoff,
+                ))
+                if len(batch) >= 5000:
+                    PointEntry.objects.bulk_create(batch)
+                    posted += len(batch)
+                    batch = []
+            PointEntry.objects.bulk_create(batch)
+            posted += len(batch)
+
+        user_ids = PointEntry.objects.values('user_id').distinct()
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in user_ids.exclude(
+                user_id__in=UserProfile.objects.values('user_id')
+            ).values_list('user_id', flat=True)],
+            ignore_conflicts=True,
+        )
+
+        def total(**filters):
+            return Coalesce(Subquery(
+                PointEntry.objects.filter(user_id=OuterRef('user_id'), **filters)
+                .values('user_id')
+                .annotate(total=Sum('points'))
+                .values('total')
+            ), 0)
+
+        UserProfile.objects.update(points=total(), points_monthly=total(expired=False))
+    leaderboard.reset()
+    return posted
@@ -0,0 +1,157 @@
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from songs import cache as songs_cache
+from users import leaderboard, points
+from users.models import PointEntry, UserProfile
+
+
+@mock.patch.object(leaderboard, 'MIN_REBUILD_INTERVAL', 0)
+@override_settings(REDIS_URL=None)
+class LocalLeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        leaderboard._leaderboard = None
+        self.addCleanup(setattr, leaderboard, '_leaderboard', None)
+        self.users = {}
+        for username, score in [('dave', 50), ('carol', 80), ('bob', 50), ('alice', 50), ('admin', 999)]:
+            user = User.objects.create_user(username, password='x')
+            UserProfile.objects.create(user=user, points=score, points_monthly=score // 10)
+            self.users[username] = user
+
+    def version(self):
+        return songs_cache.versions([leaderboard.CACHE_DEPENDENCY])[leaderboard.CACHE_DEPENDENCY]
+
+    def test_ties_go_to_the_lower_user_id(self):
+        board = leaderboard.get_leaderboard()
+        self.assertEqual([e['username'] for e in board.top('all_time')], ['carol', 'dave', 'bob', 'alice'])
+        self.assertEqual(board.rank('all_time', self.users['bob'].id)['rank'], 3)
+        self.assertEqual(
+            [e['username'] for e in board.around('monthly', self.users['bob'].id, radius=1)],
+            ['dave', 'bob', 'alice'],
+        )
+        self.assertIsNone(board.rank('all_time', self.users['admin'].id))
+
+    def test_rebuilds_when_another_worker_invalidates(self):
+        board = leaderboard.get_leaderboard()
+        self.assertIs(leaderboard.get_leaderboard(), board)
+
+        # Another worker's change: the profile moves and the shared version is bumped
+        UserProfile.objects.filter(user=self.users['alice']).update(points=100)
+        songs_cache.invalidate(leaderboard.CACHE_DEPENDENCY)
+        with mock.patch.object(leaderboard, 'MIN_REBUILD_INTERVAL', 60):
+            self.assertIs(leaderboard.get_leaderboard(), board)
+        self.assertEqual(leaderboard.get_leaderboard().top('all_time', 1)[0]['username'], 'alice')
+
+    def test_point_changes_update_this_worker_and_are_replayed_by_the_others(self):
+        board = leaderboard.get_leaderboard()
+        version = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            points.post_entries(PointEntry.COMMENT, [(1, self.users['alice'].id, timezone.now())])
+        self.assertEqual(board.rank('all_time', self.users['alice'].id)['points'], 75)
+        self.assertEqual(self.version(), version)
+
+        # Another worker's change reaches this board through the change log, not a rebuild
+        with mock.patch.object(leaderboard, 'loaded_leaderboard', return_value=None):
+            with self.captureOnCommitCallbacks(execute=True):
+                points.post_entries(PointEntry.COMMENT, [(2, self.users['bob'].id, timezone.now())])
+        self.assertEqual(board.rank('all_time', self.users['bob'].id)['points'], 50)
+        with self.assertNumQueries(1):  # bob's (and the earlier alice's) profile rows
+            self.assertIs(leaderboard.get_leaderboard(), board)
+        self.assertEqual(board.rank('all_time', self.users['bob'].id)['points'], 75)
+        with self.assertNumQueries(0):
+            self.assertIs(leaderboard.get_leaderboard(), board)
+
+    def test_rebuilds_when_the_change_log_is_incomplete(self):
+        board = leaderboard.get_leaderboard()
+        with mock.patch.object(leaderboard, 'loaded_leaderboard', return_value=None):
+            with self.captureOnCommitCallbacks(execute=True):
+                points.post_entries(PointEntry.COMMENT, [(1, self.users['alice'].id, timezone.now())])
+        cache.delete(f'{leaderboard.CHANGES_KEY}:1')  # expired
+        rebuilt = leaderboard.get_leaderboard()
+        self.assertIsNot(rebuilt, board)
+        self.assertEqual(rebuilt.rank('all_time', self.users['alice'].id)['points'], 75)
+
+        with mock.patch.object(leaderboard, 'MAX_CHANGES', 1):
+            for entry_id in (2, 3):
+                with mock.patch.object(leaderboard, 'loaded_leaderboard', return_value=None):
+                    with self.captureOnCommitCallbacks(execute=True):
+                        points.post_entries(PointEntry.COMMENT, [(entry_id, self.users['bob'].id, timezone.now())])
+            self.assertIsNot(leaderboard.get_leaderboard(), rebuilt)
+
+    def test_monthly_expiry_resets_every_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            points.post_entries(PointEntry.COMMENT, [(1, self.users['alice'].id, timezone.now())])
+        board = leaderboard.get_leaderboard()
+        version = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(points.expire_monthly(timezone.now() + points.MONTHLY_WINDOW * 2), 1)
+        self.assertNotEqual(self.version(), version)
+        self.assertIsNot(leaderboard.get_leaderboard(), board)
+
+
+class RedisClientTests(TestCase):
+    def test_one_client_per_url(self):
+        self.addCleanup(setattr, leaderboard, '_redis', None)
+        with mock.patch.object(leaderboard, 'redis') as redis:
+            with override_settings(REDIS_URL='redis://one/0'):
+                self.assertIs(leaderboard.redis_client(), leaderboard.redis_client())
+            with override_settings(REDIS_URL='redis://two/0'):
+                leaderboard.redis_client()
+            with override_settings(REDIS_URL=None):
+                self.assertIsNone(leaderboard.redis_client())
+        self.assertEqual(
+            [call.args for call in redis.Redis.from_url.call_args_list], [('redis://one/0',), ('redis://two/0',)],
+        )
+
+
+@unittest.skipUnless(leaderboard.redis and getattr(settings, 'REDIS_URL', None), 'needs redis and REDIS_URL')
+class RedisLeaderboardTests(TestCase):
+    def setUp(self):
+        self.client = leaderboard.redis_client()
+        self.board = leaderboard.RedisLeaderboard(self.client, prefix='test:leaderboard')
+        self.addCleanup(lambda: self.client.delete(*self.client.keys('test:leaderboard:*')) or None)
+
+    def test_orders_like_the_local_board(self):
+        rows = [(user_id, f'user{user_id}', score, score) for user_id, score in
+                [(9, 50), (10, 50), (2, 50), (100, 80), (11, 10)]]
+        local = leaderboard.LocalLeaderboard()
+        local.load(rows)
+        board = self.board
+        board.load(rows)
+        self.assertEqual(board.top('all_time'), local.top('all_time'))
+        self.assertEqual(board.around('monthly', 10, 1), local.around('monthly', 10, 1))
+        self.assertEqual(board.rank('all_time', 9), local.rank('all_time', 9))
+
+    def test_interleaved_loads_each_publish_a_complete_board(self):
+        first = [(user_id, f'user{user_id}', user_id, 0) for user_id in range(1, 7)]
+        second = [(user_id, f'user{user_id}', user_id * 2, 0) for user_id in range(1, 4)]
+
+        def first_rows():
+            for i, row in enumerate(first):
+                if i == 3:
+                    # Another worker loads while this one is halfway through
+                    self.assertTrue(self.board.load(second, batch_size=1))
+                    self.assertEqual(len(self.board.top('all_time')), 3)
+                yield row
+
+        self.assertTrue(self.board.load(first_rows(), batch_size=2))
+        self.assertEqual([e['user_id'] for e in self.board.top('all_time')], [6, 5, 4, 3, 2, 1])
+        self.assertEqual(self.client.keys('test:leaderboard:building:*'), [])
+
+    def test_reset_during_a_load_discards_it(self):
+        def rows():
+            yield (1, 'user1', 10, 1)
+            self.board.reset()
+            yield (2, 'user2', 20, 2)
+
+        self.assertFalse(self.board.load(rows()))
+        self.assertFalse(self.board.is_loaded())
+        self.assertEqual(self.board.top('all_time'), [])
+        self.assertEqual(self.client.keys('test:leaderboard:building:*'), [])
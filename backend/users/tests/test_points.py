@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from users import points
+from users.models import PointEntry, UserProfile
+
+
+class PointsLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('historian', password='x')
+        now = timezone.now()
+        self.items = [
+            (1, self.user.id, now),
+            (2, self.user.id, now - timedelta(days=5)),
+            (3, self.user.id, now - points.MONTHLY_WINDOW - timedelta(days=1)),
+        ]
+
+    def totals(self):
+        profile = UserProfile.objects.get(user=self.user)
+        return profile.points, profile.points_monthly
+
+    def test_posting_creates_the_profile_and_counts_each_entry(self):
+        points.post_entries(PointEntry.COMMENT, self.items)
+        self.assertEqual(self.totals(), (75, 50))
+        self.assertEqual(
+            sorted(PointEntry.objects.values_list('object_id', 'expired')),
+            [(1, False), (2, False), (3, True)],
+        )
+
+    def test_posting_again_is_idempotent(self):
+        points.post_entries(PointEntry.COMMENT, self.items[:2])
+        points.post_entries(PointEntry.COMMENT, self.items)
+        points.post_entries(PointEntry.COMMENT, self.items)
+        self.assertEqual(self.totals(), (75, 50))
+        self.assertEqual(PointEntry.objects.count(), 3)
+
+    def test_sources_are_separate(self):
+        points.post_entries(PointEntry.COMMENT, self.items[:1])
+        points.post_entries(PointEntry.RATING, self.items[:1])
+        self.assertEqual(self.totals(), (35, 35))
+
+    def test_remove_reverses_and_allows_reposting(self):
+        points.post_entries(PointEntry.COMMENT, self.items)
+        points.remove_entries(PointEntry.COMMENT, [1, 3, 99])
+        self.assertEqual(self.totals(), (25, 25))
+        points.post_entries(PointEntry.COMMENT, self.items)
+        self.assertEqual(self.totals(), (75, 50))
+
+    def test_expire_monthly_moves_aged_entries_out_of_the_window(self):
+        points.post_entries(PointEntry.COMMENT, self.items)
+        later = timezone.now() + timedelta(days=30)
+        self.assertEqual(points.expire_monthly(later), 1)
+        self.assertEqual(self.totals(), (75, 25))
+        self.assertEqual(points.expire_monthly(later), 0)
+
+    def test_rebuild_matches_the_incremental_totals(self):
+        from songs.models import Song, UserSongComment, UserSongRating
+
+        song = Song.objects.create(title='Hit', artist='Star', year=1990, peak_rank=1, weeks_on_chart=5)
+        UserSongRating.objects.create(user=self.user, song=song, score=7)
+        UserSongComment.objects.create(user=self.user, song=song, text='Classic')
+        incremental = self.totals()
+        self.assertEqual(incremental, (35, 35))
+        UserProfile.objects.filter(user=self.user).update(points=0, points_monthly=0)
+        self.assertEqual(points.rebuild(), 2)
+        self.assertEqual(self.totals(), incremental)
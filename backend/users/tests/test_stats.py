@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from songs.models import RatingEvent, Song, UserSongRating
+from users.models import UserStatsSnapshot
+
+
+class UserStatsSnapshotTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        self.user = User.objects.create_user('historian', password='x')
+        self.client.force_authenticate(self.user)
+        self.songs = [
+            Song.objects.create(title=f'Song {year}', artist='Star', year=year, peak_rank=1, weeks_on_chart=5)
+            for year in (1965, 1968, 1984)
+        ]
+        for song, score in zip(self.songs, (9, 5, 9)):
+            UserSongRating.objects.create(user=self.user, song=song, score=score)
+
+    def stats(self):
+        response = self.client.get('/api/profile/stats/historian/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_rating_stats(self):
+        stats = self.stats()
+        self.assertEqual(stats['songs_rated'], 3)
+        self.assertAlmostEqual(stats['average_score'], 23 / 3)
+        self.assertEqual(stats['score_distribution'], [{'score': 5, 'count': 1}, {'score': 9, 'count': 2}])
+        self.assertEqual(
+            [(row['decade'], row['avg_score']) for row in stats['decade_averages']], [(1960, 7.0), (1980, 9.0)],
+        )
+        self.assertEqual([row['song']['year'] for row in stats['highest_rated_songs']], [1965, 1984])
+        self.assertEqual([row['song']['year'] for row in stats['lowest_rated_songs']], [1968])
+
+    def test_snapshot_is_reused_until_the_ratings_change(self):
+        self.stats()
+        snapshot = UserStatsSnapshot.objects.get(user=self.user)
+        self.assertFalse(snapshot.is_stale)
+        user = User.objects.select_related('stats_snapshot').get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            UserStatsSnapshot.for_user(user)
+
+        UserSongRating.objects.filter(song=self.songs[1]).get().delete()
+        self.assertTrue(UserStatsSnapshot.objects.get(user=self.user).is_stale)
+        self.assertEqual(self.stats()['songs_rated'], 2)
+
+    def test_queued_ratings_mark_the_snapshot_stale(self):
+        self.stats()
+        RatingEvent.objects.create(user=self.user, song=self.songs[1], score=10)
+        RatingEvent.flush()
+        self.assertEqual(self.stats()['score_distribution'], [{'score': 9, 'count': 2}, {'score': 10, 'count': 1}])
+
+    def test_stale_build_does_not_overwrite_a_newer_version(self):
+        snapshot = UserStatsSnapshot.objects.create(user=self.user, ratings_version=1)
+        user = User.objects.select_related('stats_snapshot').get(pk=self.user.pk)
+        # A rating lands after the snapshot was read but before the rebuild is stored
+        UserStatsSnapshot.mark_stale([self.user.pk])
+        UserStatsSnapshot.for_user(user)
+        snapshot.refresh_from_db()
+        self.assertEqual((snapshot.ratings_version, snapshot.built_version), (2, 0))
+        self.assertTrue(snapshot.is_stale)
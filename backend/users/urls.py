@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import UserRegistrationView, UserLoginView, UserLogoutView, UserProfileView, UserProfileView, ResetPasswordRequest, ResetPasswordConfirm, CSRFTokenView, user_stats, historian_leaderboard
+from .views import UserRegistrationView, UserLoginView, UserLogoutView, UserProfileView, UserProfileView, ResetPasswordRequest, ResetPasswordConfirm, CSRFTokenView, user_stats, historian_leaderboard, historian_rank
 
 urlpatterns = [
     path('csrf/', CSRFTokenView.as_view(), name='csrf-token'),
@@ -12,4 +12,5 @@ urlpatterns = [
     path('confirm-reset-password/<uid>/<token>/', ResetPasswordConfirm.as_view(), name='confirm-reset-password'), 
     path('profile/stats/<str:username>/', user_stats, name='user-stats'),
     path('leaderboard/', historian_leaderboard, name='historian-leaderboard'),
+    path('leaderboard/rank/<str:username>/', historian_rank, name='historian-rank'),
 ]
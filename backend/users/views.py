@@ -12,6 +12,7 @@ from songs.models import UserSongRating
 from .serializers import UserSongRatingSerializer
 from .utils import send_registration_email, send_password_reset_email
 from .models import UserProfile
+from . import leaderboard
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_str
@@ -201,68 +202,36 @@ class ResetPasswordConfirm(APIView):
 
 
 
-from django.db.models import Count, Avg, Max, Min, F, IntegerField, ExpressionWrapper
-from django.db.models.functions import Floor
+from django.core.cache import cache
 from songs.models import UserSongRating, Song
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from .models import UserStatsSnapshot
+
+SONG_COUNT_CACHE_KEY = 'song-count'
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_stats(request, username):
     """
-    Calculate and return user statistics including historian rank and progress.
+    Return user statistics including historian rank and progress.
+
+    The rating statistics come from the user's UserStatsSnapshot, which is only
+    rebuilt after their ratings change, so a repeat view is a single query.
     """
-    # 1. Look up the user and their profile first
+    # 1. Look up the user, their profile and their stats snapshot in one go
     try:
-        user_obj = User.objects.get(username=username)
-        profile = user_obj.profile
+        user_obj = User.objects.select_related('profile', 'stats_snapshot').get(username=username)
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=404)
+    try:
+        profile = user_obj.profile
+    except UserProfile.DoesNotExist:
+        profile = UserProfile(user=user_obj)
 
-    # --- Existing Stats Logic ---
-    total_songs = Song.objects.count()
-    rated_qs = UserSongRating.objects.filter(user=user_obj)
-    rated_count = rated_qs.count()
-    score_agg = rated_qs.aggregate(avg_score=Avg('score'))
-
-    rated_qs_clean = rated_qs.exclude(score=0)
-    max_score = rated_qs_clean.aggregate(Max('score'))['score__max']
-    min_score = rated_qs_clean.aggregate(Min('score'))['score__min']
-
-    highest_rated = rated_qs_clean.filter(score=max_score) if max_score is not None else []
-    lowest_rated = rated_qs_clean.filter(score=min_score) if min_score is not None else []
-
-    highest_rated_songs = [
-        {
-            'score': rating.score,
-            'song': {
-                'title': rating.song.title,
-                'artist': rating.song.artist,
-                'year': rating.song.year,
-                'id': rating.song.id,
-            }
-        }
-        for rating in highest_rated
-    ]
-
-    lowest_rated_songs = [
-        {
-            'score': rating.score,
-            'song': {
-                'title': rating.song.title,
-                'artist': rating.song.artist,
-                'year': rating.song.year,
-                'id': rating.song.id,
-            }
-        }
-        for rating in lowest_rated
-    ]
-
-    decade_expr = ExpressionWrapper(
-        Floor(F('song__year') / 10) * 10,
-        output_field=IntegerField()
-    )
+    rating_stats = UserStatsSnapshot.for_user(user_obj)
+    total_songs = cache.get_or_set(SONG_COUNT_CACHE_KEY, Song.objects.count, 60 * 60)
+    rated_count = rating_stats['songs_rated']
 
     # --- Build the response dictionary ---
     stats = {
@@ -276,34 +245,11 @@ def user_stats(request, username):
         'songs_rated': rated_count,
         'percent_rated': round((rated_count / total_songs * 100) if total_songs else 0, 1),
         'songs_unrated': total_songs - rated_count,
-        'average_score': score_agg['avg_score'],
-        'score_distribution': list(
-            rated_qs
-            .values('score')
-            .annotate(count=Count('score'))
-            .order_by('score')
-        ),
-        'decade_averages': [
-            {
-                **entry,
-                'scores': list(
-                    rated_qs
-                    .exclude(score__isnull=True)
-                    .exclude(score=0)
-                    .annotate(decade=decade_expr)
-                    .filter(decade=entry['decade'])
-                    .values_list('score', flat=True)
-                )
-            }
-            for entry in rated_qs
-                .exclude(score__isnull=True)
-                .exclude(score=0)
-                .annotate(decade=decade_expr)
-                .values('decade')
-                .annotate(avg_score=Avg('score'))
-        ],
-        'highest_rated_songs': highest_rated_songs,
-        'lowest_rated_songs': lowest_rated_songs,
+        'average_score': rating_stats['average_score'],
+        'score_distribution': rating_stats['score_distribution'],
+        'decade_averages': rating_stats['decade_averages'],
+        'highest_rated_songs': rating_stats['highest_rated_songs'],
+        'lowest_rated_songs': rating_stats['lowest_rated_songs'],
     }
 
     return Response(stats)
@@ -311,25 +257,47 @@ def user_stats(request, username):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def historian_leaderboard(request):
-    # Exclude Asle and admin accounts
-    base_qs = UserProfile.objects.exclude(user__username='Asle')\
-                                 .exclude(user__username='admin')\
-                                 .select_related('user')
+    # Rankings come from the sorted leaderboard (users/leaderboard.py), which
+    # already leaves out the LEADERBOARD_EXCLUDED_USERNAMES accounts
+    board = leaderboard.get_leaderboard()
+
+    def entry(e):
+        return {
+            'username': e['username'],
+            'points': e['points'],
+            'title': UserProfile(points=e['total_points'] or 0).historian_title,
+        }
 
-    # Top 10 All-Time
-    all_time = base_qs.order_by('-points')[:10]
-    
-    # Top 10 Monthly
-    monthly = base_qs.order_by('-points_monthly')[:10]
-    
     return Response({
-        'all_time': [
-            {'username': p.user.username, 'points': p.points, 'title': p.historian_title} 
-            for p in all_time
-        ],
-        'monthly': [
-            {'username': p.user.username, 'points': p.points_monthly, 'title': p.historian_title} 
-            for p in monthly
-        ]
+        'all_time': [entry(e) for e in board.top('all_time', 10)],
+        'monthly': [entry(e) for e in board.top('monthly', 10)],
     })
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def historian_rank(request, username):
+    """
+    A user's all-time and monthly rank with the users just above and below them.
+    ?radius= sets how many neighbours to include on each side (default 2, max 10).
+    """
+    user_id = User.objects.filter(username=username).values_list('id', flat=True).first()
+    if user_id is None:
+        return Response({'error': 'User not found'}, status=404)
+    try:
+        radius = max(0, min(int(request.query_params.get('radius', 2)), 10))
+    except ValueError:
+        return Response({'error': 'radius must be a number'}, status=400)
+
+    board = leaderboard.get_leaderboard()
+    data = {'username': username}
+    for name in leaderboard.BOARDS:
+        position = board.rank(name, user_id)
+        data[name] = {
+            'rank': position['rank'] if position else None,
+            'points': position['points'] if position else 0,
+            'neighbours': [
+                {'rank': e['rank'], 'username': e['username'], 'points': e['points']}
+                for e in board.around(name, user_id, radius)
+            ],
+        }
+    return Response(data)